@@ -0,0 +1,167 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from icons import IssueFormType, checkAction, checkType, iconFactory
+
+# Steps run for every form of a batch; the other pipeline steps run once for the whole batch
+FORM_STEPS = ('metadata-file', 'icons')
+
+
+def _error_message(error):
+    # The icon classes raise ValueError(message, cause)
+    return str(error.args[0]) if isinstance(error, ValueError) and error.args else str(error)
+
+
+def load_batch(path):
+    """Read a JSONL file with one issue form per line.
+
+    Each line is an object with the icon "type" and "action", the parsed "form" (an object
+    or its JSON string) or the raw issue "body", and optionally the "author" ({"id", "login"})
+    and an "issue" label used in the summary. Returns one entry per non-empty line; lines
+    that are not valid JSON objects get an 'error'.
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = {'line': line_number, 'label': f"line {line_number}", 'outputs': {}}
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                entry['error'] = f"invalid JSON: {e}"
+                entries.append(entry)
+                continue
+            entry['record'] = record
+            if record.get('issue') is not None:
+                entry['label'] = f"#{record['issue']}" if isinstance(record['issue'], int) else str(record['issue'])
+            entries.append(entry)
+    return entries
+
+
+def validate_batch(entries):
+    """Build the icon of every entry before anything is written; failures are stored as 'error'.
+
+    Returns the valid entries. Forms that would write the same files are all rejected: their downloads would race and
+    the winner would depend on timing.
+    """
+    owners = {}
+    for entry in entries:
+        if 'error' in entry:
+            continue
+        record = entry['record']
+        try:
+            entry['type'] = checkType(record.get('type'))
+            entry['action'] = checkAction(record.get('action'))
+            form = record.get('form')
+            if form is None:
+                if record.get('body') is None:
+                    raise ValueError("needs a 'form' or an issue 'body'")
+                from parse_issue_form import parse_issue_form
+                form = parse_issue_form(record['body'])
+            entry['icon'] = iconFactory(entry['type'], form, entry['action'])
+        except Exception as e:
+            entry['error'] = _error_message(e)
+            continue
+        for name in {entry['icon'].name} | {convertion.name for convertion in entry['icon'].convertions()}:
+            owners.setdefault(name, []).append(entry)
+
+    for name, claimants in owners.items():
+        if len(claimants) > 1:
+            labels = ', '.join(entry['label'] for entry in claimants)
+            for entry in claimants:
+                entry.setdefault('error', f"'{name}' is also written by another form ({labels})")
+    valid = [entry for entry in entries if 'error' not in entry]
+    for entry in valid:
+        entry['valid'] = True
+    return valid
+
+
+def run_batch(entries, steps=FORM_STEPS, extra_formats=(), workers=None):
+    """Run the per-form steps for the valid entries, downloading and converting in one shared pool.
+
+    Metadata files are written first, in order. Then every source of every form is a task
+    of a single thread pool, so a form with two sources does not wait for the others.
+    Outputs and failures are recorded in each entry.
+    """
+    valid = [entry for entry in entries if entry.get('valid')]
+    for entry in valid:
+        entry['seconds'] = 0.0
+
+    if 'metadata-file' in steps:
+        from generate_metadata_file import write_metadata_file
+        for entry in valid:
+            started = time.perf_counter()
+            author = entry['record'].get('author') or {}
+            try:
+                write_metadata_file(entry['icon'], entry['action'], author.get('id'), author.get('login'))
+                entry['outputs']['meta'] = 'written'
+            except Exception as e:
+                entry['error'] = f"metadata file: {_error_message(e)}"
+            entry['seconds'] += time.perf_counter() - started
+
+    if 'icons' in steps:
+        from generate_icons import PNG_DIR, WEBP_DIR, generate_convertion
+        PNG_DIR.mkdir(parents=True, exist_ok=True)
+        WEBP_DIR.mkdir(parents=True, exist_ok=True)
+        tasks = [(entry, convertion) for entry in valid
+                 if 'error' not in entry and entry['action'] != IssueFormType.METADATA_UPDATE
+                 for convertion in entry['icon'].convertions()]
+
+        def convert(entry, convertion):
+            started = time.perf_counter()
+            try:
+                return generate_convertion(entry['icon'].type, convertion, extra_formats), None, time.perf_counter() - started
+            except Exception as e:
+                return 'failed', _error_message(e), time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            futures = {executor.submit(convert, entry, convertion): (entry, convertion) for entry, convertion in tasks}
+            for future in as_completed(futures):
+                entry, convertion = futures[future]
+                state, error, seconds = future.result()
+                entry['outputs'][convertion.name] = state
+                entry['seconds'] += seconds
+                if error:
+                    entry.setdefault('error', f"{convertion.name}: {error}")
+    return entries
+
+
+def summarize(entries, ran=True):
+    """One plain dict per form: its label, icon, action, status, outputs and error."""
+    rows = []
+    for entry in entries:
+        if not entry.get('valid'):
+            status = 'invalid'
+        elif not ran:
+            status = 'skipped'
+        else:
+            status = 'failed' if 'error' in entry else 'ok'
+        rows.append({
+            'line': entry['line'],
+            'label': entry['label'],
+            'name': entry['icon'].name if 'icon' in entry else None,
+            'type': entry.get('type'),
+            'action': entry['action'].value if 'action' in entry else None,
+            'status': status,
+            'outputs': entry['outputs'],
+            'seconds': round(entry.get('seconds', 0.0), 2),
+            'error': entry.get('error'),
+        })
+    return rows
+
+
+def print_summary(rows):
+    width = max([len(row['label']) for row in rows] + [5])
+    for row in rows:
+        outputs = ', '.join(f"{name} {state}" for name, state in sorted(row['outputs'].items()))
+        detail = row['error'] if row['error'] else outputs
+        print(f"{row['label']:<{width}}  {row['status']:<7}  {row['name'] or '-':<32}  {detail}")
+    counts = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+    print(f"{len(rows)} forms: " + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
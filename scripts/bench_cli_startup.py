@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Modules that the quick subcommands must not load
+HEAVY_MODULES = ['requests', 'PIL', 'cairosvg', 'urllib3']
+
+SAMPLE_ISSUE_BODY = """### Icon name
+
+Startup Benchmark
+
+### Icon type
+
+SVG
+
+### Categories
+
+Tools
+
+### Aliases
+
+_No response_
+
+### Paste icon
+
+![icon](https://example.com/icon.svg)"""
+
+# label -> command line, relative to the scripts folder
+COMMANDS = {
+    'python (baseline)': ['-c', 'pass'],
+    'icon_cli --help': ['icon_cli.py', '--help'],
+    'icon_cli parse-form': ['icon_cli.py', 'parse-form'],
+    'icon_cli icon-name': ['icon_cli.py', 'icon-name', 'normal', 'addition'],
+    'parse_issue_form.py': ['parse_issue_form.py'],
+    'print_icon_name.py': ['print_icon_name.py', 'normal', 'addition'],
+    'import generate_icons': ['-c', 'import generate_icons'],
+}
+
+
+def run(arguments, env, import_time=False):
+    command = [sys.executable] + (['-X', 'importtime'] if import_time else []) + arguments
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=SCRIPTS_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed: {result.stderr.strip()}")
+    return elapsed, result.stderr
+
+
+def loaded_heavy_modules(importtime_output):
+    """Top-level heavy modules found in `python -X importtime` output."""
+    loaded = set()
+    for line in importtime_output.splitlines():
+        if line.startswith('import time:'):
+            module = line.rsplit('|', 1)[-1].strip().split('.')[0]
+            if module in HEAVY_MODULES:
+                loaded.add(module)
+    return sorted(loaded)
+
+
+def benchmark(repeats):
+    env = dict(os.environ, INPUT_ISSUE_BODY=SAMPLE_ISSUE_BODY,
+               INPUT_ISSUE_FORM=json.dumps({"Icon name": "Startup Benchmark", "Icon type": "SVG",
+                                            "Categories": "Tools", "Aliases": None,
+                                            "Paste icon": "![icon](https://example.com/icon.svg)"}))
+    env.pop('GITHUB_OUTPUT', None)
+    results = {}
+    for label, arguments in COMMANDS.items():
+        run(arguments, env)  # warm the page cache and bytecode
+        timings = [run(arguments, env)[0] for _ in range(repeats)]
+        _, importtime_output = run(arguments, env, import_time=True)
+        results[label] = {
+            'median_ms': round(statistics.median(timings) * 1000, 1),
+            'min_ms': round(min(timings) * 1000, 1),
+            'heavy_modules': loaded_heavy_modules(importtime_output),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure the startup time of the workflow commands')
+    parser.add_argument('--repeats', type=int, default=10, help='Runs per command (default: 10)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('--budget-ms', type=float,
+                        help='Exit with an error if an icon_cli command takes longer than this (median)')
+    args = parser.parse_args()
+
+    results = benchmark(args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for label, result in results.items():
+            heavy = ', '.join(result['heavy_modules']) or '-'
+            print(f"{label:<24} median {result['median_ms']:7.1f} ms  min {result['min_ms']:7.1f} ms  heavy imports: {heavy}")
+
+    failures = [label for label, result in results.items() if label.startswith('icon_cli') and (
+        result['heavy_modules'] or (args.budget_ms and result['median_ms'] > args.budget_ms))]
+    if failures:
+        print(f"⚠ Over budget or loading heavy modules: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,111 @@
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Thread
+from urllib.parse import urlsplit
+
+from icon_server import ROOT_DIR, IconStore, create_server
+
+
+def sample_urls(icon_count, sizes, formats, seed):
+    """Build request paths for a random sample of icons: originals plus generated variants."""
+    names = sorted(path.stem for path in (ROOT_DIR / "png").glob("*.png"))
+    icons = random.Random(seed).sample(names, min(icon_count, len(names)))
+    urls = []
+    for name in icons:
+        urls.append(f"/webp/{name}.webp")
+        for size in sizes:
+            for output_format in formats:
+                urls.append(f"/{output_format}/{name}.{output_format}?size={size}")
+    return urls
+
+
+def run_phase(host, port, urls, concurrency, known_etags=None):
+    """Request every URL once across `concurrency` keep-alive connections.
+
+    With `known_etags`, requests are conditional (If-None-Match). Returns (latencies,
+    status counts, elapsed seconds, ETags seen).
+    """
+    chunks = [urls[i::concurrency] for i in range(concurrency)]
+    etags = {}
+
+    def worker(chunk):
+        connection = http.client.HTTPConnection(host, port, timeout=60)
+        latencies, statuses = [], {}
+        for url in chunk:
+            headers = {'If-None-Match': known_etags[url]} if known_etags and url in known_etags else {}
+            started = time.perf_counter()
+            connection.request('GET', url, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            if response.getheader('ETag'):
+                etags[url] = response.getheader('ETag')
+        connection.close()
+        return latencies, statuses
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, chunks))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for result, _ in results for latency in result]
+    statuses = {}
+    for _, result in results:
+        for status, count in result.items():
+            statuses[status] = statuses.get(status, 0) + count
+    return latencies, statuses, elapsed, etags
+
+
+def report(label, latencies, statuses, elapsed):
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"{label:<12} {len(latencies):>6} requests in {elapsed:6.2f}s = {len(latencies) / elapsed:8.1f} req/s  "
+          f"p50 {quantiles[49] * 1000:7.2f} ms  p95 {quantiles[94] * 1000:7.2f} ms  p99 {quantiles[98] * 1000:7.2f} ms  "
+          f"status {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load benchmark for icon_server.py')
+    parser.add_argument('--url', help='Benchmark a running server (default: start one in-process with a fresh disk cache)')
+    parser.add_argument('--icons', type=int, default=100, help='Number of icons to sample (default: 100)')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')], default=[32, 64, 128],
+                       help='Comma-separated sizes to request (default: 32,64,128)')
+    parser.add_argument('--formats', type=lambda value: value.split(','), default=['webp', 'png'],
+                       help='Comma-separated generated formats (default: webp,png)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Parallel keep-alive connections (default: 16)')
+    parser.add_argument('--rounds', type=int, default=3, help='Warm rounds after the cold one (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the icon sample')
+    args = parser.parse_args()
+
+    urls = sample_urls(args.icons, args.sizes, args.formats, args.seed)
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        cache_dir = tempfile.mkdtemp(prefix='icon-server-bench-')
+        server = create_server('127.0.0.1', 0, IconStore(cache_dir=Path(cache_dir)))
+        Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+    print(f"{len(urls)} URLs ({args.icons} icons x {len(args.sizes)} sizes x {len(args.formats)} formats + originals), "
+          f"{args.concurrency} connections against {host}:{port}")
+    random.Random(args.seed).shuffle(urls)
+    *results, etags = run_phase(host, port, urls, args.concurrency)
+    report('cold', *results)
+    for round_number in range(1, args.rounds + 1):
+        random.Random(args.seed + round_number).shuffle(urls)
+        report(f'warm {round_number}', *run_phase(host, port, urls, args.concurrency)[:3])
+    report('conditional', *run_phase(host, port, urls, args.concurrency, etags)[:3])
+
+    if server:
+        print(f"Server stats: {json.dumps(server.store.stats)}")
+        server.shutdown()
+    sys.exit(0)
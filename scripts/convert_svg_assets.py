@@ -4,14 +4,28 @@ import hashlib
 import subprocess
 import argparse
 import tempfile
-import urllib.request
 import json
+import time
 from pathlib import Path
 from PIL import Image
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Event, Lock
 import xml.etree.ElementTree as ET
 
+from fs_snapshot import TreeSnapshot, stat_path
+from fs_watch import create_watcher, wait_for_changes
+from image_formats import EXTRA_FORMATS, encode_as, output_path, parse_formats
+from normalize_png_icons import normalize_icons
+from render_costs import RenderCostModel
+from reproducible import encode_webp, output_is_complete, strip_png_chunks, write_if_changed
+from run_journal import RunJournal
+from visual_diff import DEFAULT_NOOP_THRESHOLD, change_score, compare_all, is_noop, write_report
+from render_quarantine import RenderQuarantine
+from raster_wrappers import extract_png, scan_svg
+from svg_sanitize import read_svg, sanitize_svg
+from render_scheduler import (AdaptiveRenderScheduler, RenderLimitExceeded, run_monitored,
+                              DEFAULT_RENDER_MEMORY_LIMIT, DEFAULT_RENDER_TIMEOUT)
+
 # Inkscape is now the default and only method for SVG conversion
 
 # Define paths
@@ -20,21 +34,21 @@ SVG_DIR = ROOT_DIR / "svg"
 PNG_DIR = ROOT_DIR / "png"
 WEBP_DIR = ROOT_DIR / "webp"
 METADATA_FILE = ROOT_DIR / "metadata.json"
-
-# Ensure the output folders exist
-PNG_DIR.mkdir(parents=True, exist_ok=True)
-WEBP_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR = ROOT_DIR / ".cache"
+RENDER_COSTS_FILE = CACHE_DIR / "render-costs.json"
+QUARANTINE_FILE = CACHE_DIR / "render-quarantine.json"
+JOURNAL_FILE = CACHE_DIR / "convert-journal.jsonl"
 
 # Test/placeholder files to exclude from processing and cleanup
 EXCLUDED_FILES = {'icon'}  # Add test file names here
 
-# Track results (thread-safe)
-failed_files = []
-converted_pngs = 0
-converted_webps = 0
-total_icons = 0
-png_only_icons = []  # List to store PNG-only icons
-stats_lock = Lock()  # Lock for thread-safe counter updates
+def snapshot_folders(extra_formats=()):
+    """Folders a run reads and writes: sources, PNG/WEBP outputs and the enabled extra formats."""
+    return [SVG_DIR, PNG_DIR, WEBP_DIR] + [EXTRA_FORMATS[name][0] for name in extra_formats]
+
+def extra_listings(tree, extra_formats=()):
+    """Map each enabled extra format to the listing of its output folder in a snapshot."""
+    return {name: tree.listing(EXTRA_FORMATS[name][0]) for name in extra_formats}
 
 def file_size_readable(size_bytes):
     """Convert bytes to a human-readable format."""
@@ -58,15 +72,17 @@ def convert_to_kebab_case(name):
     kebab_case_name = re.sub(r'[\s_]+', '-', cleaned).lower()
     return kebab_case_name
 
-def rename_if_needed(file_path):
-    """Ensure the filename is in kebab-case; rename if necessary."""
+def rename_if_needed(file_path, snapshot=None):
+    """Ensure the filename is in kebab-case; rename if necessary, keeping `snapshot` current."""
     new_name = convert_to_kebab_case(file_path.stem) + file_path.suffix
     new_path = file_path.parent / new_name
 
     if new_path != file_path:
-        if new_path.exists():
+        if (snapshot.stat(new_path) if snapshot else stat_path(new_path)) is not None:
             raise FileExistsError(f"File conflict: {new_path} already exists.")
         file_path.rename(new_path)
+        if snapshot:
+            snapshot.move(file_path, new_path)
         print(f"Renamed: {file_path} -> {new_path}")
 
     return new_path
@@ -89,17 +105,27 @@ def resolve_css_variables(svg_content):
     resolved = re.sub(var_pattern, replace_var, svg_content)
     return resolved
 
-def preprocess_svg_for_inkscape(svg_path):
-    """Preprocess SVG to resolve CSS variables and fix dimension issues for Inkscape compatibility."""
+def preprocess_svg_for_inkscape(svg_path, removals=None):
+    """Preprocess SVG to resolve CSS variables and fix dimension issues for Inkscape compatibility.
+
+    External references, scripts and foreign objects are removed first, so the render never
+    touches the network; what was removed is appended to `removals`. A file that cannot be
+    read or sanitized raises, since rendering it unsanitized is never an option. Raster images
+    saved as .svg are returned as they are.
+    """
+    svg_content, raster = read_svg(svg_path)
+    if raster is not None:
+        return svg_path
+    sanitized_content, removed = sanitize_svg(svg_content)
+    if removals is not None:
+        removals.extend(removed)
+
     try:
-        with open(svg_path, 'r', encoding='utf-8') as f:
-            svg_content = f.read()
-        
-        needs_processing = False
-        processed_content = svg_content
-        
+        processed_content = sanitized_content
+        needs_processing = bool(removed)
+
         # Check if SVG contains CSS variables
-        if 'var(' in svg_content:
+        if 'var(' in processed_content:
             # Resolve CSS variables
             processed_content = resolve_css_variables(processed_content)
             needs_processing = True
@@ -144,132 +170,56 @@ def preprocess_svg_for_inkscape(svg_path):
             processed_content = re.sub(style_pattern, clean_style, processed_content)
             needs_processing = True
         
-        # Create a temporary file with processed SVG if needed
-        if needs_processing:
-            temp_svg = tempfile.NamedTemporaryFile(mode='w', suffix='.svg', delete=False, encoding='utf-8')
-            temp_svg.write(processed_content)
-            temp_svg.close()
-            return Path(temp_svg.name)
-        
-        # No processing needed, return original path
-        return svg_path
     except Exception as e:
+        # The compatibility fixes are optional; the sanitizing is not
         print(f"Warning: Failed to preprocess SVG {svg_path}: {e}")
-        return svg_path
+        processed_content, needs_processing = sanitized_content, bool(removed)
 
-def needs_conversion(svg_path, output_file, use_inkscape=True, force=False):
-    """Check if a file needs to be converted or overwritten."""
-    if force:
-        return True
-    
-    if not output_file.exists():
-        return True
+    # Create a temporary file with processed SVG if needed
+    if needs_processing:
+        temp_svg = tempfile.NamedTemporaryFile(mode='w', suffix='.svg', delete=False, encoding='utf-8')
+        temp_svg.write(processed_content)
+        temp_svg.close()
+        return Path(temp_svg.name)
 
-    # Compare modification times - if SVG is newer than PNG, it needs conversion
-    try:
-        svg_mtime = svg_path.stat().st_mtime
-        png_mtime = output_file.stat().st_mtime
-        return svg_mtime > png_mtime
-    except (OSError, FileNotFoundError):
-        return True
-
-def convert_svg_to_png(svg_path, png_path, use_inkscape=True, force=False):
-    """Convert SVG to PNG using Inkscape CLI."""
-    global converted_pngs
-    
-    # Skip if not needed and not forced
-    if not force and not needs_conversion(svg_path, png_path, use_inkscape, force):
-        return True
-    
-    try:
-        # Preprocess SVG to resolve CSS variables and fix dimension issues
-        processed_svg = preprocess_svg_for_inkscape(svg_path)
-        temp_svg_created = processed_svg != svg_path
-        
-        try:
-            result = subprocess.run(
-                [
-                    'inkscape',
-                    '--export-type=png',
-                    f'--export-filename={png_path}',
-                    '--export-height=512',
-                    '--export-background-opacity=0',  # Transparent background
-                    str(processed_svg)
-                ],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            if png_path.exists():
-                file_size = png_path.stat().st_size
-                with stats_lock:
-                    converted_pngs += 1
-                print(f"Converted PNG: {png_path.name} ({file_size_readable(file_size)})")
-                if file_size < 5000:
-                    print(f"  ⚠ Warning: PNG is very small ({file_size} bytes), might be transparent")
-        finally:
-            # Clean up temporary SVG file if created
-            if temp_svg_created and processed_svg.exists():
-                processed_svg.unlink()
-        
-        return True
+    # No processing needed, return original path
+    return svg_path
 
-    except subprocess.CalledProcessError as e:
-        print(f"Failed to convert {svg_path} to PNG using Inkscape: {e.stderr}")
-        with stats_lock:
-            failed_files.append(svg_path)
-        return False
-    except Exception as e:
-        print(f"Failed to convert {svg_path} to PNG: {e}")
-        with stats_lock:
-            failed_files.append(svg_path)
-        return False
-
-def convert_image_to_webp(image_path, webp_path, force=False):
-    """Convert an image (PNG or other) to WEBP."""
-    global converted_webps
-    
-    # Skip if not needed and not forced
-    if not force and webp_path.exists():
+def remove_planned_files(removals, snapshot=None):
+    """Remove the files a plan marked as orphaned; returns the number of PNGs and WEBPs removed."""
+    removed = {PNG_DIR.name: 0, WEBP_DIR.name: 0}
+    removed.update({EXTRA_FORMATS[name][0].name: 0 for name in EXTRA_FORMATS})
+    for relative_path in removals:
+        file_path = ROOT_DIR / relative_path
         try:
-            # Check if PNG is newer than WEBP
-            png_mtime = image_path.stat().st_mtime
-            webp_mtime = webp_path.stat().st_mtime
-            if png_mtime <= webp_mtime:
-                return True
-        except (OSError, FileNotFoundError):
-            pass
-    
-    try:
-        image = Image.open(image_path).convert("RGBA")
-        image.save(webp_path, format='WEBP')
-        with stats_lock:
-            converted_webps += 1
-        print(f"Converted WEBP: {webp_path.name} ({file_size_readable(webp_path.stat().st_size)})")
-        return True
-
-    except Exception as e:
-        print(f"Failed to convert {image_path} to WEBP: {e}")
-        with stats_lock:
-            failed_files.append(image_path)
-        return False
-
-def clean_up_files(folder, valid_basenames):
-    """Remove files that no longer have corresponding SVG or PNG files, and excluded test files."""
-    removed_files = 0
-    for file_path in folder.glob('*'):
-        # Remove excluded test files and files without corresponding sources
-        if file_path.stem in EXCLUDED_FILES or file_path.stem not in valid_basenames:
             file_path.unlink()
-            print(f"Removed: {file_path}")
-            removed_files += 1
-    return removed_files
+        except FileNotFoundError:
+            continue
+        if snapshot:
+            snapshot.forget(file_path)
+        print(f"Removed: {file_path}")
+        removed[file_path.parent.name] += 1
+    return removed[PNG_DIR.name], removed[WEBP_DIR.name]
 
 def download_file(url, output_path):
-    """Download a file from URL to the specified path."""
-    urllib.request.urlretrieve(url, output_path)
-    return output_path
+    """Download a file from URL to the specified path; returns False when the file already held it.
+
+    Downloads go through the conditional-request cache, and an unchanged file is left
+    untouched so that its outputs stay newer than it and are not rendered again.
+    """
+    from download_cache import DownloadCache
+    data, _, _ = DownloadCache().fetch(url)
+    output_path = Path(output_path)
+    try:
+        if output_path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    fd, temp_path = tempfile.mkstemp(dir=output_path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+    return True
 
 def load_metadata():
     """Load metadata.json and return a dictionary of icon data."""
@@ -335,80 +285,898 @@ def get_all_variant_names(metadata):
     
     return all_names
 
-def outputs_exist_and_valid(png_path, webp_path):
-    """Check if both PNG and WEBP outputs exist and are non-empty.
-    
-    Note: We don't check modification times because in CI environments (GitHub Actions),
-    git checkout resets all file mtimes to the checkout time, making SVG files appear
-    newer than existing outputs even when they haven't changed.
+class Converter:
+    """Converts icons to PNG, WEBP and the enabled extra formats, keeping its state between calls.
+
+    A converter owns everything that used to be per-process state: the render thread pool,
+    the adaptive render scheduler, the cost model, the quarantine, the optional snapshot of
+    the output folders and the counters of a run. A long-running service creates one and
+    calls convert() for every batch, reusing the warm pool; the command line below is one
+    such caller.
     """
-    if not png_path.exists() or not webp_path.exists():
-        return False
-    
+
+    def __init__(self, threads=None, extra_formats=(), render_timeout=DEFAULT_RENDER_TIMEOUT,
+                 render_memory_limit=DEFAULT_RENDER_MEMORY_LIMIT, noop_threshold=0,
+                 collect_visual_changes=False, cost_model_file=RENDER_COSTS_FILE, quarantine_file=QUARANTINE_FILE,
+                 reject_unsafe=False, extract_rasters=False):
+        self.threads = threads or os.cpu_count() or 1
+        self.extra_formats = list(extra_formats)
+        self.render_timeout = render_timeout
+        self.render_memory_limit = render_memory_limit
+        # Re-rendered PNGs that are only noise (visual_diff.is_noop) keep the previous file; 0 disables it
+        self.noop_threshold = noop_threshold
+        # Fail SVGs with external references, scripts or foreign objects instead of sanitizing them
+        self.reject_unsafe = reject_unsafe
+        # Draw SVGs that only wrap an embedded PNG or JPEG from the raster, without Inkscape
+        self.extract_rasters = extract_rasters
+        # Admits Inkscape renders based on CPU count and memory pressure
+        self.scheduler = AdaptiveRenderScheduler(self.threads)
+        # Estimates render times and learns them from this and previous runs
+        self.cost_model = RenderCostModel(cost_model_file)
+        # SVGs whose renders were killed for exceeding the limits
+        self.quarantine = RenderQuarantine(quarantine_file)
+        # Snapshot of the folders for the current run (None queries the filesystem directly)
+        self.snapshot = None
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self._cancelled = Event()
+        self._lock = Lock()  # for the counters below
+        self.reset_counters()
+        # (name, previous PNG, new PNG) of every re-render that replaced a PNG; None when not collected
+        self.visual_changes = [] if collect_visual_changes else None
+
+    def reset_counters(self):
+        self.converted_pngs = 0
+        self.converted_webps = 0
+        self.converted_extras = {}  # format name -> number of files written
+        self.unchanged_outputs = 0  # re-rendered outputs kept because their content did not change
+        self.extracted_rasters = 0  # PNGs drawn from the raster embedded in their SVG
+        self.failed_files = []
+        self.sanitized = {}  # icon name -> what was removed from its SVG before rendering
+
+    def close(self):
+        """Cancel queued work, wait for running renders, release the pool and save what was learned."""
+        self.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        # Both only write when something was recorded since their last save
+        self.cost_model.save()
+        self.quarantine.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def cancel(self):
+        """Stop the current convert() call: queued icons are dropped, running renders finish."""
+        self._cancelled.set()
+
+    def scan(self):
+        """Take a snapshot of the folders a run reads and writes, used until the next scan."""
+        self.snapshot = TreeSnapshot(snapshot_folders(self.extra_formats))
+        return self.snapshot
+
+    def ensure_output_dirs(self):
+        """Ensure the output folders exist."""
+        PNG_DIR.mkdir(parents=True, exist_ok=True)
+        WEBP_DIR.mkdir(parents=True, exist_ok=True)
+        for name in self.extra_formats:
+            EXTRA_FORMATS[name][0].mkdir(parents=True, exist_ok=True)
+
+    def file_stat(self, path):
+        """Return (size, mtime) of a path, from the run snapshot when there is one."""
+        return self.snapshot.stat(path) if self.snapshot else stat_path(path)
+
+    def record_output(self, path):
+        """Stat a freshly written output and keep the run snapshot current; returns (size, mtime)."""
+        return self.snapshot.record(path) if self.snapshot else stat_path(path)
+
+    def _failed(self, path, result, message):
+        print(message)
+        with self._lock:
+            self.failed_files.append(path)
+        if result is not None:
+            result['error'] = message
+
+    def convert(self, icons, force=False, max_pending=None):
+        """Convert icons on the pool and yield one result per icon, in the order they finish.
+
+        `icons` is any iterable of icon names or (name, force) pairs. An icon with an SVG in
+        svg/ is rendered and encoded; a PNG-only icon is only encoded. At most `max_pending`
+        icons (default: twice the thread count) are in flight, and more are only taken from
+        `icons` as results are consumed, so a slow consumer or a long lazy iterable holds
+        back new work instead of queueing all of it. After cancel(), or when the consumer
+        closes the generator, icons that have not started are dropped; renders already
+        running finish and are still yielded when the generator is drained. A cancel() that
+        arrives between two calls cancels the next one; the call that honours it resets it.
+
+        A result is a dict with the icon `name`, its `source` ('svg', 'png' or None), `ok`, the
+        status of each output format in `outputs` ('converted', 'unchanged' or 'up-to-date'),
+        the `error` message of a failure and the `seconds` it took.
+        """
+        max_pending = max_pending or 2 * self.threads
+        icons = iter(icons)
+        pending = set()
+        cancelled = False
+        try:
+            while True:
+                while len(pending) < max_pending and not self._cancelled.is_set():
+                    item = next(icons, None)
+                    if item is None:
+                        break
+                    name, icon_force = (item, force) if isinstance(item, str) else item
+                    pending.add(self.executor.submit(self.convert_icon, name, icon_force))
+                if self._cancelled.is_set():
+                    cancelled = True
+                    pending = {future for future in pending if not future.cancel()}
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            if cancelled:
+                self._cancelled.clear()
+
+    def convert_icon(self, name, force=False):
+        """Convert one icon from its SVG, or from its PNG when it has none; returns its result."""
+        started = time.perf_counter()
+        svg_path = SVG_DIR / f"{name}.svg"
+        png_path = PNG_DIR / f"{name}.png"
+        webp_path = WEBP_DIR / f"{name}.webp"
+        result = {'name': name, 'source': None, 'ok': False, 'outputs': {}, 'error': None}
+        try:
+            if self.file_stat(svg_path) is not None:
+                result['source'] = 'svg'
+                result['ok'] = self.process_single_icon(svg_path, png_path, webp_path, force, result)
+            elif self.file_stat(png_path) is not None:
+                result['source'] = 'png'
+                result['ok'] = self.convert_image_to_webp(png_path, webp_path, force, result)
+            else:
+                self._failed(svg_path, result, f"No SVG or PNG source for {name}")
+        except Exception as e:
+            self._failed(svg_path, result, f"Error processing {svg_path}: {e}")
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def needs_conversion(self, svg_path, output_file, force=False):
+        """Check if a file needs to be converted or overwritten."""
+        if force:
+            return True
+
+        output_stat = self.file_stat(output_file)
+        svg_stat = self.file_stat(svg_path)
+        if output_stat is None or svg_stat is None:
+            return True
+
+        # Compare modification times - if SVG is newer than PNG, it needs conversion
+        if svg_stat[1] > output_stat[1]:
+            return True
+        # A truncated output (from a killed run or an interrupted copy) is rendered again
+        return not output_is_complete(output_file)
+
+    def previous_render(self, png_path, data):
+        """Return (previous PNG bytes, (score, changed fraction)) for a new render of an existing PNG.
+
+        Both are None when there is no complete previous PNG, or when neither the no-op
+        threshold nor the visual report needs them. The change is also None when the bytes
+        are identical, the threshold is off or the previous file cannot be decoded.
+        """
+        if self.file_stat(png_path) is None or not (self.noop_threshold or self.visual_changes is not None):
+            return None, None
+        if not output_is_complete(png_path):
+            return None, None
+        previous = png_path.read_bytes()
+        if previous == data or not self.noop_threshold:
+            return previous, None
+        try:
+            return previous, change_score(previous, data)
+        except Exception:
+            return previous, None
+
+    def render_with_inkscape(self, svg_path, png_path, result=None):
+        """Render an SVG with Inkscape; returns the PNG data, or None when the SVG was rejected."""
+        # Preprocess SVG to resolve CSS variables and fix dimension issues
+        removals = []
+        try:
+            processed_svg = preprocess_svg_for_inkscape(svg_path, removals)
+        except (OSError, ValueError) as e:
+            self._failed(svg_path, result, f"Could not sanitize {svg_path}, not rendering it: {e}")
+            return None
+        temp_svg_created = processed_svg != svg_path
+        if removals:
+            with self._lock:
+                self.sanitized[svg_path.stem] = removals
+            if result is not None:
+                result['sanitized'] = removals
+            if self.reject_unsafe:
+                if temp_svg_created:
+                    processed_svg.unlink()
+                self._failed(svg_path, result, f"Rejected {svg_path}: {'; '.join(removals)}")
+                return None
+            print(f"Sanitized {svg_path.name}: removed {'; '.join(removals)}")
+        # Render next to the output, then only replace it if the image actually changed
+        render_path = png_path.with_name(f".{png_path.stem}.render.png")
+
+        try:
+            heavy = self.cost_model.is_heavy(svg_path)
+            with self.scheduler.slot(heavy):
+                render_started = time.perf_counter()
+                _, _, peak_rss = run_monitored([
+                    'inkscape',
+                    '--export-type=png',
+                    f'--export-filename={render_path}',
+                    '--export-height=512',
+                    '--export-background-opacity=0',  # Transparent background
+                    str(processed_svg)
+                ], timeout=self.render_timeout, memory_limit=self.render_memory_limit)
+                render_seconds = time.perf_counter() - render_started
+            self.scheduler.observe(peak_rss, heavy)
+            self.cost_model.record(svg_path, render_seconds)
+            self.quarantine.release(svg_path)
+
+            with open(render_path, 'rb') as f:
+                return strip_png_chunks(f.read())
+        finally:
+            # Clean up temporary SVG file if created
+            if temp_svg_created and processed_svg.exists():
+                processed_svg.unlink()
+            render_path.unlink(missing_ok=True)
+
+    def convert_svg_to_png(self, svg_path, png_path, force=False, result=None):
+        """Convert SVG to PNG using Inkscape CLI."""
+        outputs = result['outputs'] if result is not None else {}
+
+        # Skip if not needed and not forced
+        if not force and not self.needs_conversion(svg_path, png_path, force):
+            outputs['png'] = 'up-to-date'
+            return True
+
+        try:
+            # SVGs that only wrap a raster are drawn from the raster itself, without Inkscape
+            wrapper = scan_svg(svg_path) if self.extract_rasters else None
+            extracted = wrapper is not None and wrapper['extractable']
+            if extracted:
+                data = extract_png(wrapper)
+                with self._lock:
+                    self.extracted_rasters += 1
+            else:
+                data = self.render_with_inkscape(svg_path, png_path, result)
+                if data is None:
+                    return False
+
+            previous, change = self.previous_render(png_path, data)
+            noop = change is not None and is_noop(*change, self.noop_threshold)
+            if noop:
+                # Anti-aliasing noise from another Inkscape build is not worth a new file
+                os.utime(png_path)
+                written = False
+            else:
+                written = write_if_changed(png_path, data)
+            png_stat = self.record_output(png_path)
+            if not written:
+                with self._lock:
+                    self.unchanged_outputs += 1
+                outputs['png'] = 'unchanged'
+                suffix = f" (change score {change[0]:.3f}% below the no-op threshold)" if noop else ""
+                print(f"Unchanged PNG: {png_path.name}{suffix}")
+            elif png_stat is not None:
+                file_size = png_stat[0]
+                with self._lock:
+                    self.converted_pngs += 1
+                    if self.visual_changes is not None and previous is not None:
+                        self.visual_changes.append((png_path.stem, previous, data))
+                outputs['png'] = 'converted'
+                source = f", extracted from the embedded {wrapper['format']}" if extracted else ""
+                print(f"Converted PNG: {png_path.name} ({file_size_readable(file_size)}{source})")
+                if file_size < 5000:
+                    print(f"  ⚠ Warning: PNG is very small ({file_size} bytes), might be transparent")
+            return True
+
+        except subprocess.CalledProcessError as e:
+            self._failed(svg_path, result, f"Failed to convert {svg_path} to PNG using Inkscape: {e.stderr}")
+            return False
+        except RenderLimitExceeded as e:
+            self._failed(svg_path, result, f"Killed Inkscape while converting {svg_path}: {e.reason}")
+            self.quarantine.add(svg_path, e.reason)
+            return False
+        except Exception as e:
+            self._failed(svg_path, result, f"Failed to convert {svg_path} to PNG: {e}")
+            return False
+
+    def convert_image_to_webp(self, image_path, webp_path, force=False, result=None):
+        """Convert an image (PNG or other) to WEBP and the enabled extra formats, decoding it once."""
+        outputs = result['outputs'] if result is not None else {}
+        targets = [('webp', webp_path)] + [(name, output_path(name, webp_path.stem)) for name in self.extra_formats]
+
+        # Skip if not needed and not forced
+        if not force:
+            # Only outputs older than the PNG are encoded again
+            image_stat = self.file_stat(image_path)
+            if image_stat is not None:
+                fresh = [name for name, path in targets
+                         if (self.file_stat(path) or (0, float('-inf')))[1] >= image_stat[1]]
+                outputs.update((name, 'up-to-date') for name in fresh)
+                targets = [(name, path) for name, path in targets if name not in fresh]
+            if not targets:
+                return True
+
+        try:
+            image = Image.open(image_path).convert("RGBA")
+            for name, path in targets:
+                data = encode_webp(image) if name == 'webp' else encode_as(image, name)
+                written = write_if_changed(path, data)
+                output_size, _ = self.record_output(path)
+                if not written:
+                    with self._lock:
+                        self.unchanged_outputs += 1
+                    outputs[name] = 'unchanged'
+                    print(f"Unchanged {name.upper()}: {path.name}")
+                    continue
+                with self._lock:
+                    if name == 'webp':
+                        self.converted_webps += 1
+                    else:
+                        self.converted_extras[name] = self.converted_extras.get(name, 0) + 1
+                outputs[name] = 'converted'
+                print(f"Converted {name.upper()}: {path.name} ({file_size_readable(output_size)})")
+            return True
+
+        except Exception as e:
+            self._failed(image_path, result, f"Failed to convert {image_path} to WEBP: {e}")
+            return False
+
+    def outputs_exist_and_valid(self, png_path, webp_path):
+        """Check if the PNG, WEBP and enabled extra-format outputs exist and are complete files.
+
+        Note: We don't check modification times because in CI environments (GitHub Actions),
+        git checkout resets all file mtimes to the checkout time, making SVG files appear
+        newer than existing outputs even when they haven't changed.
+        """
+        paths = [png_path, webp_path] + [output_path(name, png_path.stem) for name in self.extra_formats]
+        stats = [self.file_stat(path) for path in paths]
+
+        # Check that files exist and are not truncated (a non-zero size is not enough)
+        return all(stat is not None and stat[0] > 0 for stat in stats) and all(map(output_is_complete, paths))
+
+    def process_single_icon(self, svg_path, png_path, webp_path, force, result=None):
+        """Process a single icon: convert SVG to PNG and PNG to WEBP."""
+        # Convert SVG to PNG using Inkscape
+        png_success = self.convert_svg_to_png(svg_path, png_path, force, result)
+
+        # Convert PNG to WEBP if PNG conversion succeeded
+        if png_success and self.file_stat(png_path) is not None:
+            return self.convert_image_to_webp(png_path, webp_path, force, result)
+
+        return png_success
+
+    def write_visual_report(self, report_dir):
+        """Diff every replaced PNG against its previous render and write an HTML report."""
+        results = compare_all(self.visual_changes or [], report_dir, self.noop_threshold)
+        report = write_report(results, report_dir, self.noop_threshold)
+        print(f"\nVisual report of {len(results)} changed PNGs: {report}")
+        for result in results[:10]:
+            if 'error' in result:
+                print(f"- {result['name']}: {result['error']}")
+            else:
+                print(f"- {result['name']}: score {result['score']:.3f}%, {result['changed'] * 100:.1f}% of pixels changed")
+
+def plan_conversion(metadata, svg_files, png_files, webp_files, force_all=False, force_retry_variants=None,
+                    extra_files=None, is_complete=None):
+    """Compute everything a conversion run would do from one snapshot, without side effects.
+
+    `svg_files`, `png_files` and `webp_files` map file names to (size, mtime), as in the
+    listings of a TreeSnapshot; `extra_files` maps enabled extra formats to the same kind of
+    listing. Kebab-case renames are simulated, so the plan refers to the renamed names.
+    Without `is_complete`, a non-empty output counts as existing, from the listings alone;
+    with it, existing outputs are only skipped if it also accepts their path.
+    """
+    retry_names = {v.lower() for v in force_retry_variants} if force_retry_variants else set()
+    svg_files, png_files, webp_files = dict(svg_files), dict(png_files), dict(webp_files)
+    extra_files = extra_files or {}
+    plan = {
+        'renames': [],
+        'renders': [],
+        'webp_conversions': [],
+        'png_only_conversions': [],
+        'png_only_icons': [],
+        'removals': [],
+        'conflicts': [],
+        'forced': [],
+        'warnings': [],
+        'variants': 0,
+        'skipped': 0,
+        'png_only_skipped': 0,
+    }
+
+    # Temporary files left behind by a killed run are never sources, only leftovers to remove
+    leftovers = []
+    for folder, files in [(PNG_DIR, png_files), (WEBP_DIR, webp_files)] + [
+            (EXTRA_FORMATS[name][0], files) for name, files in extra_files.items()]:
+        for name in [name for name in files if name.startswith('.')]:
+            del files[name]
+            leftovers.append(f"{folder.name}/{name}")
+
+    def plan_rename(folder, files, name):
+        # Mirrors rename_if_needed: returns the kebab-case name, or None on a conflict
+        stem, suffix = os.path.splitext(name)
+        new_name = convert_to_kebab_case(stem) + suffix
+        if new_name != name:
+            if new_name in files:
+                plan['conflicts'].append(f"{folder.name}/{name}")
+                return None
+            files[new_name] = files.pop(name)
+            plan['renames'].append({'from': f"{folder.name}/{name}", 'to': f"{folder.name}/{new_name}"})
+        return new_name
+
+    all_variant_names = get_all_variant_names(metadata) if metadata else None
+    all_svg_files = {name[:-4]: name for name in svg_files if name.endswith('.svg') and name[:-4] not in EXCLUDED_FILES}
+
+    # Process variants from metadata if available, otherwise process all SVGs
+    if all_variant_names:
+        variant_svgs = {name: all_svg_files[name] for name in all_variant_names if name in all_svg_files}
+    else:
+        variant_svgs = all_svg_files
+
+    # If force-retry is specified, ONLY process those specific icons
+    if retry_names:
+        filtered_svgs = {stem: name for stem, name in variant_svgs.items() if stem.lower() in retry_names}
+        if filtered_svgs:
+            variant_svgs = filtered_svgs
+        else:
+            plan['warnings'].append(f"No SVG files found for: {', '.join(sorted(retry_names))}")
+
+    plan['variants'] = len(variant_svgs)
+    valid_basenames = set()
+    for stem in sorted(variant_svgs):
+        name = plan_rename(SVG_DIR, svg_files, variant_svgs[stem])
+        if name is None:
+            continue
+        stem = name[:-4]
+        valid_basenames.add(stem)
+
+        png = png_files.get(f"{stem}.png")
+        webp = webp_files.get(f"{stem}.webp")
+        extras = [files.get(f"{stem}.{name}") for name, files in extra_files.items()]
+        if force_all or stem.lower() in retry_names:
+            plan['forced'].append(stem)
+        elif (png and webp and png[0] > 0 and webp[0] > 0 and all(extra and extra[0] > 0 for extra in extras)
+              and (is_complete is None
+                   or all(map(is_complete, [PNG_DIR / f"{stem}.png", WEBP_DIR / f"{stem}.webp"]
+                              + [output_path(name, stem) for name in extra_files])))):
+            # Outputs already exist; mtimes are not trusted here because checkouts reset them
+            plan['skipped'] += 1
+            continue
+
+        # A complete PNG newer than its SVG is kept and only re-encoded to WEBP
+        if (stem in plan['forced'] or png is None or svg_files[name][1] > png[1]
+                or (is_complete is not None and not is_complete(PNG_DIR / f"{stem}.png"))):
+            plan['renders'].append(stem)
+        else:
+            plan['webp_conversions'].append(stem)
+
+    # PNG files without an SVG source are converted to WEBP directly
+    for name in sorted(png_files):
+        stem = name[:-4]
+        if not name.endswith('.png') or stem in valid_basenames or stem in EXCLUDED_FILES:
+            continue
+        if retry_names and stem.lower() not in retry_names:
+            continue
+        name = plan_rename(PNG_DIR, png_files, name)
+        if name is None:
+            continue
+        stem = name[:-4]
+        valid_basenames.add(stem)
+        plan['png_only_icons'].append(stem)
+
+        outputs = [webp_files.get(f"{stem}.webp")] + [files.get(f"{stem}.{ext}") for ext, files in extra_files.items()]
+        if force_all or stem.lower() in retry_names:
+            plan['forced'].append(stem)
+        elif (all(output and png_files[name][1] <= output[1] for output in outputs)
+              and (is_complete is None
+                   or all(map(is_complete, [WEBP_DIR / f"{stem}.webp"] + [output_path(ext, stem) for ext in extra_files])))):
+            plan['png_only_skipped'] += 1
+            continue
+        plan['png_only_conversions'].append(stem)
+
+    # Outputs without a source or metadata entry are removed (not when targeting specific icons)
+    if not retry_names:
+        if metadata:
+            valid_basenames |= all_variant_names
+        else:
+            valid_basenames |= {name[:-4] for name in svg_files if name.endswith('.svg') and name[:-4] not in EXCLUDED_FILES}
+        folders = [(PNG_DIR, png_files), (WEBP_DIR, webp_files)]
+        folders += [(EXTRA_FORMATS[name][0], files) for name, files in extra_files.items()]
+        for folder, files in folders:
+            for name in sorted(files):
+                stem = os.path.splitext(name)[0]
+                if stem in EXCLUDED_FILES or stem not in valid_basenames:
+                    plan['removals'].append(f"{folder.name}/{name}")
+    plan['removals'] += leftovers
+
+    return plan
+
+def summarize_plan(plan, svg_files, png_files):
+    """Build the machine-readable form of a plan, including counts and an estimated cost."""
+    sizes = {name: size for files in (svg_files, png_files) for name, (size, _) in files.items()}
+    for rename in plan['renames']:
+        old_name, new_name = Path(rename['from']).name, Path(rename['to']).name
+        sizes[new_name] = sizes.get(old_name, 0)
+    estimated_cost = sum(task_cost('.svg', sizes.get(f"{name}.svg", 0)) for name in plan['renders'])
+    estimated_cost += sum(task_cost('.png', sizes.get(f"{name}.png", 0)) for name in plan['webp_conversions'] + plan['png_only_conversions'])
+
+    summary = {key: plan[key] for key in ('renames', 'renders', 'webp_conversions', 'png_only_conversions',
+                                          'png_only_icons', 'removals', 'conflicts', 'forced', 'warnings')}
+    summary['summary'] = {
+        'variants': plan['variants'],
+        'renders': len(plan['renders']),
+        'webp_conversions': len(plan['webp_conversions']) + len(plan['png_only_conversions']),
+        'renames': len(plan['renames']),
+        'removals': len(plan['removals']),
+        'skipped': plan['skipped'] + plan['png_only_skipped'],
+        'estimated_cost': round(estimated_cost, 2),
+    }
+    return summary
+
+# Relative costs used to balance shards: every render pays the Inkscape startup,
+# and larger sources take proportionally longer to parse, rasterize and encode
+RENDER_BASE_COST = 1.0
+RENDER_COST_PER_BYTE = 1 / 100_000
+WEBP_BASE_COST = 0.05
+WEBP_COST_PER_BYTE = 1 / 2_000_000
+
+def parse_shard_spec(spec):
+    """Parse an 'i/N' shard specification into a zero-based (index, count) pair."""
+    match = re.fullmatch(r'(\d+)/(\d+)', spec.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{spec}', expected i/N such as 0/4")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or index >= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard '{spec}', index must be between 0 and {max(count - 1, 0)}")
+    return index, count
+
+def task_cost(suffix, size):
+    """Relative cost of converting a source of the given type and size."""
+    if suffix == '.svg':
+        return RENDER_BASE_COST + size * RENDER_COST_PER_BYTE
+    return WEBP_BASE_COST + size * WEBP_COST_PER_BYTE
+
+def estimate_task_cost(source_path):
+    """Estimate the relative cost of converting a source file (SVG render or PNG-only WEBP)."""
+    source_stat = stat_path(source_path)
+    return task_cost(source_path.suffix, source_stat[0] if source_stat else 0)
+
+def select_shard(tasks, shard_index, shard_count, cost=None):
+    """Deterministically pick the tasks belonging to one shard, balanced by estimated cost.
+
+    Tasks are assigned most expensive first to the least loaded shard, with names breaking
+    ties, so every runner computes the same partition from the same plan. `cost` maps a
+    source path to its cost and must not depend on anything that differs between runners.
+    """
+    cost = cost or estimate_task_cost
+    costed = sorted(((cost(task[0]), task[0].stem, task) for task in tasks),
+                    key=lambda item: (-item[0], item[1]))
+    loads = [0.0] * shard_count
+    selected = []
+    for cost, _, task in costed:
+        target = min(range(shard_count), key=lambda i: (loads[i], i))
+        loads[target] += cost
+        if target == shard_index:
+            selected.append(task)
+    return selected, loads
+
+def plan_digest(names):
+    """Fingerprint a planned task list so shards can verify they worked from the same plan."""
+    return hashlib.sha256('\n'.join(sorted(names)).encode()).hexdigest()
+
+def write_shard_report(report_path, converter, shard_index, shard_count, planned_names, assigned, png_only_icons, quarantined):
+    """Write the partial manifest of one shard: its assigned icons, produced outputs and failures."""
+    outputs = []
+    for name, kind in assigned:
+        expected = [PNG_DIR / f"{name}.png", WEBP_DIR / f"{name}.webp"] if kind == 'svg' else [WEBP_DIR / f"{name}.webp"]
+        expected += [output_path(extension, name) for extension in converter.extra_formats]
+        outputs.extend(str(path.relative_to(ROOT_DIR)) for path in expected if converter.file_stat(path) is not None)
+
+    report = {
+        'shard': shard_index,
+        'shard_count': shard_count,
+        'plan_digest': plan_digest(planned_names),
+        'planned': len(planned_names),
+        'assigned': [{'name': name, 'kind': kind} for name, kind in assigned],
+        'outputs': sorted(outputs),
+        'failed': sorted({Path(file).stem for file in converter.failed_files}),
+        'png_only_icons': sorted(png_only_icons),
+        'quarantined': sorted(quarantined),
+        # Rejected SVGs are listed under 'failed'
+        'sanitized': {} if converter.reject_unsafe else converter.sanitized,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Shard report written to {report_path}")
+
+def print_sanitized(sanitized, rejected=False):
+    """List the SVGs whose external references, scripts or foreign objects were removed (or rejected)."""
+    if not sanitized:
+        return
+    print("\nRejected SVGs (unsafe content):" if rejected else "\nSanitized SVGs (removed before rendering):")
+    for name in sorted(sanitized):
+        print(f"- {name}: {'; '.join(sanitized[name])}")
+
+def merge_shard_reports(report_paths, extra_formats=()):
+    """Combine shard reports, check that every shard and output is present, then clean up once.
+
+    Returns the process exit code.
+    """
+    reports = []
+    for report_path in report_paths:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            reports.append(json.load(f))
+
+    errors = []
+    shard_counts = {report['shard_count'] for report in reports}
+    if len(shard_counts) != 1:
+        errors.append(f"Reports disagree on the shard count: {sorted(shard_counts)}")
+    digests = {report['plan_digest'] for report in reports}
+    if len(digests) != 1:
+        errors.append("Reports were produced from different plans (plan digests differ)")
+
+    seen_shards = [report['shard'] for report in reports]
+    duplicates = sorted({shard for shard in seen_shards if seen_shards.count(shard) > 1})
+    if duplicates:
+        errors.append(f"Duplicate reports for shards: {duplicates}")
+    if len(shard_counts) == 1:
+        missing = sorted(set(range(shard_counts.pop())) - set(seen_shards))
+        if missing:
+            errors.append(f"Missing reports for shards: {missing}")
+
+    if errors:
+        print("Cannot merge shard reports:")
+        for error in errors:
+            print(f"- {error}")
+        return 1
+
+    # Every assigned icon must have its outputs present after the shard artifacts were combined,
+    # except the quarantined ones, which were deliberately not rendered
+    tree = TreeSnapshot(snapshot_folders(extra_formats))
+    quarantined = sorted({name for report in reports for name in report.get('quarantined', [])})
+    gaps = []
+    for report in reports:
+        for task in report['assigned']:
+            if task['name'] in quarantined:
+                continue
+            expected = ['png', 'webp'] if task['kind'] == 'svg' else ['webp']
+            for extension in expected + list(extra_formats):
+                output = ROOT_DIR / extension / f"{task['name']}.{extension}"
+                output_stat = tree.stat(output)
+                if output_stat is None or output_stat[0] == 0:
+                    gaps.append(str(output.relative_to(ROOT_DIR)))
+
+    failed = sorted({name for report in reports for name in report['failed']})
+    sanitized = {name: removals for report in reports for name, removals in report.get('sanitized', {}).items()}
+    assigned_total = sum(len(report['assigned']) for report in reports)
+    print(f"Merged {len(reports)} shard reports covering {assigned_total} of {reports[0]['planned']} planned icons.")
+
+    # Every shard skipped cleanup; plan it once against the combined tree
+    plan = plan_conversion(load_metadata(), tree.listing(SVG_DIR), tree.listing(PNG_DIR), tree.listing(WEBP_DIR),
+                           extra_files=extra_listings(tree, extra_formats))
+    removed_pngs, removed_webps = remove_planned_files(plan['removals'], tree)
+    print(f"Removed {removed_pngs} PNGs and {removed_webps} WEBPs.")
+
+    if failed:
+        print("\nThe following icons failed to convert:")
+        for name in failed:
+            print(name)
+    if quarantined:
+        print("\nQuarantined icons (skipped until their SVG changes):")
+        for name in quarantined:
+            print(f"- {name}")
+    print_sanitized(sanitized)
+    if gaps:
+        print("\nThe following outputs are missing after merging:")
+        for gap in sorted(gaps):
+            print(gap)
+    return 1 if failed or gaps else 0
+
+def watch_for_changes(converter, metadata, debounce=0.25):
+    """Watch svg/, png/ and metadata.json and re-convert only the icons affected by each change.
+
+    The converter (with its thread pool) and the parsed metadata are kept across batches so
+    that a save is turned into a render without paying the startup, directory scan and
+    metadata load again.
+    """
+    def relevant(path):
+        if path.parent == ROOT_DIR:
+            return path.name == METADATA_FILE.name
+        return (path.suffix in ('.svg', '.png') and path.stem not in EXCLUDED_FILES
+                and not path.name.startswith('.'))  # temporary render and write files
+
+    variant_names = get_all_variant_names(metadata) if metadata else None
+    watcher = create_watcher([SVG_DIR, PNG_DIR, ROOT_DIR], relevant)
+    print(f"Watching {SVG_DIR.name}/, {PNG_DIR.name}/ and {METADATA_FILE.name} ({type(watcher).__name__}, debounce {debounce}s). Press Ctrl+C to stop.")
+
+    # Paths produced by our own kebab-case renames, ignored once when their event comes back
+    self_renamed = set()
+
     try:
-        # Check that files exist and have non-zero size
-        png_size = png_path.stat().st_size
-        webp_size = webp_path.stat().st_size
-        return png_size > 0 and webp_size > 0
-    except (OSError, FileNotFoundError):
-        return False
-
-def process_single_icon(svg_path, png_path, webp_path, force, icon_name=None):
-    """Process a single icon: convert SVG to PNG and PNG to WEBP."""
-    icon_name = icon_name or svg_path.stem
-    
-    # Convert SVG to PNG using Inkscape
-    png_success = convert_svg_to_png(svg_path, png_path, use_inkscape=True, force=force)
-    
-    # Convert PNG to WEBP if PNG conversion succeeded
-    if png_success and png_path.exists():
-        convert_image_to_webp(png_path, webp_path, force)
-    
-    return png_success
+        while True:
+            changed = wait_for_changes(watcher, debounce)
+            started = time.perf_counter()
+            svg_tasks = {}
+            png_only_tasks = {}
+
+            for path in sorted(changed):
+                if path in self_renamed:
+                    self_renamed.discard(path)
+                    continue
+
+                if path == METADATA_FILE:
+                    metadata = load_metadata()
+                    new_variant_names = get_all_variant_names(metadata) if metadata else None
+                    # Variants that just appeared in metadata are converted if their outputs are missing
+                    for name in (new_variant_names or set()) - (variant_names or set()):
+                        svg_file = SVG_DIR / f"{name}.svg"
+                        if svg_file.exists() and not converter.outputs_exist_and_valid(PNG_DIR / f"{name}.png", WEBP_DIR / f"{name}.webp"):
+                            svg_tasks[name] = svg_file
+                    variant_names = new_variant_names
+                elif path.suffix == '.svg':
+                    if not path.exists():
+                        continue
+                    if variant_names is not None and path.stem not in variant_names:
+                        continue
+                    svg_tasks[path.stem] = path
+                elif path.suffix == '.png':
+                    # Our own renders land in png/ too; only PNG-only icons are sources there
+                    if not path.exists() or (SVG_DIR / f"{path.stem}.svg").exists():
+                        continue
+                    png_only_tasks[path.stem] = path
+
+            if not svg_tasks and not png_only_tasks:
+                continue
+
+            sources = list(svg_tasks.values()) + list(png_only_tasks.values())
+            names, failed = [], []
+            for source in sources:
+                try:
+                    source_path = rename_if_needed(source)
+                except Exception as e:
+                    print(f"Error renaming {source}: {e}")
+                    failed.append(source)
+                    continue
+                if source_path != source:
+                    self_renamed.add(source_path)
+                names.append(source_path.stem)
+
+            failed += [result['name'] for result in converter.convert(names, force=True) if not result['ok']]
+            converter.cost_model.save()
+            converter.quarantine.save()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"Re-converted {len(sources) - len(failed)} of {len(sources)} changed icons in {elapsed_ms:.0f} ms")
+            for file in failed:
+                print(f"  ✗ {file}")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Convert SVG files to PNG and WEBP formats using Inkscape')
     parser.add_argument('--force-retry', type=str, metavar='ICON_NAME',
-                       help='Force retry conversion for a specific icon by name (without extension)')
-    parser.add_argument('--threads', type=int, default=4,
-                       help='Number of parallel threads to use (default: 4)')
+                       help='Force retry conversion for a specific icon by name (without extension); '
+                            'several icons are separated by commas')
+    parser.add_argument('--threads', type=int, default=None,
+                       help='Maximum number of parallel renders (default: CPU count); fewer run when memory is short')
+    parser.add_argument('--force', action='store_true',
+                       help='Re-convert every icon even if its outputs already exist')
+    parser.add_argument('--shard', type=parse_shard_spec, metavar='I/N',
+                       help='Only process shard I of N (zero-based), balanced by estimated cost; skips cleanup')
+    parser.add_argument('--shard-report', type=str, metavar='PATH',
+                       help='Where to write the shard report (default: shard-I-of-N.json)')
+    parser.add_argument('--merge-shards', nargs='+', metavar='REPORT',
+                       help='Merge shard reports, verify all outputs are present and run cleanup once')
+    parser.add_argument('--plan', action='store_true',
+                       help='Print what a run would do as JSON without converting, renaming or removing anything')
+    parser.add_argument('--verify', action='store_true',
+                       help='Also read the header and end of every existing output while planning, so truncated '
+                            'files are converted again (default: trust any non-empty output)')
+    parser.add_argument('--render-timeout', type=float, default=DEFAULT_RENDER_TIMEOUT, metavar='SECONDS',
+                       help=f'Kill a render after this many seconds and quarantine the SVG (default: {DEFAULT_RENDER_TIMEOUT})')
+    parser.add_argument('--render-memory-limit', type=int, default=DEFAULT_RENDER_MEMORY_LIMIT // (1024 * 1024), metavar='MB',
+                       help=f'Kill a render above this peak RSS and quarantine the SVG (default: {DEFAULT_RENDER_MEMORY_LIMIT // (1024 * 1024)})')
+    parser.add_argument('--retry-quarantined', action='store_true',
+                       help='Render quarantined SVGs again, after everything else, instead of skipping them')
+    parser.add_argument('--extra-formats', type=str, metavar='FORMATS', default=os.getenv('ICON_EXTRA_FORMATS', ''),
+                       help=f'Comma-separated extra output formats encoded next to each WEBP: {", ".join(EXTRA_FORMATS)} '
+                            '(default: $ICON_EXTRA_FORMATS)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Keep running and re-convert icons as files in svg/, png/ or metadata.json change')
+    parser.add_argument('--debounce', type=float, default=0.25,
+                       help='Seconds without new changes before a watch batch is processed (default: 0.25)')
+    parser.add_argument('--reject-unsafe-svgs', action='store_true',
+                       help='Fail SVGs with external references, scripts or foreign objects instead of '
+                            'removing those before rendering')
+    parser.add_argument('--extract-rasters', action='store_true',
+                       help='Draw SVGs that only wrap an embedded PNG or JPEG straight from the raster, '
+                            'without Inkscape (see raster_wrappers.py)')
+    parser.add_argument('--normalize-png-only', action='store_true',
+                       help='Trim, downscale to 512px and strip PNG-only icons in place before encoding them '
+                            '(see normalize_png_icons.py; cached by content hash)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run from its journal instead of planning a new one')
+    parser.add_argument('--noop-threshold', type=float, default=0, metavar='PERCENT',
+                       help='Keep the previous PNG when a re-render scores below this and no pixel changed '
+                            f'noticeably (see visual_diff.py; {DEFAULT_NOOP_THRESHOLD} suits Inkscape upgrades; '
+                            'default: 0, write every change)')
+    parser.add_argument('--visual-report', type=Path, metavar='DIR',
+                       help='Write an HTML report with side-by-side and difference images of every replaced PNG to DIR')
     parser.add_argument('file', nargs='?', 
                        help='Optional: Path to a single SVG file or URL to process')
     args = parser.parse_args()
 
-    # Inkscape is now the default and only method
-    use_inkscape = True
     single_file = args.file
     force_retry_icon = args.force_retry
-    num_threads = args.threads
+    num_threads = args.threads or os.cpu_count() or 1
+    force_all = args.force
+    shard = args.shard
+
+    if args.watch and (single_file or force_retry_icon):
+        parser.error("--watch cannot be combined with a file or --force-retry")
+    if shard and (single_file or args.watch):
+        parser.error("--shard cannot be combined with a file or --watch")
+
+    if args.plan and (single_file or args.watch):
+        parser.error("--plan cannot be combined with a file or --watch")
+    if args.normalize_png_only and (single_file or args.watch or args.plan or shard):
+        parser.error("--normalize-png-only cannot be combined with a file, --watch, --plan or --shard")
+    if args.resume and (single_file or args.watch or args.plan):
+        parser.error("--resume cannot be combined with a file, --watch or --plan")
+    if args.visual_report and (args.watch or args.plan):
+        parser.error("--visual-report cannot be combined with --watch or --plan")
+
+    try:
+        extra_formats = parse_formats(args.extra_formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Merging only combines reports and cleans up, so it does not need Inkscape
+    if args.merge_shards:
+        exit(merge_shard_reports(args.merge_shards, extra_formats))
     
-    # If force-retry is specified, get all variants for that icon from metadata
+    # Metadata is read once and shared by force-retry, planning, cleanup and watching
+    if not args.plan and (force_retry_icon or not single_file):
+        print("Loading metadata...")
+    metadata = load_metadata() if force_retry_icon or not single_file else {}
+
+    # If force-retry is specified, get all variants for those icons from metadata
     force_retry_variants = set()
-    if force_retry_icon:
-        metadata = load_metadata()
-        if metadata and force_retry_icon in metadata:
-            icon_data = metadata[force_retry_icon]
-            force_retry_variants.add(force_retry_icon)  # Base icon
-            
-            # Add color variants
-            if 'colors' in icon_data and isinstance(icon_data['colors'], dict):
-                if 'light' in icon_data['colors']:
-                    force_retry_variants.add(icon_data['colors']['light'])
-                if 'dark' in icon_data['colors']:
-                    force_retry_variants.add(icon_data['colors']['dark'])
-            
-            # Add wordmark variants
-            if 'wordmark' in icon_data and isinstance(icon_data['wordmark'], dict):
-                if 'light' in icon_data['wordmark']:
-                    force_retry_variants.add(icon_data['wordmark']['light'])
-                if 'dark' in icon_data['wordmark']:
-                    force_retry_variants.add(icon_data['wordmark']['dark'])
-            
-            print(f"Force retry enabled for icon '{force_retry_icon}' and its {len(force_retry_variants) - 1} variants: {', '.join(sorted(force_retry_variants))}")
+    for retry_icon in filter(None, (name.strip() for name in (force_retry_icon or '').split(','))):
+        if metadata and retry_icon in metadata:
+            icon_data = metadata[retry_icon]
+            variants = {retry_icon}  # Base icon
+
+            # Add color and wordmark variants
+            for key in ('colors', 'wordmark'):
+                if isinstance(icon_data.get(key), dict):
+                    variants.update(icon_data[key][mode] for mode in ('light', 'dark') if mode in icon_data[key])
+            force_retry_variants.update(variants)
+
+            if not args.plan:
+                print(f"Force retry enabled for icon '{retry_icon}' and its {len(variants) - 1} variants: {', '.join(sorted(variants))}")
         else:
             # If not found in metadata, just use the exact name
-            force_retry_variants.add(force_retry_icon.lower())
-            print(f"Force retry enabled for '{force_retry_icon}' (not found in metadata, using exact match)")
+            force_retry_variants.add(retry_icon.lower())
+            if not args.plan:
+                print(f"Force retry enabled for '{retry_icon}' (not found in metadata, using exact match)")
+
+    # Planning only reads one snapshot of the folders, so it needs neither Inkscape nor any writes
+    if args.plan:
+        tree = TreeSnapshot(snapshot_folders(extra_formats))
+        svg_files, png_files, webp_files = tree.listing(SVG_DIR), tree.listing(PNG_DIR), tree.listing(WEBP_DIR)
+        plan = plan_conversion(metadata, svg_files, png_files, webp_files, force_all, force_retry_variants,
+                               extra_listings(tree, extra_formats), output_is_complete if args.verify else None)
+        print(json.dumps(summarize_plan(plan, svg_files, png_files), indent=2))
+        exit(0)
 
     # Check if Inkscape is available (required)
     try:
@@ -419,27 +1187,21 @@ if __name__ == "__main__":
         print("On Ubuntu/Debian, install with: sudo apt-get install -y inkscape")
         exit(1)
 
-    # Track valid basenames (from SVG and PNG files)
-    valid_basenames = set()
+    converter = Converter(num_threads, extra_formats, args.render_timeout, args.render_memory_limit * 1024 * 1024,
+                          args.noop_threshold, collect_visual_changes=bool(args.visual_report),
+                          reject_unsafe=args.reject_unsafe_svgs, extract_rasters=args.extract_rasters)
+    converter.ensure_output_dirs()
+    failed_files = converter.failed_files
+    png_only_icons = []
+
+    if args.watch:
+        with converter:
+            watch_for_changes(converter, metadata, args.debounce)
+        exit(0)
 
     # If a single file is provided, process only that file
     if single_file:
-        temp_file = None
         try:
-            # Check if it's a URL
-            if single_file.startswith('http://') or single_file.startswith('https://'):
-                # Download to temp file first
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.svg')
-                temp_file.close()
-                download_file(single_file, temp_file.name)
-                svg_file = Path(temp_file.name)
-            else:
-                svg_file = Path(single_file)
-                if not svg_file.exists():
-                    print(f"Error: File not found: {svg_file}")
-                    exit(1)
-
-            # Determine output name from URL or file
             if single_file.startswith('http://') or single_file.startswith('https://'):
                 # Extract name from URL
                 from urllib.parse import urlparse
@@ -450,52 +1212,51 @@ if __name__ == "__main__":
                 if not url_name or url_name == '/':
                     # Fallback: use a hash or timestamp
                     url_name = hashlib.md5(single_file.encode()).hexdigest()[:8]
-                output_name = convert_to_kebab_case(url_name)
+                svg_file = SVG_DIR / f"{convert_to_kebab_case(url_name)}.svg"
+                if download_file(single_file, svg_file):
+                    print(f"Downloaded {single_file} to {svg_file.name}")
+                else:
+                    # The SVG keeps its mtime, so its outputs count as up to date
+                    print(f"Unchanged download: {single_file}")
             else:
-                output_name = convert_to_kebab_case(svg_file.stem)
+                svg_file = Path(single_file)
+                if not svg_file.exists():
+                    print(f"Error: File not found: {svg_file}")
+                    exit(1)
 
-            # Copy to SVG_DIR if it's a temp file or external file
-            if temp_file or not svg_file.parent.samefile(SVG_DIR):
-                target_svg = SVG_DIR / f"{output_name}.svg"
-                if temp_file:
-                    import shutil
-                    shutil.move(str(svg_file), str(target_svg))
-                else:
+                # Copy to SVG_DIR if it's an external file
+                if not svg_file.parent.samefile(SVG_DIR):
                     import shutil
+                    target_svg = SVG_DIR / f"{convert_to_kebab_case(svg_file.stem)}.svg"
                     shutil.copy2(str(svg_file), str(target_svg))
-                svg_file = target_svg
+                    svg_file = target_svg
 
             # Ensure the filename is in kebab-case
             try:
                 svg_path = rename_if_needed(svg_file)
             except Exception as e:
                 print(f"Error renaming {svg_file}: {e}")
-                failed_files.append(svg_file)
                 exit(1)
 
-            valid_basenames.add(svg_path.stem)
-            total_icons = 1
-
             # Set paths for PNG and WEBP
             png_path = PNG_DIR / f"{svg_path.stem}.png"
             webp_path = WEBP_DIR / f"{svg_path.stem}.webp"
 
             # Check if this is the icon to force retry (or any of its variants)
-            force = force_retry_icon and (svg_path.stem.lower() in {v.lower() for v in force_retry_variants})
-
-            # Convert SVG to PNG
-            convert_svg_to_png(svg_path, png_path, use_inkscape=True, force=force)
+            force = force_all or (force_retry_icon and (svg_path.stem.lower() in {v.lower() for v in force_retry_variants}))
 
-            # Convert PNG to WEBP
-            if png_path.exists():
-                convert_image_to_webp(png_path, webp_path, force)
-
-            # Clean up temp file if it exists
-            if temp_file and Path(temp_file.name).exists():
-                Path(temp_file.name).unlink()
+            # Convert SVG to PNG, then PNG to WEBP
+            converter.process_single_icon(svg_path, png_path, webp_path, force)
 
             # Display summary for single file
-            print(f"\nConverted {converted_pngs} PNG and {converted_webps} WEBP from 1 file.")
+            print(f"\nConverted {converter.converted_pngs} PNG and {converter.converted_webps} WEBP from 1 file.")
+            for name, count in converter.converted_extras.items():
+                print(f"Also encoded {count} {name.upper()}.")
+            if converter.unchanged_outputs:
+                print(f"Kept {converter.unchanged_outputs} re-encoded outputs whose content did not change.")
+            if args.visual_report:
+                converter.write_visual_report(args.visual_report)
+            print_sanitized(converter.sanitized, converter.reject_unsafe)
             if failed_files:
                 print("\nThe following files failed to convert:")
                 for file in failed_files:
@@ -504,207 +1265,194 @@ if __name__ == "__main__":
 
         except Exception as e:
             print(f"Error processing file: {e}")
-            if temp_file and Path(temp_file.name).exists():
-                Path(temp_file.name).unlink()
             exit(1)
+        finally:
+            converter.close()
     else:
-        # Load metadata to get all icon variants
-        print("Loading metadata...")
-        metadata = load_metadata()
-        
         if metadata:
-            all_variant_names = get_all_variant_names(metadata)
-            print(f"Found {len(all_variant_names)} icon variants in metadata")
+            print(f"Found {len(get_all_variant_names(metadata))} icon variants in metadata")
         else:
             print("Warning: metadata.json not found, processing all SVG files")
-            all_variant_names = None
-        
-        # Collect all SVG files
-        print("Scanning SVG files...")
-        all_svg_files = {f.stem: f for f in SVG_DIR.glob("*.svg") if f.stem not in EXCLUDED_FILES}
-        
-        # Process variants from metadata if available, otherwise process all SVGs
-        if all_variant_names:
-            variant_svgs = {}
-            for variant_name in all_variant_names:
-                if variant_name in all_svg_files:
-                    variant_svgs[variant_name] = all_svg_files[variant_name]
-                else:
-                    # Variant listed in metadata but SVG doesn't exist - skip silently
-                    pass
+
+        # Take one snapshot of the folders; planning and every later phase query it from memory
+        print("Scanning SVG, PNG and WEBP files...")
+        snapshot = converter.scan()
+
+        # A run that was killed can be resumed from its journal: same plan, minus finished icons
+        journal = RunJournal(JOURNAL_FILE)
+        run_options = json.loads(json.dumps({'force': force_all, 'force_retry': force_retry_icon, 'shard': shard,
+                                             'extra_formats': extra_formats}))
+        interrupted = journal.unfinished()
+        if args.resume and interrupted and interrupted[0]['options'] == run_options:
+            started, finished = interrupted
+            plan = started['plan']
+            for key in ('renders', 'webp_conversions', 'png_only_conversions'):
+                plan[key] = [name for name in plan[key] if name not in finished]
+            # Renames were applied before the journal was started
+            plan['renames'], plan['conflicts'], plan['warnings'] = [], [], []
+            print(f"Resuming the run started {started['started']}: {len(finished)} icons already finished")
         else:
-            # Fallback: process all SVG files
-            variant_svgs = all_svg_files
-        
-        # If force-retry is specified, ONLY process those specific icons
-        if force_retry_icon and force_retry_variants:
-            filtered_svgs = {}
-            for variant_name in force_retry_variants:
-                if variant_name in variant_svgs:
-                    filtered_svgs[variant_name] = variant_svgs[variant_name]
-                elif variant_name.lower() in {k.lower(): k for k in variant_svgs}:
-                    # Case-insensitive match
-                    for k, v in variant_svgs.items():
-                        if k.lower() == variant_name.lower():
-                            filtered_svgs[k] = v
-                            break
-            
-            if not filtered_svgs:
-                print(f"Warning: No SVG files found for '{force_retry_icon}' or its variants")
-                print(f"Searched for: {', '.join(sorted(force_retry_variants))}")
-            else:
-                variant_svgs = filtered_svgs
-                print(f"Processing only {len(variant_svgs)} files for '{force_retry_icon}': {', '.join(sorted(variant_svgs.keys()))}")
-        
-        total_icons = len(variant_svgs)
-        print(f"Processing {total_icons} icon variants")
-        
-        # Prepare tasks
-        tasks = []
-        skipped_count = 0
-        for variant_name, svg_file in variant_svgs.items():
-            # Ensure the filename is in kebab-case
+            if args.resume:
+                print("No interrupted run with the same options to resume; planning a new run")
+            elif interrupted:
+                print(f"Found an interrupted run started {interrupted[0]['started']} "
+                      f"({len(interrupted[1])} icons finished); pass --resume to continue it instead")
+            interrupted = None
+            plan = plan_conversion(metadata, snapshot.listing(SVG_DIR), snapshot.listing(PNG_DIR),
+                                   snapshot.listing(WEBP_DIR), force_all, force_retry_variants,
+                                   extra_listings(snapshot, extra_formats), output_is_complete if args.verify else None)
+        for warning in plan['warnings']:
+            print(f"Warning: {warning}")
+        if force_retry_icon and not plan['warnings']:
+            print(f"Processing only {plan['variants']} files for '{force_retry_icon}'")
+
+        # Apply the planned kebab-case renames
+        for conflict in plan['conflicts']:
+            print(f"Error renaming {ROOT_DIR / conflict}: a file with the kebab-case name already exists")
+            failed_files.append(ROOT_DIR / conflict)
+        for rename in plan['renames']:
             try:
-                svg_path = rename_if_needed(svg_file)
+                rename_if_needed(ROOT_DIR / rename['from'], snapshot)
             except Exception as e:
-                print(f"Error renaming {svg_file}: {e}")
-                with stats_lock:
-                    failed_files.append(svg_file)
-                continue
+                print(f"Error renaming {rename['from']}: {e}")
+                failed_files.append(ROOT_DIR / rename['from'])
 
-            valid_basenames.add(svg_path.stem)
+        if interrupted:
+            journal.resume()
+        else:
+            journal.start(plan, run_options)
 
-            # Set paths for PNG and WEBP
-            png_path = PNG_DIR / f"{svg_path.stem}.png"
-            webp_path = WEBP_DIR / f"{svg_path.stem}.webp"
+        total_icons = plan['variants']
+        print(f"Processing {total_icons} icon variants")
 
-            # Check if this is the icon to force retry (or any of its variants)
-            force = force_retry_icon and (svg_path.stem.lower() in {v.lower() for v in force_retry_variants})
-            
-            # Skip early if outputs already exist and are valid (unless forced)
-            if not force and outputs_exist_and_valid(png_path, webp_path):
-                skipped_count += 1
-                continue
-            
-            tasks.append((svg_path, png_path, webp_path, force))
-        
-        if skipped_count > 0:
-            print(f"Skipped {skipped_count} icons (PNG and WEBP already exist)")
+        forced_names = set(plan['forced'])
+        tasks = [
+            (SVG_DIR / f"{name}.svg", PNG_DIR / f"{name}.png", WEBP_DIR / f"{name}.webp", name in forced_names)
+            for name in plan['renders'] + plan['webp_conversions']
+        ]
+
+        if plan['skipped'] > 0:
+            print(f"Skipped {plan['skipped']} icons (PNG and WEBP already exist)")
+
+        quarantined_skipped = []
+
+        # Keep only this runner's share of the work
+        planned_names = [svg_path.stem for svg_path, _, _, _ in tasks]
+        if shard:
+            shard_index, shard_count = shard
+            tasks, loads = select_shard(tasks, shard_index, shard_count, converter.cost_model.static_estimate)
+            print(f"Shard {shard_index}/{shard_count}: {len(tasks)} of {len(planned_names)} icons (estimated cost {loads[shard_index]:.1f} of {sum(loads):.1f})")
+        assigned = [(svg_path.stem, 'svg') for svg_path, _, _, _ in tasks]
+
+        # Submit the most expensive renders first so that no giant SVG starts last (LPT order)
+        render_names = set(plan['renders'])
+        estimates = {
+            svg_path.stem: converter.cost_model.estimate(svg_path) if svg_path.stem in render_names else 0.0
+            for svg_path, _, _, _ in tasks
+        }
+        tasks.sort(key=lambda task: (-estimates[task[0].stem], task[0].stem))
+
+        # Renders that were killed before are skipped (or retried last) until their SVG changes
+        held_back = [task for task in tasks if task[0].stem in render_names and converter.quarantine.check(task[0])]
+        if held_back:
+            tasks = [task for task in tasks if task not in held_back]
+            if args.retry_quarantined:
+                tasks += held_back
+                print(f"Retrying {len(held_back)} quarantined icons last")
+            else:
+                quarantined_skipped = [svg_path.stem for svg_path, _, _, _ in held_back]
 
         # Process in parallel
         if tasks:
-            print(f"Processing {len(tasks)} icons with {num_threads} threads...")
+            print(f"Processing {len(tasks)} icons with up to {num_threads} threads...")
         else:
             print("No icons need processing.")
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = {
-                executor.submit(process_single_icon, svg_path, png_path, webp_path, force, svg_path.stem): 
-                (svg_path, png_path, webp_path) 
-                for svg_path, png_path, webp_path, force in tasks
-            }
-            
-            # Wait for all tasks to complete
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    svg_path, png_path, webp_path = futures[future]
-                    print(f"Error processing {svg_path}: {e}")
-                    with stats_lock:
-                        failed_files.append(svg_path)
-
-    # Process PNG-only files (skip if force-retry is specified for a different icon)
-    png_only_tasks = []
-    png_only_skipped = 0
-    for png_file in PNG_DIR.glob("*.png"):
-        if png_file.stem not in valid_basenames:
-            # If force-retry is specified, skip PNG-only files not in the variants list
-            if force_retry_icon and force_retry_variants:
-                if png_file.stem.lower() not in {v.lower() for v in force_retry_variants}:
-                    continue
-            
-            # Ensure the filename is in kebab-case
-            try:
-                png_path = rename_if_needed(png_file)
-            except Exception as e:
-                print(f"Error renaming {png_file}: {e}")
-                with stats_lock:
-                    failed_files.append(png_file)
-                continue
 
-            valid_basenames.add(png_path.stem)
+        for result in converter.convert((svg_path.stem, force) for svg_path, _, _, force in tasks):
+            if result['ok']:
+                journal.done(result['name'])
 
-            # Add the PNG-only icon to the list
-            with stats_lock:
-                png_only_icons.append(png_path.stem)
+    # Process PNG-only files (the plan already narrowed them down for force-retry)
+    png_only_icons.extend(plan['png_only_icons'])
 
-            # Set path for WEBP
-            webp_path = WEBP_DIR / f"{png_path.stem}.webp"
+    # Normalized sources are encoded again, even if their WEBP looked up-to-date when planning
+    if args.normalize_png_only and plan['png_only_icons']:
+        results, _ = normalize_icons(plan['png_only_icons'], workers=num_threads)
+        normalized = [name for name, _, _, written, _ in results if written]
+        for name, _, output_hash, _, message in results:
+            if output_hash is None:
+                print(f"⚠ Could not normalize {name}.png: {message}")
+        for name in normalized:
+            converter.record_output(PNG_DIR / f"{name}.png")
+        newly_planned = [name for name in normalized if name not in plan['png_only_conversions']]
+        plan['png_only_conversions'] += newly_planned
+        plan['png_only_skipped'] -= len(newly_planned)
+        forced_names.update(normalized)
+        print(f"Normalized {len(normalized)} of {len(plan['png_only_icons'])} PNG-only icons")
+    png_only_tasks = [
+        (PNG_DIR / f"{name}.png", WEBP_DIR / f"{name}.webp", name in forced_names)
+        for name in plan['png_only_conversions']
+    ]
+
+    if plan['png_only_skipped'] > 0:
+        print(f"Skipped {plan['png_only_skipped']} PNG-only files (WEBP already exists and up-to-date)")
+
+    planned_names += [png_path.stem for png_path, _, _ in png_only_tasks]
+    if shard:
+        png_only_tasks, _ = select_shard(png_only_tasks, shard_index, shard_count)
+    assigned += [(png_path.stem, 'png') for png_path, _, _ in png_only_tasks]
+    png_only_tasks.sort(key=lambda task: (-(converter.file_stat(task[0]) or (0,))[0], task[0].stem))
 
-            # Check if this is the icon to force retry (or any of its variants)
-            force = force_retry_icon and (png_path.stem.lower() in {v.lower() for v in force_retry_variants})
-            
-            # Skip early if WEBP already exists and is up-to-date (unless forced)
-            if not force and webp_path.exists():
-                try:
-                    png_mtime = png_path.stat().st_mtime
-                    webp_mtime = webp_path.stat().st_mtime
-                    if png_mtime <= webp_mtime:
-                        png_only_skipped += 1
-                        continue
-                except (OSError, FileNotFoundError):
-                    pass
-            
-            png_only_tasks.append((png_path, webp_path, force))
-    
-    if png_only_skipped > 0:
-        print(f"Skipped {png_only_skipped} PNG-only files (WEBP already exists and up-to-date)")
-    
     # Process PNG-only files in parallel
     if png_only_tasks:
         print(f"Processing {len(png_only_tasks)} PNG-only files...")
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = {
-                executor.submit(convert_image_to_webp, png_path, webp_path, force): 
-                (png_path, webp_path) 
-                for png_path, webp_path, force in png_only_tasks
-            }
-            
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    png_path, webp_path = futures[future]
-                    print(f"Error processing PNG-only {png_path}: {e}")
-                    with stats_lock:
-                        failed_files.append(png_path)
+        for result in converter.convert((png_path.stem, force) for png_path, _, force in png_only_tasks):
+            if result['ok']:
+                journal.done(result['name'])
 
     # Clean up unused files in PNG and WEBP directories
-    # Skip cleanup when force-retry is specified (we're only targeting specific icons)
+    # The plan has no removals when force-retry is specified (we're only targeting specific icons);
+    # when sharding, the merge step cleans up once all shards are done
     removed_pngs = 0
     removed_webps = 0
-    if not force_retry_icon:
-        # Use metadata variants for cleanup if available
-        metadata = load_metadata()
-        if metadata:
-            all_variant_names = get_all_variant_names(metadata)
-            # Include all variant names from metadata in valid basenames
-            valid_basenames = valid_basenames.union(all_variant_names)
-        else:
-            # Fallback: use all SVG stems if metadata not available
-            all_svg_stems = {p.stem for p in SVG_DIR.glob("*.svg") if p.stem not in EXCLUDED_FILES}
-            valid_basenames = valid_basenames.union(all_svg_stems)
-        
-        removed_pngs = clean_up_files(PNG_DIR, valid_basenames)
-        removed_webps = clean_up_files(WEBP_DIR, valid_basenames)
+    if shard:
+        write_shard_report(args.shard_report or f"shard-{shard_index}-of-{shard_count}.json", converter,
+                           shard_index, shard_count, planned_names, assigned, png_only_icons, quarantined_skipped)
+    else:
+        removed_pngs, removed_webps = remove_planned_files(plan['removals'], snapshot)
+    journal.finish()
 
     # Display summary
-    if converted_pngs == 0 and converted_webps == 0 and removed_pngs == 0 and removed_webps == 0:
+    converter.close()
+    converted_pngs, converted_webps = converter.converted_pngs, converter.converted_webps
+    if converted_pngs == 0 and converted_webps == 0 and not converter.converted_extras and removed_pngs == 0 and removed_webps == 0:
         print("\nAll icons are already up-to-date.")
     else:
         print(f"\nConverted {converted_pngs} PNGs and {converted_webps} WEBPs out of {total_icons} icons.")
         print(f"Removed {removed_pngs} PNGs and {removed_webps} WEBPs.")
+    for name, count in converter.converted_extras.items():
+        print(f"Also encoded {count} {name.upper()} files.")
+    if converter.unchanged_outputs:
+        print(f"Kept {converter.unchanged_outputs} re-encoded outputs whose content did not change.")
+    if converter.extracted_rasters:
+        print(f"Drew {converter.extracted_rasters} PNGs from the raster embedded in their SVG, without Inkscape.")
+    if args.visual_report:
+        converter.write_visual_report(args.visual_report)
+
+    if converter.scheduler.peak_active:
+        print(converter.scheduler.summary())
+        converter.cost_model.save()
+        print(converter.cost_model.summary())
+
+    # Display quarantined icons: newly killed renders and those skipped because of earlier kills
+    converter.quarantine.save()
+    if converter.quarantine.added or quarantined_skipped:
+        print("\nQuarantined icons (skipped until their SVG changes):")
+        for name, reason in converter.quarantine.added:
+            print(f"- {name} (new: {reason})")
+        for name in quarantined_skipped:
+            print(f"- {name}")
+    print_sanitized(converter.sanitized, converter.reject_unsafe)
 
     # Display any failed conversions
     if failed_files:
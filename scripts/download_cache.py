@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DOWNLOAD_CACHE_DIR = ROOT_DIR / ".cache" / "downloads"
+INDEX_NAME = "index.json"
+DEFAULT_TIMEOUT = 30
+USER_AGENT = "dashboard-icons-downloader"
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class DownloadCache:
+    """On-disk HTTP cache for icon sources, keyed by URL.
+
+    For every URL the index keeps the ETag and Last-Modified validators and the SHA-256 of
+    the last body; bodies are stored once per hash under objects/. A known URL is fetched
+    with a conditional request: a 304 answer is served from disk, and a 200 answer whose
+    body hashes the same as before is reported as unchanged, so callers can skip rendering
+    sources that did not change even when the server does not support validators.
+    """
+
+    def __init__(self, cache_dir=DOWNLOAD_CACHE_DIR, timeout=DEFAULT_TIMEOUT):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_file = self.cache_dir / INDEX_NAME
+        self.timeout = timeout
+        self._lock = Lock()
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _read_object(self, content_hash):
+        try:
+            data = (self.objects_dir / content_hash).read_bytes()
+        except OSError:
+            return None
+        # A damaged object is treated as missing and downloaded again
+        return data if hash_bytes(data) == content_hash else None
+
+    def _write_object(self, content_hash, data):
+        path = self.objects_dir / content_hash
+        if path.exists():
+            return
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.index_file)
+
+    def _request(self, url, entry):
+        headers = {'User-Agent': USER_AGENT}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, None, e.headers
+            raise
+
+    def fetch(self, url):
+        """Return (body, content hash, changed) for `url`.
+
+        `changed` is False when the body is the same as the one this cache returned for the
+        URL last time, whether the server answered 304 or sent identical bytes again.
+        """
+        with self._lock:
+            entry = self.entries.get(url)
+        cached = self._read_object(entry['sha256']) if entry else None
+        status, data, headers = self._request(url, entry if cached is not None else None)
+        if status == 304:
+            data = cached
+        content_hash = hash_bytes(data)
+        changed = entry is None or entry['sha256'] != content_hash
+
+        self._write_object(content_hash, data)
+        with self._lock:
+            previous_hash = entry['sha256'] if entry else None
+            self.entries[url] = {
+                'sha256': content_hash,
+                'size': len(data),
+                # A 304 may omit the validators; the ones of the cached response still apply
+                'etag': headers.get('ETag') or (entry or {}).get('etag'),
+                'last_modified': headers.get('Last-Modified') or (entry or {}).get('last_modified'),
+                'fetched': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            }
+            self._save_index()
+            if previous_hash and previous_hash != content_hash and all(
+                    other['sha256'] != previous_hash for other in self.entries.values()):
+                (self.objects_dir / previous_hash).unlink(missing_ok=True)
+        return data, content_hash, changed
+
+    def clear(self):
+        """Forget every URL and delete the stored bodies."""
+        with self._lock:
+            for path in self.objects_dir.glob('*'):
+                path.unlink()
+            self.entries = {}
+            self._save_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download icon sources through the conditional-request cache')
+    parser.add_argument('urls', nargs='*', help='URLs to fetch')
+    parser.add_argument('--cache-dir', type=Path, default=DOWNLOAD_CACHE_DIR,
+                       help=f'Cache folder (default: {DOWNLOAD_CACHE_DIR.relative_to(ROOT_DIR)})')
+    parser.add_argument('--clear', action='store_true', help='Delete every cached download first')
+    args = parser.parse_args()
+
+    cache = DownloadCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+    failed = 0
+    for url in args.urls:
+        try:
+            data, content_hash, changed = cache.fetch(url)
+        except (OSError, ValueError) as e:
+            print(f"⚠ {url}: {e}")
+            failed += 1
+            continue
+        print(f"{'changed' if changed else 'unchanged'} {content_hash[:16]} {len(data)} bytes {url}")
+    sys.exit(1 if failed else 0)
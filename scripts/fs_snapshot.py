@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+from threading import Lock
+
+
+def stat_path(path):
+    """Return (size, mtime) of a path, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime)
+
+
+class DirSnapshot:
+    """Names, sizes and mtimes of the regular files in one directory, listed once with os.scandir."""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.files = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        self.files[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+
+
+class TreeSnapshot:
+    """Answer existence, size and mtime queries for several directories from one scan of each.
+
+    Paths outside the snapshotted directories fall back to os.stat. Code that writes, renames
+    or removes files keeps the snapshot current with record(), move() and forget().
+    """
+
+    def __init__(self, folders):
+        self._dirs = {Path(folder): DirSnapshot(folder) for folder in folders}
+        self._lock = Lock()
+
+    def listing(self, folder):
+        """Return the {name: (size, mtime)} mapping of a snapshotted directory."""
+        return self._dirs[Path(folder)].files
+
+    def stat(self, path):
+        """Return (size, mtime) for a path, or None if it does not exist."""
+        path = Path(path)
+        snapshot = self._dirs.get(path.parent)
+        if snapshot is None:
+            return stat_path(path)
+        return snapshot.files.get(path.name)
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def record(self, path):
+        """Stat a file that was just written and store the result; returns its (size, mtime)."""
+        path = Path(path)
+        result = stat_path(path)
+        snapshot = self._dirs.get(path.parent)
+        if snapshot is not None:
+            with self._lock:
+                if result is None:
+                    snapshot.files.pop(path.name, None)
+                else:
+                    snapshot.files[path.name] = result
+        return result
+
+    def forget(self, path):
+        """Drop a removed file from the snapshot."""
+        path = Path(path)
+        snapshot = self._dirs.get(path.parent)
+        if snapshot is not None:
+            with self._lock:
+                snapshot.files.pop(path.name, None)
+
+    def move(self, source, target):
+        """Carry a renamed file's entry over to its new name."""
+        source, target = Path(source), Path(target)
+        source_dir, target_dir = self._dirs.get(source.parent), self._dirs.get(target.parent)
+        with self._lock:
+            entry = source_dir.files.pop(source.name, None) if source_dir is not None else None
+            entry = entry or stat_path(target)
+            if target_dir is not None and entry is not None:
+                target_dir.files[target.name] = entry
@@ -0,0 +1,142 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+# inotify event flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct('iIII')
+
+POLL_INTERVAL = 0.5
+
+
+class InotifyWatcher:
+    """Watch directories (non-recursively) using Linux inotify through libc."""
+
+    def __init__(self, directories, relevant=None):
+        self.relevant = relevant or (lambda path: True)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watches = {}
+        for directory in directories:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(self._fd)
+                raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+            self._watches[wd] = Path(directory)
+
+    def read(self, timeout=None):
+        """Wait up to `timeout` seconds (forever if None) and return the set of changed paths."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    print("Warning: inotify event queue overflowed, some changes may have been missed")
+                    continue
+                if wd not in self._watches or not name:
+                    continue
+                path = self._watches[wd] / os.fsdecode(name)
+                if self.relevant(path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that periodically compares directory listings (name, size and mtime)."""
+
+    def __init__(self, directories, relevant=None, interval=POLL_INTERVAL):
+        self.relevant = relevant or (lambda path: True)
+        self.directories = [Path(d) for d in directories]
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self):
+        state = {}
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        path = directory / entry.name
+                        if not self.relevant(path):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        state[path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                continue
+        return state
+
+    def read(self, timeout=None):
+        """Wait up to `timeout` seconds (forever if None) and return the set of changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            state = self._scan()
+            changed = {path for path in state.keys() | self._state.keys() if state.get(path) != self._state.get(path)}
+            self._state = state
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(directories, relevant=None):
+    """Create an inotify watcher when the platform supports it, otherwise a polling watcher."""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories, relevant)
+        except (OSError, AttributeError) as e:
+            print(f"Warning: inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(directories, relevant)
+
+
+def wait_for_changes(watcher, debounce):
+    """Block until something changes, then keep collecting until no event arrived for `debounce` seconds."""
+    changed = set()
+    while not changed:
+        changed = watcher.read(None)
+    while True:
+        more = watcher.read(debounce)
+        if not more:
+            return changed
+        changed |= more
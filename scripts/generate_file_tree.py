@@ -21,21 +21,22 @@ def generate_folder_tree(paths):
                         webp_files.append(os.path.join(root, file))
     return tree, webp_files
 
-if __name__ == "__main__":
-    # Adjust paths to be one level up
-    folder_paths = sys.argv[1:]
-    folder_paths = [str(Path(path).resolve()) for path in folder_paths]
-
-    if not folder_paths:
-        print("Please provide at least one folder path.")
-        sys.exit(1)
-
+def write_file_tree(folder_paths):
     # Generate the folder tree and get WebP files
-    folder_tree, webp_files = generate_folder_tree(folder_paths)
+    folder_tree, webp_files = generate_folder_tree([str(Path(path).resolve()) for path in folder_paths])
 
     # Write the JSON structure to 'tree.json' in the parent folder
     root_dir = Path(__file__).resolve().parent
     tree_json_path = root_dir.parent / 'tree.json'
     with open(tree_json_path, 'w') as f:
         json.dump(folder_tree, f, indent=4, sort_keys=True)  # Sort the keys in the JSON output
-    print(f"Folder tree successfully written to '{tree_json_path}'.")
\ No newline at end of file
+    print(f"Folder tree successfully written to '{tree_json_path}'.")
+
+if __name__ == "__main__":
+    folder_paths = sys.argv[1:]
+
+    if not folder_paths:
+        print("Please provide at least one folder path.")
+        sys.exit(1)
+
+    write_file_tree(folder_paths)
\ No newline at end of file
@@ -1,106 +1,179 @@
 from icons import IssueFormType, checkAction, iconFactory, checkType
 import os
 import sys
-import subprocess
 from pathlib import Path
-import requests
-from PIL import Image
+from threading import Lock
+from render_scheduler import run_monitored, DEFAULT_RENDER_MEMORY_LIMIT, DEFAULT_RENDER_TIMEOUT
+from svg_complexity import analyze_svg, complexity_flags
+from svg_sanitize import read_svg, sanitize_svg
+from reproducible import strip_png_chunks, write_if_changed
 
-# Try to import cairosvg, but make it optional
-try:
-    import cairosvg
-    CAIROSVG_AVAILABLE = True
-except (ImportError, OSError, Exception):
-    CAIROSVG_AVAILABLE = False
-    cairosvg = None
+# The download cache, Pillow (through image_formats) and cairosvg are imported where they are used,
+# so that icon_cli.py subcommands which never download or encode start quickly
 
 ISSUE_FORM_ENV_VAR = "INPUT_ISSUE_FORM"
+# Comma-separated extra formats (avif, jxl) encoded next to each WEBP
+EXTRA_FORMATS_ENV_VAR = "ICON_EXTRA_FORMATS"
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 SVG_DIR = ROOT_DIR / "svg"
 PNG_DIR = ROOT_DIR / "png"
 WEBP_DIR = ROOT_DIR / "webp"
 
-# Ensure the output folders exist
-PNG_DIR.mkdir(parents=True, exist_ok=True)
-WEBP_DIR.mkdir(parents=True, exist_ok=True)
+_download_cache = None
+_download_cache_lock = Lock()
 
-def request_image(url: str) -> bytes:
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.content
+def download_cache():
+    """The download cache shared by every download of this process, so concurrent ones keep one index."""
+    global _download_cache
+    with _download_cache_lock:
+        if _download_cache is None:
+            from download_cache import DownloadCache
+            _download_cache = DownloadCache()
+        return _download_cache
+
+def request_image(url: str) -> tuple:
+    """Download an icon source; returns (content, changed since the last download of the URL)."""
+    data, _, changed = download_cache().fetch(url)
+    return data, changed
 
 def save_image(image: bytes, path: Path):
     with open(path, 'wb') as f:
         f.write(image)
 
+def sanitized_copy(svg_path: Path) -> Path:
+    """Path of the SVG to render: the submitted file, or a copy without external references and scripts."""
+    content, raster = read_svg(svg_path)
+    if raster is not None:
+        # A raster cannot reference anything; Inkscape imports it as a bitmap
+        return svg_path
+    content, removals = sanitize_svg(content)
+    if not removals:
+        return svg_path
+    print(f"⚠ {svg_path.name}: removed before rendering: {'; '.join(removals)}")
+    sanitized_path = svg_path.with_name(f".{svg_path.stem}.sanitized.svg")
+    sanitized_path.write_text(content, encoding='utf-8')
+    return sanitized_path
+
 def convert_svg_to_png(svg_path: Path, png_path: Path, use_inkscape: bool = True) -> bytes:
     """Convert SVG to PNG using Inkscape or cairosvg."""
+    source_path = svg_path
     try:
+        # Renders never fetch what a submitted SVG references
+        svg_path = sanitized_copy(svg_path)
         if use_inkscape:
-            # Use Inkscape CLI
-            result = subprocess.run(
+            # Use Inkscape CLI, killing it (and anything it spawned) if it hangs or balloons.
+            # It renders next to the output so an unchanged icon does not rewrite the PNG.
+            render_path = png_path.with_name(f".{png_path.stem}.render.png")
+            run_monitored(
                 [
                     'inkscape',
                     '--export-type=png',
-                    f'--export-filename={png_path}',
+                    f'--export-filename={render_path}',
                     '--export-height=512',
                     str(svg_path)
                 ],
-                capture_output=True,
-                text=True,
-                check=True
+                timeout=DEFAULT_RENDER_TIMEOUT,
+                memory_limit=DEFAULT_RENDER_MEMORY_LIMIT
             )
             
             # Read the PNG file and return as bytes
-            with open(png_path, 'rb') as f:
-                return f.read()
+            try:
+                with open(render_path, 'rb') as f:
+                    return f.read()
+            finally:
+                render_path.unlink(missing_ok=True)
         else:
-            if not CAIROSVG_AVAILABLE:
-                raise ImportError("cairosvg is not available. Use Inkscape instead.")
+            try:
+                import cairosvg
+            except (ImportError, OSError) as e:
+                raise ImportError("cairosvg is not available. Use Inkscape instead.") from e
             return cairosvg.svg2png(url=str(svg_path), output_height=512)
 
     except Exception as e:
-        print(f"Failed to convert {svg_path} to PNG: {e}")
+        print(f"Failed to convert {source_path} to PNG: {e}")
         raise e
-
-def save_image_as_webp(image_path: Path, webp_path: Path):
-    """Convert an image (PNG or other) to WEBP."""
+    finally:
+        if svg_path != source_path:
+            svg_path.unlink(missing_ok=True)
+
+def report_svg_complexity(svg_path: Path):
+    """Warn about submitted SVGs that will be slow to render or heavy to serve."""
+    flags = complexity_flags(analyze_svg(svg_path))
+    for flag in flags:
+        print(f"⚠ {svg_path.name}: {flag}")
+    return flags
+
+def save_image_as_webp(image_path: Path, webp_path: Path, extra_formats: list = ()):
+    """Convert an image (PNG or other) to WEBP and any extra formats, decoding it once."""
+    from PIL import Image
+    from image_formats import encode_as, output_path
+    from reproducible import encode_webp
     try:
         image = Image.open(image_path).convert("RGBA")
-        image.save(webp_path, format='WEBP')
+        write_if_changed(webp_path, encode_webp(image))
+        for name in extra_formats:
+            extra_path = output_path(name, webp_path.stem)
+            extra_path.parent.mkdir(parents=True, exist_ok=True)
+            write_if_changed(extra_path, encode_as(image, name))
+            print(f"Converted {name.upper()}: {extra_path}")
 
     except Exception as e:
         print(f"Failed to convert {image_path} to WEBP: {e}")
         raise e
 
-def main(type: str, action: IssueFormType, issue_form: str):
-    icon = iconFactory(type, issue_form, action)
-    convertions = icon.convertions()
-
-    for convertion in convertions:
-        svg_path = SVG_DIR / f"{convertion.name}.svg"
-        png_path = PNG_DIR / f"{convertion.name}.png"
-        webp_path = WEBP_DIR / f"{convertion.name}.webp"
+def outputs_match_source(type: str, image: bytes, svg_path: Path, png_path: Path, webp_path: Path) -> bool:
+    """Whether the files on disk were generated from exactly this downloaded source."""
+    if not (png_path.exists() and webp_path.exists()):
+        return False
+    if type == "svg":
+        return svg_path.exists() and svg_path.read_bytes() == image
+    return png_path.read_bytes() == strip_png_chunks(image)
+
+def generate_convertion(type: str, convertion, extra_formats: list = ()) -> str:
+    """Download one source of an icon and write its files; returns 'converted' or 'unchanged'."""
+    svg_path = SVG_DIR / f"{convertion.name}.svg"
+    png_path = PNG_DIR / f"{convertion.name}.png"
+    webp_path = WEBP_DIR / f"{convertion.name}.webp"
+
+    imageBytes, changed = request_image(convertion.source)
+    if not changed and outputs_match_source(type, imageBytes, svg_path, png_path, webp_path):
+        print(f"Unchanged source: {convertion.source}")
+        return 'unchanged'
+
+    if type == "svg":
+        save_image(imageBytes, svg_path)
+        print(f"Downloaded SVG: {svg_path}")
+        report_svg_complexity(svg_path)
+
+        # Use Inkscape by default
+        png_data = convert_svg_to_png(svg_path, png_path, use_inkscape=True)
+        if not write_if_changed(png_path, strip_png_chunks(png_data)):
+            print(f"Unchanged PNG: {png_path}")
+        else:
+            print(f"Converted PNG: {png_path}")
 
-        imageBytes = request_image(convertion.source)
+    if type == "png":
+        write_if_changed(png_path, strip_png_chunks(imageBytes))
+        print(f"Downloaded PNG: {png_path}")
 
-        if icon.type == "svg":
-            save_image(imageBytes, svg_path)
-            print(f"Downloaded SVG: {svg_path}")
+    save_image_as_webp(png_path, webp_path, extra_formats)
+    print(f"Converted WEBP: {webp_path}")
+    return 'converted'
 
-            # Use Inkscape by default
-            png_data = convert_svg_to_png(svg_path, png_path, use_inkscape=True)
-            save_image(png_data, png_path)
-            print(f"Converted PNG: {png_path}")
+def generate_icons(icon, extra_formats: list = ()):
+    """Download the sources of an icon and write its SVG, PNG, WEBP and extra format files."""
+    # Ensure the output folders exist
+    PNG_DIR.mkdir(parents=True, exist_ok=True)
+    WEBP_DIR.mkdir(parents=True, exist_ok=True)
 
-        if icon.type == "png":
-            save_image(imageBytes, png_path)
-            print(f"Downloaded PNG: {png_path}")
-            
+    for convertion in icon.convertions():
+        generate_convertion(icon.type, convertion, extra_formats)
 
-        save_image_as_webp(png_path, webp_path)
-        print(f"Converted WEBP: {webp_path}")
+def main(type: str, action: IssueFormType, issue_form: str):
+    from image_formats import parse_formats
+    icon = iconFactory(type, issue_form, action)
+    generate_icons(icon, parse_formats(os.getenv(EXTRA_FORMATS_ENV_VAR)))
 
 
 if (__name__ == "__main__"):
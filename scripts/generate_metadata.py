@@ -1,6 +1,10 @@
 from pathlib import Path
 import json
 
+from metadata import file_signature, save_index_signatures
+from metadata_bundles import print_summary, write_bundles, BUNDLE_DIR
+from validate_metadata import print_violations, validate_all
+
 ROOT_DIR = Path(__file__).resolve().parent.parent
 META_DIR = ROOT_DIR / "meta"
 
@@ -18,16 +22,28 @@ def read_meta_for(icon_name):
     return None
 
 def generate_meta_json():
+    violations, checked, _ = validate_all()
+    if violations:
+        print_violations(violations)
+        print(f"⚠ {len(violations)} of {checked} meta files violate the metadata schema")
     icon_names = get_icon_names()
     fullMeta = dict()
+    signatures = dict()
     for icon_name in icon_names:
+        # Taken before reading, so a file changed meanwhile no longer matches its signature
+        signature = file_signature(META_DIR / f"{icon_name}.json")
         meta = read_meta_for(icon_name)
         if meta is None:
             print(f"Missing metadata for {icon_name}")
             continue
         fullMeta[icon_name] = meta
+        signatures[icon_name] = signature
     with open(ROOT_DIR / "metadata.json", 'w', encoding='UTF-8') as f:
         json.dump(fullMeta, f, indent=4)
+    # Lets load_metadata serve the entries of unchanged meta files from metadata.json
+    save_index_signatures(signatures, ROOT_DIR / "metadata.json")
+    # Minified per-prefix shards, so clients can fetch a few entries instead of the whole file
+    print_summary(*write_bundles(fullMeta), BUNDLE_DIR)
         
 if (__name__ == "__main__"):
     generate_meta_json()
\ No newline at end of file
@@ -15,11 +15,10 @@ AUTHOR_LOGIN_ENV_VAR = "INPUT_ISSUE_AUTHOR_LOGIN"
 ROOT_DIR = Path(__file__).resolve().parent.parent
 META_DIR = ROOT_DIR / "meta"
 
-# Ensure the output folders exist
-META_DIR.mkdir(parents=True, exist_ok=True)
-
-def main(type: str, action: IssueFormType, issue_form: str, author_id: int, author_login: str):
-    icon = iconFactory(type, issue_form, action)
+def write_metadata_file(icon, action: IssueFormType, author_id: int, author_login: str):
+    """Write meta/<icon>.json for an icon built from an issue form."""
+    # Ensure the output folders exist
+    META_DIR.mkdir(parents=True, exist_ok=True)
     if (action == IssueFormType.METADATA_UPDATE):
         existing_metadata = load_metadata(icon.name)
         author_id = existing_metadata["author"]["id"]
@@ -31,6 +30,10 @@ def main(type: str, action: IssueFormType, issue_form: str, author_id: int, auth
     with open(FILE_PATH, 'w', encoding='UTF-8') as f:
         json.dump(metadata, f, indent=2)
 
+def main(type: str, action: IssueFormType, issue_form: str, author_id: int, author_login: str):
+    icon = iconFactory(type, issue_form, action)
+    write_metadata_file(icon, action, author_id, author_login)
+
 
 def parse_author_id():
     author_id_string = os.getenv(AUTHOR_ID_ENV_VAR)
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Only cheap modules are imported here. Each subcommand imports what it needs when it runs,
+# so parsing a form or printing an icon name never loads requests, Pillow or the converters.
+
+ISSUE_BODY_ENV_VAR = "INPUT_ISSUE_BODY"
+ISSUE_FORM_ENV_VAR = "INPUT_ISSUE_FORM"
+AUTHOR_ID_ENV_VAR = "INPUT_ISSUE_AUTHOR_ID"
+AUTHOR_LOGIN_ENV_VAR = "INPUT_ISSUE_AUTHOR_LOGIN"
+EXTRA_FORMATS_ENV_VAR = "ICON_EXTRA_FORMATS"
+
+FILE_TREE_FOLDERS = ['svg', 'png', 'webp', 'avif', 'jxl']
+
+
+def load_form(args):
+    """The parsed issue form: from --form, $INPUT_ISSUE_FORM (JSON) or the raw $INPUT_ISSUE_BODY."""
+    if args.form:
+        return json.loads(args.form)
+    form = os.getenv(ISSUE_FORM_ENV_VAR)
+    if form:
+        return json.loads(form)
+    body = os.getenv(ISSUE_BODY_ENV_VAR)
+    if body is None:
+        raise SystemExit(f"No issue form: pass --form or set {ISSUE_FORM_ENV_VAR} or {ISSUE_BODY_ENV_VAR}")
+    from parse_issue_form import parse_issue_form
+    return parse_issue_form(body)
+
+
+def build_icon(args):
+    from icons import checkAction, iconFactory
+    return iconFactory(args.type, load_form(args), checkAction(args.action))
+
+
+def parse_author_id():
+    author_id = os.getenv(AUTHOR_ID_ENV_VAR)
+    return int(author_id) if author_id is not None else None
+
+
+def write_github_output(name, value):
+    """Append a step output when running in GitHub Actions; a no-op elsewhere."""
+    output_file = os.getenv('GITHUB_OUTPUT')
+    if output_file:
+        with open(output_file, 'a', encoding='utf-8') as f:
+            f.write(f"{name}={value}\n")
+
+
+def command_parse_form(args):
+    print(json.dumps(load_form(args)))
+
+
+def step_icon_name(args, icon):
+    print(icon.name)
+    write_github_output('ICON_NAME', icon.name)
+
+
+def step_metadata_file(args, icon):
+    from generate_metadata_file import write_metadata_file
+    from icons import checkAction
+    write_metadata_file(icon, checkAction(args.action), parse_author_id(), os.getenv(AUTHOR_LOGIN_ENV_VAR))
+
+
+def step_icons(args, icon):
+    from generate_icons import generate_icons
+    from image_formats import parse_formats
+    generate_icons(icon, parse_formats(os.getenv(EXTRA_FORMATS_ENV_VAR)))
+
+
+def step_file_tree(args, icon=None):
+    from generate_file_tree import write_file_tree
+    from metadata import ROOT_DIR
+    write_file_tree([ROOT_DIR / folder for folder in args.folders])
+
+
+def step_metadata_index(args, icon=None):
+    from generate_metadata import generate_meta_json
+    generate_meta_json()
+
+
+# Pipeline steps in their default order: name -> step(args, icon)
+PIPELINE_STEPS = {
+    'metadata-file': step_metadata_file,
+    'icons': step_icons,
+    'file-tree': step_file_tree,
+    'metadata-index': step_metadata_index,
+    'icon-name': step_icon_name,
+}
+DEFAULT_PIPELINE_STEPS = ','.join(PIPELINE_STEPS)
+BATCH_STEPS = 'metadata-file,icons,file-tree,metadata-index'
+
+
+def command_pipeline(args):
+    """Run several workflow steps on one parsed form, in one process."""
+    steps = [step.strip() for step in args.steps.split(',') if step.strip()]
+    unknown = [step for step in steps if step not in PIPELINE_STEPS]
+    if unknown:
+        raise SystemExit(f"Unknown pipeline step(s): {', '.join(unknown)}; expected {', '.join(PIPELINE_STEPS)}")
+    # The icon is built once, before any step runs, so a metadata update reads the meta
+    # file as it was and not the one the metadata-file step writes
+    icon = build_icon(args)
+    for step in steps:
+        started = time.perf_counter()
+        PIPELINE_STEPS[step](args, icon)
+        print(f"✓ {step} ({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+
+
+def command_batch(args):
+    """Validate every form of a JSONL file, then process the valid ones together."""
+    from batch_forms import FORM_STEPS, load_batch, print_summary, run_batch, summarize, validate_batch
+    steps = [step.strip() for step in args.steps.split(',') if step.strip()]
+    unknown = [step for step in steps if step not in PIPELINE_STEPS or step == 'icon-name']
+    if unknown:
+        raise SystemExit(f"Unknown batch step(s): {', '.join(unknown)}; expected {BATCH_STEPS}")
+
+    entries = load_batch(args.file)
+    valid = validate_batch(entries)
+    run = bool(valid) and (len(valid) == len(entries) or args.skip_invalid)
+    if run:
+        from image_formats import parse_formats
+        run_batch(entries, [step for step in steps if step in FORM_STEPS],
+                  parse_formats(os.getenv(EXTRA_FORMATS_ENV_VAR)), args.workers)
+        # Shared outputs are rebuilt once, after every form was processed
+        for step in steps:
+            if step not in FORM_STEPS:
+                started = time.perf_counter()
+                PIPELINE_STEPS[step](args)
+                print(f"✓ {step} ({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+    elif len(valid) != len(entries):
+        print("Nothing was processed because some forms are invalid; fix them or pass --skip-invalid.\n")
+
+    rows = summarize(entries, ran=run)
+    print_summary(rows)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    write_github_output('ICON_NAMES', ' '.join(row['name'] for row in rows if row['status'] == 'ok'))
+    sys.exit(0 if all(row['status'] == 'ok' for row in rows) else 1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Dashboard icons workflow commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def icon_command(name, step, help):
+        from_form = subparsers.add_parser(name, help=help)
+        from_form.add_argument('type', choices=['normal', 'monochrome'], help='Icon type')
+        from_form.add_argument('action', choices=['addition', 'update', 'metadata_update'], help='Issue form type')
+        from_form.add_argument('--form', help=f'Parsed issue form JSON (default: ${ISSUE_FORM_ENV_VAR}, else parse ${ISSUE_BODY_ENV_VAR})')
+        from_form.set_defaults(handler=lambda args: step(args, build_icon(args)))
+        return from_form
+
+    parse_form = subparsers.add_parser('parse-form', help=f'Parse ${ISSUE_BODY_ENV_VAR} and print the form as JSON')
+    parse_form.add_argument('--form', help=argparse.SUPPRESS)
+    parse_form.set_defaults(handler=command_parse_form)
+    icon_command('icon-name', step_icon_name, 'Print the icon name of a form')
+    icon_command('metadata-file', step_metadata_file, 'Write meta/<icon>.json from a form')
+    icon_command('icons', step_icons, 'Download and convert the icon files of a form')
+    pipeline = icon_command('pipeline', None, 'Run several steps on one parsed form')
+    pipeline.set_defaults(handler=command_pipeline)
+    pipeline.add_argument('--steps', default=DEFAULT_PIPELINE_STEPS,
+                          help=f'Comma-separated steps, in order (default: {DEFAULT_PIPELINE_STEPS})')
+    pipeline.add_argument('--folders', nargs='+', default=FILE_TREE_FOLDERS,
+                          help=f'Folders listed by the file-tree step (default: {" ".join(FILE_TREE_FOLDERS)})')
+
+    batch = subparsers.add_parser('batch', help='Process a JSONL file of issue forms, each with its type and action')
+    batch.add_argument('file', help='JSONL file: one {"type", "action", "form" or "body", "author", "issue"} object per line')
+    batch.add_argument('--steps', default=BATCH_STEPS,
+                       help=f'Comma-separated steps; metadata-file and icons run per form, the others once (default: {BATCH_STEPS})')
+    batch.add_argument('--workers', type=int, help='Parallel downloads and conversions (default: CPU count)')
+    batch.add_argument('--skip-invalid', action='store_true',
+                       help='Process the valid forms even if others are invalid (default: process none)')
+    batch.add_argument('--summary', metavar='PATH', help='Also write the per-form results as JSON')
+    batch.add_argument('--folders', nargs='+', default=FILE_TREE_FOLDERS,
+                       help=f'Folders listed by the file-tree step (default: {" ".join(FILE_TREE_FOLDERS)})')
+    batch.set_defaults(handler=command_batch)
+
+    file_tree = subparsers.add_parser('file-tree', help='Write tree.json for the output folders')
+    file_tree.add_argument('folders', nargs='*', default=FILE_TREE_FOLDERS)
+    file_tree.set_defaults(handler=step_file_tree)
+    metadata_index = subparsers.add_parser('metadata-index', help='Rebuild metadata.json from meta/')
+    metadata_index.set_defaults(handler=step_metadata_index)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
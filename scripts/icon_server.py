@@ -0,0 +1,407 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import OrderedDict
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Lock
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+from image_formats import EXTRA_FORMATS, format_available, save_as
+from reproducible import encode_webp
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT_DIR / ".cache" / "icon-server"
+
+CONTENT_TYPES = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jxl': 'image/jxl',
+}
+SERVED_FOLDERS = ('svg', 'png', 'webp') + tuple(EXTRA_FORMATS)
+# Precompressed sidecars next to a file (foo.svg.br, foo.svg.gz), in order of preference
+SIDECARS = (('br', '.br'), ('gzip', '.gz'))
+
+# Generated sizes are output heights in pixels, like --export-height of the prebuilt PNGs
+MIN_SIZE = 16
+MAX_SIZE = 1024
+DEFAULT_MEMORY_CACHE_MB = 64
+DEFAULT_DISK_CACHE_MB = 512
+DEFAULT_MAX_AGE = 86400
+
+_NAME = re.compile(r'^[a-z0-9][a-z0-9._-]*$')
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MemoryLRU:
+    """Byte-bounded in-memory LRU cache of encoded responses."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, data, etag):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[0])
+            self._entries[key] = (data, etag)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+class DiskLRU:
+    """Byte-bounded on-disk LRU cache; survives restarts and is ordered by file mtime."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._lock = Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with os.scandir(self.directory) as entries:
+            files = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                           for entry in entries if entry.is_file() and not entry.name.endswith('.tmp'))
+        for _, name, size in files:
+            self._entries[name] = size
+            self.bytes += size
+
+    @staticmethod
+    def _file_name(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        name = self._file_name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        try:
+            data = (self.directory / name).read_bytes()
+            os.utime(self.directory / name)
+        except FileNotFoundError:
+            with self._lock:
+                self.bytes -= self._entries.pop(name, 0)
+            return None
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        name = self._file_name(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self.directory / name)
+        with self._lock:
+            self.bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self.bytes -= size
+                (self.directory / evicted).unlink(missing_ok=True)
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into the set of acceptable codings."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and not re.fullmatch(r'\s*q\s*=\s*0(\.0*)?\s*', params):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def strong_etag(data):
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+class IconStore:
+    """Serve prebuilt icons and generate resized or transcoded variants on demand.
+
+    Generated variants are cached in memory and on disk, keyed by the source file's size and
+    mtime, so an updated icon is never served stale. Concurrent requests for the same
+    uncached variant wait for a single encode instead of each doing the work.
+    """
+
+    def __init__(self, root=ROOT_DIR, memory_bytes=DEFAULT_MEMORY_CACHE_MB << 20,
+                 disk_bytes=DEFAULT_DISK_CACHE_MB << 20, cache_dir=CACHE_DIR):
+        self.root = Path(root)
+        self.memory = MemoryLRU(memory_bytes)
+        self.disk = DiskLRU(cache_dir, disk_bytes) if disk_bytes else None
+        self.formats = {'png': 'PNG', 'webp': 'WEBP'}
+        self.formats.update({name: name for name in EXTRA_FORMATS if format_available(name)})
+        self.stats = {'static': 0, 'memory_hits': 0, 'disk_hits': 0, 'encodes': 0, 'not_modified': 0}
+        self._etags = {}  # (path, size, mtime_ns) -> ETag of a static file
+        self._inflight = {}
+        self._lock = Lock()
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def static(self, folder, file_name, accept_encoding):
+        """Return (path, content encoding or None, ETag, stat) of a file on disk."""
+        path = self.root / folder / file_name
+        accepted = accepted_encodings(accept_encoding)
+        candidates = [(encoding, path.with_name(path.name + suffix)) for encoding, suffix in SIDECARS
+                      if encoding in accepted]
+        for encoding, candidate in candidates + [(None, path)]:
+            try:
+                stat = os.stat(candidate)
+            except FileNotFoundError:
+                continue
+            signature = (str(candidate), stat.st_size, stat.st_mtime_ns)
+            etag = self._etags.get(signature)
+            if etag is None:
+                etag = strong_etag(candidate.read_bytes())
+                if len(self._etags) > 100_000:
+                    self._etags.clear()  # Drop entries of files that changed since they were hashed
+                self._etags[signature] = etag
+            self.count('static')
+            return candidate, encoding, etag, stat
+        raise RequestError(HTTPStatus.NOT_FOUND, f"{folder}/{file_name} not found")
+
+    def _source(self, stem):
+        # The full-size PNG is the best raster source; PNG-only icons have one too
+        for folder, extension in (('png', 'png'), ('webp', 'webp')):
+            path = self.root / folder / f"{stem}.{extension}"
+            try:
+                return path, os.stat(path)
+            except FileNotFoundError:
+                continue
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No raster source for '{stem}'")
+
+    def variant(self, stem, size, output_format):
+        """Return (bytes, ETag) of an icon at `size` pixels high in `output_format`."""
+        source, stat = self._source(stem)
+        key = f"{stem}|{size}|{output_format}|{stat.st_size}|{stat.st_mtime_ns}"
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.count('memory_hits')
+            return cached
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = Lock()
+        try:
+            with inflight:
+                cached = self.memory.get(key)
+                if cached is not None:
+                    self.count('memory_hits')
+                    return cached
+                data = self.disk.get(key) if self.disk else None
+                if data is not None:
+                    self.count('disk_hits')
+                else:
+                    data = self._encode(source, size, output_format)
+                    self.count('encodes')
+                    if self.disk:
+                        self.disk.put(key, data)
+                entry = (data, strong_etag(data))
+                self.memory.put(key, *entry)
+        finally:
+            # Also after a failed encode, so the next request tries again with a fresh lock
+            with self._lock:
+                self._inflight.pop(key, None)
+        return entry
+
+    def _encode(self, source, size, output_format):
+        try:
+            with Image.open(source) as opened:
+                image = opened.convert("RGBA")
+        except (OSError, ValueError, SyntaxError) as e:
+            # The icon exists but its file is broken: a server-side problem, not a bad request
+            raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, f"Cannot decode {source.parent.name}/{source.name}") from e
+        if size and size < image.height:
+            image = image.resize((max(1, round(image.width * size / image.height)), size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if output_format in EXTRA_FORMATS:
+            save_as(image, output_format, buffer)
+        elif output_format == 'webp':
+            buffer.write(encode_webp(image))
+        else:
+            image.save(buffer, format=self.formats[output_format])
+        return buffer.getvalue()
+
+
+class IconRequestHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /<folder>/<name>.<ext>[?size=N][&format=F] against the IconStore of the server."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DashboardIconServer/1.0'
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        store = self.server.store
+        try:
+            url = urlsplit(self.path)
+            if url.path == '/_stats':
+                body = json.dumps(dict(store.stats, memory_bytes=store.memory.bytes,
+                                       disk_bytes=store.disk.bytes if store.disk else 0)).encode()
+                self.respond(HTTPStatus.OK, 'application/json', body, None, send_body, cache=False)
+                return
+
+            parts = url.path.strip('/').split('/')
+            if len(parts) != 2 or parts[0] not in SERVED_FOLDERS or not _NAME.match(parts[1]):
+                raise RequestError(HTTPStatus.NOT_FOUND, "Not found")
+            folder, file_name = parts
+            stem, _, extension = file_name.rpartition('.')
+            if extension not in CONTENT_TYPES:
+                raise RequestError(HTTPStatus.NOT_FOUND, "Not found")
+
+            query = parse_qs(url.query)
+            output_format = query.get('format', [extension])[0].lower()
+            size = query.get('size', [None])[0]
+            if size is not None:
+                if not size.isdigit() or not MIN_SIZE <= int(size) <= MAX_SIZE:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, f"size must be between {MIN_SIZE} and {MAX_SIZE}")
+                size = int(size)
+
+            if size is None and output_format == extension:
+                self.send_static(store, folder, file_name, send_body)
+                return
+            if output_format not in store.formats:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Cannot generate '{output_format}', available: {', '.join(store.formats)}")
+            data, etag = store.variant(stem, size, output_format)
+            self.respond(HTTPStatus.OK, CONTENT_TYPES[output_format], data, etag, send_body)
+        except RequestError as e:
+            if e.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                print(f"Error serving {self.path}: {e} ({e.__cause__!r})", file=sys.stderr)
+            self.send_error(e.status, str(e))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            print(f"Error serving {self.path}: {e!r}", file=sys.stderr)
+            try:
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def not_modified(self, etag):
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match or not etag:
+            return False
+        return if_none_match.strip() == '*' or etag in (tag.strip() for tag in if_none_match.split(','))
+
+    def send_cache_headers(self, etag, cache=True, vary=False):
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f"public, max-age={self.server.max_age}" if cache else 'no-store')
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def respond(self, status, content_type, body, etag, send_body, cache=True):
+        if self.not_modified(etag):
+            self.server.store.count('not_modified')
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_cache_headers(etag, cache)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cache_headers(etag, cache)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_static(self, store, folder, file_name, send_body):
+        accept_encoding = self.headers.get('Accept-Encoding', '')
+        path, encoding, etag, stat = store.static(folder, file_name, accept_encoding)
+        vary = any(path.with_name(path.name + suffix).exists() for _, suffix in SIDECARS) or encoding is not None
+        if self.not_modified(etag):
+            store.count('not_modified')
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_cache_headers(etag, vary=vary)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', CONTENT_TYPES[file_name.rpartition('.')[2]])
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(stat.st_size))
+        self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        self.send_cache_headers(etag, vary=vary)
+        self.end_headers()
+        if send_body:
+            with open(path, 'rb') as f:
+                self.wfile.write(f.read())
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def create_server(host, port, store, max_age=DEFAULT_MAX_AGE, verbose=False):
+    """Create (but do not start) a threaded icon server bound to host:port."""
+    server = ThreadingHTTPServer((host, port), IconRequestHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.max_age = max_age
+    server.verbose = verbose
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve icons, resizing and transcoding them on demand')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--memory-cache', type=int, default=DEFAULT_MEMORY_CACHE_MB, metavar='MB',
+                       help=f'In-memory cache size for generated variants (default: {DEFAULT_MEMORY_CACHE_MB})')
+    parser.add_argument('--disk-cache', type=int, default=DEFAULT_DISK_CACHE_MB, metavar='MB',
+                       help=f'On-disk cache size for generated variants, 0 disables it (default: {DEFAULT_DISK_CACHE_MB})')
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR, help='On-disk cache directory')
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE, help='Cache-Control max-age in seconds')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    store = IconStore(ROOT_DIR, args.memory_cache << 20, args.disk_cache << 20, args.cache_dir)
+    server = create_server(args.host, args.port, store, args.max_age, args.verbose)
+    print(f"Serving {', '.join(SERVED_FOLDERS)} on http://{args.host}:{server.server_address[1]} "
+          f"(generated formats: {', '.join(store.formats)}). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.server_close()
@@ -95,7 +95,8 @@ class MonochromeIcon(Icon):
                 "light": f"{metadata['colors']['light']}",
                 "dark": f"{metadata['colors']['dark']}"
             }
-        except:
+        except (ValueError, KeyError, TypeError):
+            # New icons, and icons without color variants, use the default naming
             return {
                 "light": f"{self.name}",
                 "dark": f"{self.name}-dark"
@@ -171,23 +172,25 @@ class IssueFormType(Enum):
     UPDATE = "update"
     METADATA_UPDATE = "metadata_update"
 
-def iconFactory(type: str, issue_form: str, issue_form_type: IssueFormType):
+def iconFactory(type: str, issue_form, issue_form_type: IssueFormType):
+    """Build an icon from an issue form, given as its JSON string or as the parsed dict."""
+    form = json.loads(issue_form) if isinstance(issue_form, str) else issue_form
     if type == "normal":
         if (issue_form_type == IssueFormType.ADDITION):
-            return NormalIcon.from_addition_issue_form(json.loads(issue_form))
+            return NormalIcon.from_addition_issue_form(form)
         elif (issue_form_type == IssueFormType.UPDATE):
-            return NormalIcon.from_update_issue_form(json.loads(issue_form))
+            return NormalIcon.from_update_issue_form(form)
         elif (issue_form_type == IssueFormType.METADATA_UPDATE):
-            return NormalIcon.from_metadata_update_issue_form(json.loads(issue_form))
+            return NormalIcon.from_metadata_update_issue_form(form)
         else:
             raise ValueError(f"Invalid issue form type: '{issue_form_type}'")
     elif type == "monochrome":
         if (issue_form_type == IssueFormType.ADDITION):
-            return MonochromeIcon.from_addition_issue_form(json.loads(issue_form))
+            return MonochromeIcon.from_addition_issue_form(form)
         elif (issue_form_type == IssueFormType.UPDATE):
-            return MonochromeIcon.from_update_issue_form(json.loads(issue_form))
+            return MonochromeIcon.from_update_issue_form(form)
         elif (issue_form_type == IssueFormType.METADATA_UPDATE):
-            return MonochromeIcon.from_metadata_update_issue_form(json.loads(issue_form))
+            return MonochromeIcon.from_metadata_update_issue_form(form)
         else:
             raise ValueError(f"Invalid issue form type: '{issue_form_type}'")
     raise ValueError(f"Invalid icon type: '{type}'")
@@ -0,0 +1,64 @@
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+# Pillow 11.3+ encodes AVIF natively; older versions need pillow-avif-plugin. JPEG XL is only
+# available through pillow-jxl-plugin. Both plugins register their format on import.
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+try:
+    import pillow_jxl  # noqa: F401
+except ImportError:
+    pass
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Optional output formats encoded from the same raster as the WEBP:
+# name -> (output folder, Pillow format, encoder options)
+EXTRA_FORMATS = {
+    'avif': (ROOT_DIR / "avif", 'AVIF', {'quality': 70, 'speed': 6}),
+    'jxl': (ROOT_DIR / "jxl", 'JXL', {'quality': 85, 'effort': 7}),
+}
+
+
+def format_available(name):
+    """Whether Pillow can encode an extra format in this environment."""
+    Image.init()  # Pillow registers its own encoders lazily
+    return EXTRA_FORMATS[name][1] in Image.SAVE
+
+
+def parse_formats(value):
+    """Parse a comma-separated list of extra format names, dropping unavailable ones with a warning."""
+    formats = []
+    for name in (part.strip().lower() for part in (value or '').split(',')):
+        if not name:
+            continue
+        if name not in EXTRA_FORMATS:
+            raise ValueError(f"Unknown output format '{name}', expected one of {', '.join(EXTRA_FORMATS)}")
+        if not format_available(name):
+            print(f"⚠ Skipping {name.upper()} output: no encoder available (install pillow-{name}-plugin)", file=sys.stderr)
+            continue
+        formats.append(name)
+    return formats
+
+
+def output_path(name, icon_name):
+    """Path of an icon's output in an extra format."""
+    return EXTRA_FORMATS[name][0] / f"{icon_name}.{name}"
+
+
+def save_as(image, name, path):
+    """Encode an already decoded RGBA image in an extra format."""
+    _, pillow_format, options = EXTRA_FORMATS[name]
+    image.save(path, format=pillow_format, **options)
+
+
+def encode_as(image, name):
+    """Encode an already decoded RGBA image in an extra format and return the bytes."""
+    buffer = io.BytesIO()
+    save_as(image, name, buffer)
+    return buffer.getvalue()
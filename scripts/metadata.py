@@ -1,9 +1,128 @@
 import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+META_DIR = ROOT_DIR / "meta"
+METADATA_FILE = ROOT_DIR / "metadata.json"
+# Signatures of the meta files metadata.json was built from, written by generate_metadata.py
+INDEX_SIGNATURES_FILE = ROOT_DIR / ".cache" / "metadata-index.json"
 
-def load_metadata(icon_name: str) -> dict:
+
+def file_signature(path):
+    """Return (size, mtime_ns) of a file, or None if it does not exist."""
     try:
-        with open(f"meta/{icon_name}.json", "r") as f:
-            return json.load(f)
+        stat = os.stat(path)
     except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def save_index_signatures(signatures, index_file=METADATA_FILE, signatures_file=INDEX_SIGNATURES_FILE):
+    """Record {icon name: file_signature} of the meta files an index was just built from.
+
+    The record is tied to the index file's own signature, so it stops applying as soon as
+    the index is rewritten by anything else.
+    """
+    signatures_file = Path(signatures_file)
+    signatures_file.parent.mkdir(parents=True, exist_ok=True)
+    data = {'index': file_signature(index_file), 'files': signatures}
+    fd, temp_path = tempfile.mkstemp(dir=signatures_file.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp_path, signatures_file)
+
+
+class MetadataStore:
+    """Look up icon metadata by name, resolving files from the repository root.
+
+    Parsed meta/*.json entries are kept in an LRU cache and read again when a file's size
+    or mtime changes. With an `index_file` (normally metadata.json), lookups are served from
+    one read of that index, but only for icons whose meta file still has the size and mtime
+    recorded in `signatures_file` when the index was built; any other icon, including one
+    written since, is read from meta/.
+
+    Entries are shared between callers and must not be modified.
+    """
+
+    def __init__(self, meta_dir=META_DIR, index_file=None, signatures_file=INDEX_SIGNATURES_FILE, max_entries=512):
+        self.meta_dir = Path(meta_dir)
+        self.index_file = Path(index_file) if index_file else None
+        self.signatures_file = Path(signatures_file)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # icon name -> (signature, metadata)
+        self._index = {}
+        self._index_files = {}  # icon name -> [size, mtime_ns] of its meta file when the index was built
+        self._index_signature = None
+        self._lock = Lock()
+
+    def _load_index(self):
+        signature = (file_signature(self.index_file), file_signature(self.signatures_file))
+        if signature != self._index_signature:
+            self._index, self._index_files = {}, {}
+            try:
+                with open(self.signatures_file, 'r', encoding='utf-8') as f:
+                    recorded = json.load(f)
+                # Signatures recorded for another version of the index say nothing about this one
+                if signature[0] is not None and recorded.get('index') == list(signature[0]):
+                    with open(self.index_file, 'r', encoding='utf-8') as f:
+                        self._index = json.load(f)
+                    self._index_files = recorded.get('files', {})
+            except (OSError, ValueError, AttributeError):
+                self._index, self._index_files = {}, {}
+            self._index_signature = signature
+
+    def _load_meta(self, icon_name):
+        path = self.meta_dir / f"{icon_name}.json"
+        signature = file_signature(path)
+        cached = self._entries.get(icon_name)
+        if cached is not None and cached[0] == signature:
+            self._entries.move_to_end(icon_name)
+            return cached[1]
+        if signature is None:
+            self._entries.pop(icon_name, None)
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        self._entries[icon_name] = (signature, metadata)
+        self._entries.move_to_end(icon_name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return metadata
+
+    def find(self, icon_name: str):
+        """Return the metadata of an icon, or None if it does not exist."""
+        with self._lock:
+            if self.index_file is not None:
+                self._load_index()
+                recorded = self._index_files.get(icon_name)
+                if (recorded is not None and icon_name in self._index
+                        and list(file_signature(self.meta_dir / f"{icon_name}.json") or ()) == recorded):
+                    return self._index[icon_name]
+            return self._load_meta(icon_name)
+
+    def get(self, icon_name: str) -> dict:
+        """Return the metadata of an icon; raises ValueError if it does not exist."""
+        metadata = self.find(icon_name)
+        if metadata is None:
             raise ValueError(f"Icon '{icon_name}' does not exist")
+        return metadata
+
+    def invalidate(self, icon_name: str = None):
+        """Drop one cached entry (or all of them, including the index)."""
+        with self._lock:
+            if icon_name is None:
+                self._entries.clear()
+                self._index, self._index_files, self._index_signature = {}, {}, None
+            else:
+                self._entries.pop(icon_name, None)
+
+
+default_store = MetadataStore(index_file=METADATA_FILE)
+
+
+def load_metadata(icon_name: str) -> dict:
+    return default_store.get(icon_name)
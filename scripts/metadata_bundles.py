@@ -0,0 +1,175 @@
+import argparse
+import hashlib
+import json
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+
+from reproducible import write_if_changed
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+METADATA_FILE = ROOT_DIR / "metadata.json"
+BUNDLE_DIR = ROOT_DIR / "metadata"
+INDEX_NAME = "index.json"
+
+# Bump when the shard or index layout changes, so clients can tell the formats apart
+BUNDLE_VERSION = 1
+DEFAULT_PREFIX_LENGTH = 1
+UNCATEGORIZED = "_uncategorized"
+# Hex digits of the content hash clients can use to cache-bust a shard
+HASH_LENGTH = 16
+
+_UNSAFE_KEY = re.compile(r'[^a-z0-9-]')
+
+
+def shard_key(text):
+    """File-name-safe shard key: lowercase letters, digits and dashes; anything else becomes '_'."""
+    return _UNSAFE_KEY.sub('_', text.lower()) or '_'
+
+
+def split_by_prefix(metadata, prefix_length=DEFAULT_PREFIX_LENGTH):
+    """Group entries by the first `prefix_length` characters of the icon name."""
+    shards = {}
+    for name in sorted(metadata):
+        shards.setdefault(shard_key(name[:prefix_length]), {})[name] = metadata[name]
+    return shards
+
+
+def split_by_category(metadata):
+    """Group entries by category; an icon appears in the shard of each of its categories."""
+    shards = {}
+    for name in sorted(metadata):
+        categories = metadata[name].get('categories') or [UNCATEGORIZED]
+        for category in {shard_key(category) for category in categories}:
+            shards.setdefault(category, {})[name] = metadata[name]
+    return shards
+
+
+def _cbor_head(major, value):
+    if value < 24:
+        return bytes([major << 5 | value])
+    for additional, size, fmt in ((24, 1, '>B'), (25, 2, '>H'), (26, 4, '>I'), (27, 8, '>Q')):
+        if value < 1 << (8 * size):
+            return bytes([major << 5 | additional]) + struct.pack(fmt, value)
+    raise ValueError(f"integer {value} does not fit in CBOR")
+
+
+def encode_cbor(value):
+    """Encode JSON-compatible data as CBOR (RFC 8949), keeping the key order of dicts."""
+    if value is None:
+        return b'\xf6'
+    if value is True:
+        return b'\xf5'
+    if value is False:
+        return b'\xf4'
+    if isinstance(value, int):
+        return _cbor_head(0, value) if value >= 0 else _cbor_head(1, -1 - value)
+    if isinstance(value, float):
+        return b'\xfb' + struct.pack('>d', value)
+    if isinstance(value, str):
+        encoded = value.encode('utf-8')
+        return _cbor_head(3, len(encoded)) + encoded
+    if isinstance(value, (list, tuple)):
+        return _cbor_head(4, len(value)) + b''.join(encode_cbor(item) for item in value)
+    if isinstance(value, dict):
+        return _cbor_head(5, len(value)) + b''.join(encode_cbor(str(key)) + encode_cbor(item)
+                                                    for key, item in value.items())
+    raise TypeError(f"cannot encode {type(value).__name__} as CBOR")
+
+
+def encode_json(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def load_index(bundle_dir):
+    """Shards recorded by the previous build in `bundle_dir`, or {} when it has none in this format."""
+    try:
+        with open(Path(bundle_dir) / INDEX_NAME, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index.get('shards', {}) if index.get('version') == BUNDLE_VERSION else {}
+
+
+def write_bundles(metadata, bundle_dir=BUNDLE_DIR, by='prefix', prefix_length=DEFAULT_PREFIX_LENGTH, cbor=False):
+    """Write minified metadata shards and their index; returns (written, unchanged, removed) file names.
+
+    Each shard holds the complete entries of its icons, sorted by name. The index maps every
+    shard key to its file, entry count, size and content hash, so a client downloads the
+    index and then only the shards it needs. A shard file is only rewritten when its content
+    changed, which keeps unchanged shards byte-identical (and cached by CDNs) across builds.
+    """
+    bundle_dir = Path(bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    shards = split_by_prefix(metadata, prefix_length) if by == 'prefix' else split_by_category(metadata)
+    encoders = {'.json': encode_json}
+    if cbor:
+        encoders['.cbor'] = encode_cbor
+
+    index = {'version': BUNDLE_VERSION, 'by': by}
+    if by == 'prefix':
+        index['prefix_length'] = prefix_length
+    index.update(icons=len(metadata), shards={})
+    previous = load_index(bundle_dir)
+    written, unchanged = [], []
+    for key, entries in sorted(shards.items()):
+        shard_info = {'count': len(entries)}
+        for extension, encode in encoders.items():
+            if extension != '.json':
+                previous_info = previous.get(key, {})
+                if (previous_info.get('json') == shard_info['json'] and extension[1:] in previous_info
+                        and (bundle_dir / previous_info[extension[1:]]['file']).exists()):
+                    # Same entries as the last build: the slower encodings need not run again
+                    shard_info[extension[1:]] = previous_info[extension[1:]]
+                    unchanged.append(previous_info[extension[1:]]['file'])
+                    continue
+            data = encode(entries)
+            file_name = f"{key}{extension}"
+            (written if write_if_changed(bundle_dir / file_name, data, compare_pixels=False) else unchanged).append(file_name)
+            shard_info[extension[1:]] = {'file': file_name, 'bytes': len(data),
+                                         'hash': hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}
+        index['shards'][key] = shard_info
+
+    for extension, encode in encoders.items():
+        file_name = f"index{extension}"
+        (written if write_if_changed(bundle_dir / file_name, encode(index), compare_pixels=False) else unchanged).append(file_name)
+
+    # Shards of prefixes or categories that no longer have icons, and a disabled encoding.
+    # Only files the previous index lists are removed: the folder may hold anything else.
+    current = set(written) | set(unchanged)
+    previous_files = {info['file'] for shard_info in previous.values() for info in shard_info.values()
+                      if isinstance(info, dict) and 'file' in info}
+    if previous:
+        previous_files.add('index.cbor')
+    removed = []
+    for file_name in sorted(previous_files - current):
+        path = bundle_dir / file_name
+        if path.parent == bundle_dir and path.is_file():
+            path.unlink()
+            removed.append(file_name)
+    return written, unchanged, removed
+
+
+def print_summary(written, unchanged, removed, bundle_dir):
+    print(f"Metadata bundles in {bundle_dir}: {len(written)} written, {len(unchanged)} unchanged, {len(removed)} removed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Split metadata.json into minified shards with an index, for lazy loading')
+    parser.add_argument('--out', type=Path, default=BUNDLE_DIR, help=f'Output folder (default: {BUNDLE_DIR.name}/)')
+    parser.add_argument('--by', choices=('prefix', 'category'), default='prefix',
+                       help='Shard by the start of the icon name (default) or by category')
+    parser.add_argument('--prefix-length', type=int, default=DEFAULT_PREFIX_LENGTH,
+                       help=f'Characters of the icon name that select its shard (default: {DEFAULT_PREFIX_LENGTH})')
+    parser.add_argument('--cbor', action='store_true', help='Also write every shard and the index as CBOR')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open(METADATA_FILE, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    written, unchanged, removed = write_bundles(metadata, args.out, args.by, args.prefix_length, args.cbor)
+    print_summary(written, unchanged, removed, args.out)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+    sys.exit(0)
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fs_snapshot import DirSnapshot
+from reproducible import strip_png_chunks, write_if_changed
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SVG_DIR = ROOT_DIR / "svg"
+PNG_DIR = ROOT_DIR / "png"
+SIZES_DIR = ROOT_DIR / "sizes"
+NORMALIZE_CACHE_FILE = ROOT_DIR / ".cache" / "png-normalize.json"
+
+# Same height as the Inkscape renders of SVG icons
+TARGET_HEIGHT = 512
+# Bump when the normalization itself changes, so cached results are not trusted any more
+NORMALIZE_VERSION = 1
+# Below this many icons the process pool costs more than it saves
+POOL_THRESHOLD = 16
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def png_only_names():
+    """Names of the PNG icons that have no SVG source."""
+    svg_stems = {name[:-4] for name in DirSnapshot(SVG_DIR).files if name.endswith('.svg')}
+    return sorted(name[:-4] for name in DirSnapshot(PNG_DIR).files
+                  if name.endswith('.png') and not name.startswith('.') and name[:-4] not in svg_stems)
+
+
+def normalize_image(image, height=TARGET_HEIGHT, padding=0.0, upscale=False):
+    """Trim transparent borders, add `padding` (a fraction of the height) and resample to `height`.
+
+    Smaller images are only enlarged with `upscale`: that makes every icon the same height,
+    but adds bytes without adding detail.
+    """
+    from PIL import Image
+    image = image.convert('RGBA')
+    bbox = image.getchannel('A').getbbox()
+    if bbox is None:
+        raise ValueError("image is fully transparent")
+    image = image.crop(bbox)
+    if padding:
+        margin = round(image.height * padding)
+        padded = Image.new('RGBA', (image.width + 2 * margin, image.height + 2 * margin), (0, 0, 0, 0))
+        padded.paste(image, (margin, margin))
+        image = padded
+    if image.height > height or (upscale and image.height < height):
+        width = max(1, round(image.width * height / image.height))
+        image = image.resize((width, height), Image.LANCZOS)
+    return image
+
+
+def to_srgb(image):
+    """Convert an image with an embedded color profile to sRGB, so dropping the profile keeps its colors."""
+    icc_profile = image.info.get('icc_profile')
+    if not icc_profile:
+        return image
+    try:
+        from PIL import ImageCms
+        source = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        mode = 'RGBA' if image.mode in ('RGBA', 'LA', 'P', 'PA') else 'RGB'
+        return ImageCms.profileToProfile(image.convert(mode), source, ImageCms.createProfile('sRGB'), outputMode=mode)
+    except Exception:
+        # No LittleCMS, or a broken profile: keep the pixels as they are
+        return image
+
+
+def encode_png(image):
+    """Encode as PNG without metadata, as an exact 256-color palette image when that is smaller."""
+    candidates = [image]
+    if image.getcolors(256) is not None:
+        # Only used when the palette reproduces every pixel exactly
+        palette = image.quantize(256)
+        if palette.convert('RGBA').tobytes() == image.tobytes():
+            candidates.append(palette)
+    encoded = []
+    for candidate in candidates:
+        buffer = io.BytesIO()
+        candidate.save(buffer, format='PNG', optimize=True)
+        encoded.append(strip_png_chunks(buffer.getvalue()))
+    return min(encoded, key=len)
+
+
+def normalize_file(job):
+    """Normalize one PNG in place (and its extra sizes); runs in a worker process.
+
+    Returns (name, source hash, output hash, written, message).
+    """
+    from PIL import Image
+    name, height, padding, upscale, sizes = job
+    path = PNG_DIR / f"{name}.png"
+    try:
+        data = path.read_bytes()
+        source_hash = hash_bytes(data)
+        with Image.open(io.BytesIO(data)) as opened:
+            image = normalize_image(to_srgb(opened), height, padding, upscale)
+            output = encode_png(image)
+            bbox = opened.convert('RGBA').getchannel('A').getbbox()
+            if not opened.info.get('icc_profile') and image.size == (bbox[2] - bbox[0], bbox[3] - bbox[1]):
+                # Only trimmed: cropping the source in its own mode keeps a palette or grayscale
+                # encoding, and an untrimmed source minus its metadata may be smaller still
+                buffer = io.BytesIO()
+                opened.crop(bbox).save(buffer, format='PNG', optimize=True)
+                output = min(output, strip_png_chunks(buffer.getvalue()), key=len)
+                if bbox == (0, 0) + opened.size:
+                    output = min(output, strip_png_chunks(data), key=len)
+        written = write_if_changed(path, output)
+        for size in sizes:
+            if size > image.height and not upscale:
+                continue
+            target = SIZES_DIR / str(size) / f"{name}.png"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            width = max(1, round(image.width * size / image.height))
+            write_if_changed(target, encode_png(image.resize((width, size), Image.LANCZOS)))
+        message = f"{len(data)} -> {len(output)} bytes, {image.width}x{image.height}"
+        return name, source_hash, hash_bytes(output), written, message
+    except Exception as e:
+        return name, None, None, False, f"failed: {e}"
+
+
+def load_cache():
+    try:
+        with open(NORMALIZE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    NORMALIZE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=NORMALIZE_CACHE_FILE.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    os.replace(temp_path, NORMALIZE_CACHE_FILE)
+
+
+def normalize_icons(names, height=TARGET_HEIGHT, padding=0.0, upscale=False, sizes=(), use_cache=True, workers=None):
+    """Normalize PNG-only icons whose content changed since they were last normalized.
+
+    A source is recognized by its content hash: a file that still holds the input or the
+    output of its last normalization with the same settings is not decoded again. Returns
+    (results, skipped) where results are the tuples of normalize_file for the processed icons.
+    """
+    settings = {'version': NORMALIZE_VERSION, 'height': height, 'padding': padding, 'upscale': upscale,
+                'sizes': sorted(sizes)}
+    cache = load_cache() if use_cache else {}
+    if cache.get('settings') != settings:
+        cache = {'settings': settings, 'icons': {}}
+    entries = cache['icons']
+
+    jobs = []
+    skipped = 0
+    for name in names:
+        path = PNG_DIR / f"{name}.png"
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entry = entries.get(name)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if entry and (entry['signature'] == signature or hash_bytes(path.read_bytes()) in (entry['source'], entry['output'])):
+            entry['signature'] = signature
+            skipped += 1
+            continue
+        jobs.append((name, height, padding, upscale, tuple(sizes)))
+
+    if len(jobs) >= POOL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(normalize_file, jobs, chunksize=8))
+    else:
+        results = [normalize_file(job) for job in jobs]
+
+    for name, source_hash, output_hash, _, _ in results:
+        if output_hash is None:
+            entries.pop(name, None)
+            continue
+        stat = (PNG_DIR / f"{name}.png").stat()
+        entries[name] = {'source': source_hash, 'output': output_hash, 'signature': [stat.st_size, stat.st_mtime_ns]}
+    if use_cache:
+        save_cache(cache)
+    return results, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Trim, resample and strip PNG-only icons (those without an SVG) in place')
+    parser.add_argument('names', nargs='*', help='Icons to normalize (default: every PNG-only icon)')
+    parser.add_argument('--height', type=int, default=TARGET_HEIGHT, help=f'Output height in pixels (default: {TARGET_HEIGHT})')
+    parser.add_argument('--padding', type=float, default=0.0,
+                       help='Transparent margin around the trimmed icon, as a fraction of its height (default: 0)')
+    parser.add_argument('--upscale', action='store_true',
+                       help='Also enlarge icons smaller than --height (default: only shrink larger ones)')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',') if size],
+                       default=[], help=f'Comma-separated extra heights written to {SIZES_DIR.name}/<height>/ (default: none)')
+    parser.add_argument('--no-cache', action='store_true', help='Normalize every icon, ignoring the source hash cache')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    names = args.names or png_only_names()
+    results, skipped = normalize_icons(names, args.height, args.padding, args.upscale, args.sizes,
+                                       not args.no_cache, args.workers)
+    failed = 0
+    for name, _, output_hash, written, message in results:
+        if output_hash is None:
+            failed += 1
+            print(f"⚠ {name}: {message}")
+        elif written:
+            print(f"Normalized {name}.png ({message})")
+    written = sum(1 for result in results if result[3])
+    print(f"Normalized {written} of {len(names)} PNG-only icons ({skipped} cached, "
+          f"{len(results) - written - failed} already normalized, {failed} failed) in {time.perf_counter() - started:.1f}s")
+    sys.exit(1 if failed else 0)
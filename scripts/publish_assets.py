@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fs_snapshot import DirSnapshot
+from image_formats import EXTRA_FORMATS
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DIST_DIR = ROOT_DIR / "dist"
+MANIFEST_NAME = "manifest.json"
+# Content hashes and retirement times of published files, kept next to the manifest
+STATE_NAME = ".publish-state.json"
+
+DEFAULT_FOLDERS = ["svg", "png", "webp"] + list(EXTRA_FORMATS)
+DEFAULT_RETENTION_DAYS = 7
+# Hex digits of the SHA-256 content hash used in fingerprinted names
+FINGERPRINT_LENGTH = 16
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprinted_name(logical_path, content_hash):
+    """Turn 'webp/foo.webp' into 'webp/foo.<hash>.webp'."""
+    stem, extension = os.path.splitext(logical_path)
+    return f"{stem}.{content_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def write_json_atomic(path, data, **options):
+    fd, temp_path = tempfile.mkstemp(dir=Path(path).parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **options)
+    os.replace(temp_path, path)
+
+
+def place_file(source, target, hardlink):
+    """Create `target` with the content of `source`, atomically, as a copy or a hard link."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target.with_name(f".{target.name}.tmp")
+    if temp_path.exists():
+        temp_path.unlink()
+    if hardlink:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+    else:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+
+def published_files(dist_dir):
+    """Relative paths of all fingerprinted files currently in the dist directory."""
+    files = set()
+    try:
+        with os.scandir(dist_dir) as entries:
+            folders = [entry.name for entry in entries if entry.is_dir()]
+    except FileNotFoundError:
+        return files
+    for folder in folders:
+        files.update(f"{folder}/{name}" for name in DirSnapshot(dist_dir / folder).files if not name.startswith('.'))
+    return files
+
+
+def load_state(dist_dir):
+    try:
+        with open(dist_dir / STATE_NAME, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state.get('sources', {}), state.get('retired', {})
+    except (OSError, ValueError, AttributeError):
+        return {}, {}
+
+
+def publish(dist_dir, folders, hardlink=False, retention_days=DEFAULT_RETENTION_DAYS, dry_run=False, workers=None):
+    """Publish every output under content-hash fingerprinted names and write the manifest.
+
+    Sources whose size and mtime are unchanged since the last publish are not hashed again,
+    and fingerprinted files that already exist are not rewritten. Files that drop out of the
+    manifest are retired and deleted once they have been unreferenced for `retention_days`,
+    so clients holding an older manifest keep working in the meantime.
+
+    Returns a dict of counts: published, unchanged, retired and deleted.
+    """
+    dist_dir = Path(dist_dir)
+    sources, retired = load_state(dist_dir)
+    now = time.time()
+
+    # List the source folders once and reuse hashes of unchanged files
+    current = {}
+    to_hash = []
+    for folder in folders:
+        for name, (size, mtime) in sorted(DirSnapshot(ROOT_DIR / folder).files.items()):
+            logical = f"{folder}/{name}"
+            cached = sources.get(logical)
+            if cached and cached['signature'] == [size, mtime]:
+                current[logical] = cached
+            else:
+                current[logical] = {'signature': [size, mtime], 'hash': None}
+                to_hash.append(logical)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for logical, content_hash in zip(to_hash, executor.map(lambda logical: hash_file(ROOT_DIR / logical), to_hash)):
+            current[logical]['hash'] = content_hash
+
+    manifest = {logical: fingerprinted_name(logical, entry['hash']) for logical, entry in current.items()}
+    referenced = set(manifest.values())
+    counts = {'published': 0, 'unchanged': 0, 'retired': 0, 'deleted': 0}
+
+    for logical, target in manifest.items():
+        target_path = dist_dir / target
+        if target_path.exists():
+            counts['unchanged'] += 1
+            continue
+        counts['published'] += 1
+        if not dry_run:
+            place_file(ROOT_DIR / logical, target_path, hardlink)
+    for target in referenced & set(retired):
+        # Content came back before its retention window ran out
+        del retired[target]
+
+    # Retire fingerprints that are no longer referenced, and delete the expired ones
+    for target in published_files(dist_dir) - referenced - set(retired):
+        retired[target] = now
+        counts['retired'] += 1
+    for target, retired_at in list(retired.items()):
+        if now - retired_at >= retention_days * 86400:
+            counts['deleted'] += 1
+            if not dry_run:
+                (dist_dir / target).unlink(missing_ok=True)
+            del retired[target]
+
+    if not dry_run:
+        dist_dir.mkdir(parents=True, exist_ok=True)
+        # The manifest goes last, so it never points at a file that is not there yet
+        write_json_atomic(dist_dir / STATE_NAME, {'sources': current, 'retired': retired}, separators=(',', ':'))
+        write_json_atomic(dist_dir / MANIFEST_NAME, manifest, indent=2, sort_keys=True)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Publish icons under content-hash fingerprinted names with a manifest')
+    parser.add_argument('--dist', type=Path, default=DIST_DIR, help='Output directory (default: dist/)')
+    parser.add_argument('--folders', nargs='+', default=DEFAULT_FOLDERS,
+                       help=f'Folders to publish (default: {" ".join(DEFAULT_FOLDERS)}; missing ones are skipped)')
+    parser.add_argument('--hardlink', action='store_true',
+                       help='Hard-link instead of copying; only safe if outputs are always replaced by rename, never rewritten in place')
+    parser.add_argument('--retention-days', type=float, default=DEFAULT_RETENTION_DAYS,
+                       help=f'Keep unreferenced fingerprints this long before deleting them (default: {DEFAULT_RETENTION_DAYS})')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing anything')
+    parser.add_argument('--workers', type=int, help='Number of hashing threads')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = publish(args.dist, args.folders, args.hardlink, args.retention_days, args.dry_run, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"{'Would publish' if args.dry_run else 'Published'} {counts['published']} files "
+          f"({counts['unchanged']} unchanged), retired {counts['retired']}, deleted {counts['deleted']} expired "
+          f"in {elapsed:.1f}s. Manifest: {args.dist / MANIFEST_NAME}")
+    sys.exit(0)
@@ -0,0 +1,398 @@
+import argparse
+import base64
+import binascii
+import io
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from normalize_png_icons import encode_png
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SVG_DIR = ROOT_DIR / "svg"
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+# Same height as the Inkscape renders
+TARGET_HEIGHT = 512
+
+# Elements whose content is only drawn when something references it
+NON_RENDERING = {'defs', 'clipPath', 'mask', 'pattern', 'linearGradient', 'radialGradient', 'filter', 'symbol',
+                 'marker', 'style', 'title', 'desc', 'metadata', 'script'}
+# Elements that group others without drawing anything themselves
+CONTAINERS = {'svg', 'g', 'a'}
+# Presentation attributes that change how the raster is composited, so it cannot be copied as-is
+EFFECT_PROPERTIES = {'clip-path', 'mask', 'filter', 'opacity', 'display', 'visibility'}
+HARMLESS_VALUES = {'opacity': {'1', '1.0', '1.000000'}, 'display': {'inline', 'block'}, 'visibility': {'visible'},
+                   'clip-path': {'none'}, 'mask': {'none'}, 'filter': {'none'}}
+
+_DATA_URI = re.compile(r'\s*data:(image/[\w.+-]+)?(;[^,]*)?,', re.IGNORECASE)
+_TRANSFORM = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_LENGTH = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(px)?\s*$')
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def multiply(m1, m2):
+    """Compose two SVG matrices (a, b, c, d, e, f): the result applies m2 first, then m1."""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2, a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+
+def invert(m):
+    a, b, c, d, e, f = m
+    det = a * d - b * c
+    return (d / det, -b / det, -c / det, a / det, (c * f - d * e) / det, (b * e - a * f) / det)
+
+
+def parse_transform(text):
+    """Matrix of an SVG transform attribute, or None if it cannot be parsed."""
+    matrix = IDENTITY
+    position = 0
+    for match in _TRANSFORM.finditer(text or ''):
+        if text[position:match.start()].strip(' \t\r\n,'):
+            return None
+        position = match.end()
+        name, values = match.group(1), [float(value) for value in _NUMBER.findall(match.group(2))]
+        if name == 'matrix' and len(values) == 6:
+            step = tuple(values)
+        elif name == 'translate' and len(values) in (1, 2):
+            step = (1.0, 0.0, 0.0, 1.0, values[0], values[1] if len(values) == 2 else 0.0)
+        elif name == 'scale' and len(values) in (1, 2):
+            step = (values[0], 0.0, 0.0, values[-1], 0.0, 0.0)
+        elif name == 'rotate' and len(values) in (1, 3):
+            angle = math.radians(values[0])
+            step = (math.cos(angle), math.sin(angle), -math.sin(angle), math.cos(angle), 0.0, 0.0)
+            if len(values) == 3:
+                step = multiply(multiply((1.0, 0.0, 0.0, 1.0, values[1], values[2]), step),
+                                (1.0, 0.0, 0.0, 1.0, -values[1], -values[2]))
+        elif name in ('skewX', 'skewY') and len(values) == 1:
+            tangent = math.tan(math.radians(values[0]))
+            step = (1.0, 0.0, tangent, 1.0, 0.0, 0.0) if name == 'skewX' else (1.0, tangent, 0.0, 1.0, 0.0, 0.0)
+        else:
+            return None
+        matrix = multiply(matrix, step)
+    if (text or '')[position:].strip(' \t\r\n,'):
+        return None
+    return matrix
+
+
+def parse_length(value, default=None):
+    """A length in user units; None for units that depend on the viewport (%, em, mm...)."""
+    if value is None:
+        return default
+    match = _LENGTH.match(value)
+    return float(match.group(1)) if match else None
+
+
+def _effects(element):
+    """Presentation attributes and style properties of `element` that affect compositing."""
+    properties = {name: element.get(name) for name in EFFECT_PROPERTIES if element.get(name) is not None}
+    for declaration in (element.get('style') or '').split(';'):
+        name, _, value = declaration.partition(':')
+        if name.strip() in EFFECT_PROPERTIES:
+            properties[name.strip()] = value
+    return [f"{name}: {value.strip()}" for name, value in properties.items()
+            if value.strip() not in HARMLESS_VALUES.get(name, ())]
+
+
+def _local_name(tag):
+    """Local name of an SVG element, or None for elements in other namespaces (editor metadata)."""
+    if not isinstance(tag, str):
+        return None
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return name if namespace == SVG_NAMESPACE else None
+    return tag
+
+
+def scan_svg(source):
+    """Stream-parse an SVG and describe it if it only wraps one embedded raster image.
+
+    Returns None as soon as the document draws anything else, so ordinary SVGs are rejected
+    after their first shape. For a wrapper, the result holds the embedded payload and its
+    cost, and 'extractable' tells whether the raster can be placed on the page without a
+    renderer; 'matrix' then maps raster pixels to output pixels at TARGET_HEIGHT.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return scan_svg(f)
+    root = None
+    transforms = [IDENTITY]  # one entry per open element
+    hidden_depth = 0
+    images = []  # (element attributes, matrix of its ancestors, effects)
+    defined_images = {}  # id -> element attributes of images inside non-rendering elements
+    uses = []  # (element attributes, matrix of its ancestors, effects)
+    problems = []
+    uses_classes = styled = False
+
+    try:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            name = _local_name(element.tag)
+            if event == 'end':
+                transforms.pop()
+                if name in NON_RENDERING:
+                    hidden_depth -= 1
+                if element is not root:
+                    element.clear()
+                continue
+
+            if name is None:
+                # Editor metadata (sodipodi:namedview, rdf...) never draws anything
+                transforms.append(transforms[-1])
+                continue
+            if name == 'style':
+                styled = True
+            if name in NON_RENDERING or hidden_depth:
+                if name == 'image' and element.get('id'):
+                    defined_images[element.get('id')] = dict(element.attrib)
+                if name in NON_RENDERING:
+                    hidden_depth += 1
+                transforms.append(transforms[-1])
+                continue
+
+            uses_classes = uses_classes or element.get('class') is not None
+            if root is None:
+                if name != 'svg':
+                    return None
+                root = element
+                transforms.append(IDENTITY)
+                continue
+            transform = parse_transform(element.get('transform'))
+            if transform is None:
+                problems.append(f"unsupported transform '{element.get('transform')}'")
+                transform = IDENTITY
+            matrix = multiply(transforms[-1], transform)
+            if name in CONTAINERS:
+                problems.extend(_effects(element))
+                transforms.append(matrix)
+            elif name == 'image':
+                images.append((dict(element.attrib), transforms[-1], _effects(element)))
+                transforms.append(matrix)
+            elif name == 'use':
+                uses.append((dict(element.attrib), transforms[-1], _effects(element)))
+                transforms.append(matrix)
+            else:
+                # A shape, text or anything else drawn next to the raster
+                return None
+    except ET.ParseError:
+        return None
+
+    # Resolve what is actually drawn: images in place, and every use of an image
+    drawn = []
+    for attributes, ancestors, effects in images:
+        drawn.append((attributes, multiply(ancestors, parse_transform(attributes.get('transform')) or IDENTITY),
+                      effects))
+    for attributes, ancestors, effects in uses:
+        target_id = (attributes.get('href') or attributes.get(XLINK_HREF) or '').lstrip('#')
+        target = defined_images.get(target_id) or next(
+            (image for image, _, _ in images if image.get('id') == target_id), None)
+        if target is None:
+            return None
+        placement = multiply(parse_transform(attributes.get('transform')) or IDENTITY,
+                             (1.0, 0.0, 0.0, 1.0, parse_length(attributes.get('x'), 0.0) or 0.0,
+                              parse_length(attributes.get('y'), 0.0) or 0.0))
+        target_transform = parse_transform(target.get('transform'))
+        if target_transform is None:
+            problems.append(f"unsupported transform '{target.get('transform')}'")
+        placement = multiply(placement, target_transform or IDENTITY)
+        drawn.append((target, multiply(ancestors, placement), effects + _effects(target)))
+    if len(drawn) != 1:
+        return None
+
+    attributes, matrix, effects = drawn[0]
+    href = attributes.get('href') or attributes.get(XLINK_HREF) or ''
+    header = _DATA_URI.match(href)
+    if not header or not header.group(1) or not header.group(2) or 'base64' not in header.group(2).lower():
+        return None
+    try:
+        payload = base64.b64decode(href[header.end():])
+    except (binascii.Error, ValueError):
+        return None
+
+    from PIL import Image
+    try:
+        with Image.open(io.BytesIO(payload)) as raster:
+            raster_format, raster_size = raster.format, raster.size
+    except Exception:
+        return None
+
+    wrapper = {
+        'format': raster_format,
+        'raster_size': raster_size,
+        'payload_bytes': len(payload),
+        'encoded_bytes': len(href),
+        'payload': payload,
+        'extractable': False,
+        'reason': None,
+    }
+    problems.extend(effects)
+    if uses_classes and styled:
+        problems.append("styled by CSS classes")
+    if problems:
+        wrapper['reason'] = problems[0]
+        return wrapper
+
+    # The page: the viewBox, scaled so that its height becomes TARGET_HEIGHT
+    view_box = [float(value) for value in _NUMBER.findall(root.get('viewBox') or '')]
+    width, height = parse_length(root.get('width')), parse_length(root.get('height'))
+    if len(view_box) != 4:
+        if not width or not height:
+            wrapper['reason'] = "no viewBox and no absolute size"
+            return wrapper
+        view_box = [0.0, 0.0, width, height]
+    if view_box[2] <= 0 or view_box[3] <= 0:
+        wrapper['reason'] = "empty viewBox"
+        return wrapper
+    if width and height and abs(width / height - view_box[2] / view_box[3]) > 0.01 * view_box[2] / view_box[3]:
+        wrapper['reason'] = "page and viewBox have different aspect ratios"
+        return wrapper
+
+    # The image box, and the raster fitted into it by preserveAspectRatio
+    box_x, box_y = parse_length(attributes.get('x'), 0.0), parse_length(attributes.get('y'), 0.0)
+    box_width, box_height = parse_length(attributes.get('width')), parse_length(attributes.get('height'))
+    if None in (box_x, box_y) or not box_width or not box_height:
+        wrapper['reason'] = "image has no absolute position and size"
+        return wrapper
+    align, _, meet_or_slice = (attributes.get('preserveAspectRatio') or 'xMidYMid meet').strip().partition(' ')
+    raster_width, raster_height = raster_size
+    if align == 'none':
+        fit = (box_width / raster_width, 0.0, 0.0, box_height / raster_height, box_x, box_y)
+    elif re.fullmatch(r'x(Min|Mid|Max)Y(Min|Mid|Max)', align) and meet_or_slice.strip() in ('', 'meet'):
+        factor = min(box_width / raster_width, box_height / raster_height)
+        position = {'Min': 0.0, 'Mid': 0.5, 'Max': 1.0}
+        fit = (factor, 0.0, 0.0, factor,
+               box_x + (box_width - raster_width * factor) * position[align[1:4]],
+               box_y + (box_height - raster_height * factor) * position[align[5:8]])
+    else:
+        wrapper['reason'] = f"preserveAspectRatio '{attributes.get('preserveAspectRatio')}'"
+        return wrapper
+
+    scale = TARGET_HEIGHT / view_box[3]
+    page = (scale, 0.0, 0.0, scale, -view_box[0] * scale, -view_box[1] * scale)
+    wrapper['matrix'] = multiply(page, multiply(matrix, fit))
+    wrapper['output_size'] = (max(1, int(view_box[2] * scale + 0.5)), TARGET_HEIGHT)
+    wrapper['extractable'] = True
+    return wrapper
+
+
+def extract_png(wrapper):
+    """Draw the raster of an extractable wrapper onto its page; returns PNG bytes like an Inkscape render."""
+    from PIL import Image
+    with Image.open(io.BytesIO(wrapper['payload'])) as raster:
+        image = raster.convert('RGBA')
+    matrix = wrapper['matrix']
+    # Box-filter large downscales first; the affine resampling below only looks at a few pixels
+    scale = math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+    factor = int(1 / scale) if scale > 0 else 1
+    if factor >= 2:
+        width, height = image.size
+        image = image.reduce(factor)
+        matrix = multiply(matrix, (width / image.width, 0.0, 0.0, height / image.height, 0.0, 0.0))
+    a, b, c, d, e, f = invert(matrix)
+    # Premultiplied alpha keeps the colors of transparent pixels out of the resampled edges
+    page = image.convert('RGBa').transform(wrapper['output_size'], Image.AFFINE, (a, c, e, b, d, f),
+                                           resample=Image.BICUBIC, fillcolor=(0, 0, 0, 0))
+    return encode_png(page.convert('RGBA'))
+
+
+def recompress_payload(path, wrapper=None):
+    """Re-encode the embedded raster of a wrapper SVG losslessly, in place, if that makes the file smaller.
+
+    Returns (old payload bytes, new payload bytes); they are equal when the file was kept.
+    """
+    from PIL import Image
+    path = Path(path)
+    wrapper = wrapper or scan_svg(path)
+    if wrapper is None:
+        raise ValueError(f"{path.name} does not wrap an embedded raster")
+    with Image.open(io.BytesIO(wrapper['payload'])) as raster:
+        candidate = encode_png(raster.convert('RGBA'))
+    if len(candidate) >= wrapper['payload_bytes']:
+        return wrapper['payload_bytes'], wrapper['payload_bytes']
+
+    content = path.read_text(encoding='utf-8')
+    # The wrapper has a single embedded raster; its attribute value may be split over several lines
+    matches = list(re.finditer(r'(href\s*=\s*)(["\'])\s*data:image/[^"\']*?;base64,[^"\']*\2', content))
+    if len(matches) != 1:
+        return wrapper['payload_bytes'], wrapper['payload_bytes']
+    match = matches[0]
+    replacement = f"{match.group(1)}{match.group(2)}data:image/png;base64,{base64.b64encode(candidate).decode('ascii')}{match.group(2)}"
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(content[:match.start()] + replacement + content[match.end():])
+    os.replace(temp_path, path)
+    return wrapper['payload_bytes'], len(candidate)
+
+
+def describe(path, wrapper):
+    """Report row of one wrapper: its size, raster, base64 overhead and whether it can skip Inkscape."""
+    file_bytes = os.path.getsize(path)
+    return {
+        'name': Path(path).stem,
+        'bytes': file_bytes,
+        'format': wrapper['format'],
+        'raster_size': list(wrapper['raster_size']),
+        'payload_bytes': wrapper['payload_bytes'],
+        # Bytes that only exist because the raster is stored as base64 text inside markup
+        'overhead_bytes': file_bytes - wrapper['payload_bytes'],
+        'extractable': wrapper['extractable'],
+        'reason': wrapper['reason'],
+    }
+
+
+def _file_size(size):
+    return f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.2f} MB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find SVGs that only wrap an embedded PNG or JPEG and report their cost')
+    parser.add_argument('files', nargs='*', type=Path, help='SVG files to scan (default: every file in svg/)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--recompress', action='store_true',
+                       help='Re-encode embedded rasters losslessly as optimized PNG, in place, where that is smaller')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    files = args.files or sorted(SVG_DIR.glob('*.svg'))
+    rows = []
+    for path in files:
+        wrapper = scan_svg(path)
+        if wrapper is None:
+            continue
+        row = describe(path, wrapper)
+        if args.recompress:
+            try:
+                old_bytes, new_bytes = recompress_payload(path, wrapper)
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                print(f"⚠ {path.name}: {e}")
+            else:
+                row['recompressed_bytes'] = os.path.getsize(path) if new_bytes < old_bytes else None
+        rows.append(row)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        sys.exit(0)
+    for row in sorted(rows, key=lambda row: -row['bytes']):
+        verdict = 'extractable' if row['extractable'] else f"needs Inkscape ({row['reason']})"
+        line = (f"{row['name']:<32} {_file_size(row['bytes']):>9}  {row['format']:<4} "
+                f"{row['raster_size'][0]}x{row['raster_size'][1]:<6} overhead {_file_size(row['overhead_bytes']):>9}  {verdict}")
+        if row.get('recompressed_bytes'):
+            line += f"  -> recompressed to {_file_size(row['recompressed_bytes'])}"
+        print(line)
+    total = sum(row['bytes'] for row in rows)
+    overhead = sum(row['overhead_bytes'] for row in rows)
+    extractable = sum(1 for row in rows if row['extractable'])
+    print(f"Scanned {len(files)} SVGs in {elapsed:.1f}s: {len(rows)} wrap a raster ({_file_size(total)}, "
+          f"of which {_file_size(overhead)} is base64 and markup overhead); {extractable} can skip Inkscape")
+    sys.exit(0)
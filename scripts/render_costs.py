@@ -0,0 +1,143 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from threading import Lock
+
+from svg_complexity import DEFAULT_THRESHOLDS, analyze_svg
+
+# Static cost model, in seconds of Inkscape time. These are starting points only: the
+# calibration factor and per-icon timings recorded by previous runs take over quickly.
+BASE_SECONDS = 0.8  # process startup and export
+SECONDS_PER_KB = 0.002
+SECONDS_PER_ELEMENT = 0.0005
+SECONDS_PER_PATH_COMMAND = 0.00002
+SECONDS_PER_FILTER = 0.3
+SECONDS_PER_COMPOSITE = 0.02  # masks and clip paths
+SECONDS_PER_EMBEDDED_KB = 0.001
+
+# Weight of a new observation in the per-icon and calibration moving averages
+LEARNING_RATE = 0.3
+CALIBRATION_RATE = 0.05
+
+
+def svg_features(data):
+    """Extract the properties of an SVG document that drive its render time."""
+    stats = analyze_svg(io.BytesIO(data))
+    return {
+        'bytes': stats['bytes'],
+        'elements': stats['elements'],
+        'path_commands': stats['path_commands'],
+        'filters': stats['filters'],
+        'composites': stats['masks'] + stats['clip_paths'],
+        'embedded_bytes': stats['embedded_bytes'],
+        'heavy': any(stats[metric] > limit for metric, limit in DEFAULT_THRESHOLDS.items()),
+    }
+
+
+def static_cost(features):
+    """Predict render seconds from document features alone (identical on every machine)."""
+    return (BASE_SECONDS
+            + features['bytes'] / 1024 * SECONDS_PER_KB
+            + features['elements'] * SECONDS_PER_ELEMENT
+            + features['path_commands'] * SECONDS_PER_PATH_COMMAND
+            + features['filters'] * SECONDS_PER_FILTER
+            + features['composites'] * SECONDS_PER_COMPOSITE
+            + features['embedded_bytes'] / 1024 * SECONDS_PER_EMBEDDED_KB)
+
+
+class RenderCostModel:
+    """Estimate per-icon render time and learn from the timings of previous runs.
+
+    Icons whose SVG content is unchanged since a recorded render use that timing. Others
+    use the static model scaled by a calibration factor fitted to all recorded renders.
+    """
+
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.calibration = 1.0
+        self.timings = {}  # icon name -> {'hash', 'seconds', 'samples'}
+        self._documents = {}  # icon name -> ((size, mtime), hash, features) of parsed SVGs
+        self._recorded = 0
+        self._lock = Lock()
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self.calibration = float(cached.get('calibration', 1.0))
+            self.timings = cached.get('icons', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _document(self, svg_path):
+        # Parsed documents are reused until the file changes (watch mode keeps one model alive)
+        stat = os.stat(svg_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._documents.get(Path(svg_path).stem)
+        if cached is None or cached[0] != signature:
+            with open(svg_path, 'rb') as f:
+                data = f.read()
+            cached = (signature, hashlib.md5(data).hexdigest(), svg_features(data))
+            self._documents[Path(svg_path).stem] = cached
+        return cached[1:]
+
+    def static_estimate(self, svg_path):
+        """Content-only estimate, suitable wherever every runner must agree (e.g. sharding)."""
+        try:
+            return static_cost(self._document(svg_path)[1])
+        except OSError:
+            return BASE_SECONDS
+
+    def is_heavy(self, svg_path):
+        """Whether an SVG exceeds any of the svg_complexity thresholds."""
+        try:
+            return self._document(svg_path)[1]['heavy']
+        except OSError:
+            return False
+
+    def estimate(self, svg_path):
+        """Best estimate of the render time of an SVG in seconds."""
+        try:
+            content_hash, features = self._document(svg_path)
+        except OSError:
+            return BASE_SECONDS
+        timing = self.timings.get(Path(svg_path).stem)
+        if timing and timing.get('hash') == content_hash:
+            return timing['seconds']
+        return static_cost(features) * self.calibration
+
+    def record(self, svg_path, seconds):
+        """Store the measured render time of an SVG and refine the calibration factor."""
+        name = Path(svg_path).stem
+        seconds = round(seconds, 4)
+        with self._lock:
+            try:
+                content_hash, features = self._document(svg_path)
+            except OSError:
+                return
+            timing = self.timings.get(name)
+            if timing and timing.get('hash') == content_hash:
+                timing['seconds'] = round(timing['seconds'] + LEARNING_RATE * (seconds - timing['seconds']), 4)
+                timing['samples'] += 1
+            else:
+                self.timings[name] = {'hash': content_hash, 'seconds': seconds, 'samples': 1}
+            ratio = seconds / static_cost(features)
+            self.calibration += CALIBRATION_RATE * (min(max(ratio, 0.1), 10.0) - self.calibration)
+            self._recorded += 1
+
+    def save(self):
+        """Persist timings and calibration atomically, if anything was recorded."""
+        with self._lock:
+            if not self._recorded:
+                return
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {'calibration': round(self.calibration, 4), 'icons': self.timings}
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_file.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.cache_file)
+            self._recorded = 0
+
+    def summary(self):
+        return f"Render cost model: {len(self.timings)} icons with recorded timings, calibration {self.calibration:.2f}"
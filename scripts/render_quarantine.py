@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+
+
+def hash_svg(svg_path):
+    """Hash the content of an SVG; quarantine entries only match this exact content."""
+    with open(svg_path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+class RenderQuarantine:
+    """Persistent record of SVGs whose renders were killed, keyed by content hash.
+
+    An entry stops matching as soon as the SVG changes, so a fixed icon is rendered again
+    without anyone having to clear the quarantine by hand.
+    """
+
+    def __init__(self, quarantine_file):
+        self.quarantine_file = Path(quarantine_file)
+        self.entries = {}  # content hash -> {'name', 'reason', 'timestamp', 'failures'}
+        self.added = []  # (name, reason) of SVGs quarantined during this run
+        self._changed = False
+        self._lock = Lock()
+        try:
+            with open(self.quarantine_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def check(self, svg_path):
+        """Return the quarantine entry of an SVG's current content, or None."""
+        if not self.entries:
+            return None
+        try:
+            return self.entries.get(hash_svg(svg_path))
+        except OSError:
+            return None
+
+    def add(self, svg_path, reason):
+        """Quarantine the current content of an SVG after a render was killed."""
+        try:
+            content_hash = hash_svg(svg_path)
+        except OSError:
+            return
+        with self._lock:
+            previous = self.entries.get(content_hash, {})
+            self.entries[content_hash] = {
+                'name': Path(svg_path).stem,
+                'reason': reason,
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'failures': previous.get('failures', 0) + 1,
+            }
+            self.added.append((Path(svg_path).stem, reason))
+            self._changed = True
+
+    def release(self, svg_path):
+        """Forget the current content of an SVG after it rendered successfully."""
+        if not self.entries:
+            return
+        try:
+            content_hash = hash_svg(svg_path)
+        except OSError:
+            return
+        with self._lock:
+            if self.entries.pop(content_hash, None) is not None:
+                self._changed = True
+
+    def save(self):
+        """Persist the quarantine atomically, if it changed."""
+        with self._lock:
+            if not self._changed:
+                return
+            self.quarantine_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.quarantine_file.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.quarantine_file)
+            self._changed = False
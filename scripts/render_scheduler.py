@@ -0,0 +1,199 @@
+import os
+import signal
+import subprocess
+import time
+from contextlib import contextmanager
+from threading import Condition
+
+# Memory assumed for one Inkscape render until real peaks have been observed
+DEFAULT_RENDER_MEMORY = 300 * 1024 * 1024
+# Memory kept free for the rest of the system
+MEMORY_RESERVE = 512 * 1024 * 1024
+# Heavy renders (very large SVGs) are assumed to need this many times the usual memory
+HEAVY_MEMORY_FACTOR = 3
+# How often a waiting render re-checks memory, and how often a running one is sampled
+POLL_INTERVAL = 0.1
+# Per-render limits; a render exceeding either is killed together with its child processes
+DEFAULT_RENDER_TIMEOUT = 120
+DEFAULT_RENDER_MEMORY_LIMIT = 2048 * 1024 * 1024
+
+
+def read_available_memory():
+    """Return the memory available to new processes in bytes, or None if it cannot be determined."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def read_peak_rss(pid):
+    """Return the peak resident set size of a running process in bytes (0 if unavailable)."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def read_group_rss(pgid):
+    """Return the summed current RSS of all processes in a process group in bytes.
+
+    Inkscape may hand work to child processes (extensions, Python helpers), so its own RSS
+    understates what a render uses. Returns 0 where /proc is unavailable.
+    """
+    try:
+        pids = [entry for entry in os.listdir('/proc') if entry.isdigit()]
+        page_size = os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                # The command name may contain spaces and parentheses; fields follow the last ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[2]) == pgid:
+                total += int(fields[21]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+class AdaptiveRenderScheduler:
+    """Decide how many renders may run at once from CPU count, memory pressure and observed RSS.
+
+    The concurrency limit starts at the CPU count (or `max_workers`) and follows an additive
+    increase / multiplicative decrease rule: it shrinks when there is not enough free memory
+    for another render and grows back one step at a time once memory is plentiful again.
+    Heavy renders need more headroom and only `max_heavy` of them run at the same time.
+    """
+
+    def __init__(self, max_workers=None, max_heavy=None):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_heavy = max_heavy or max(1, self.max_workers // 4)
+        self.limit = self.max_workers
+        self.render_memory = DEFAULT_RENDER_MEMORY
+        self.active = 0
+        self.active_heavy = 0
+        self.peak_active = 0
+        self.peak_rss = 0
+        self.throttled = 0
+        self._condition = Condition()
+
+    def _required_memory(self, heavy):
+        return self.render_memory * (HEAVY_MEMORY_FACTOR if heavy else 1) + MEMORY_RESERVE
+
+    def _can_start(self, heavy):
+        if heavy and self.active_heavy >= self.max_heavy:
+            return False
+        if self.active == 0:
+            # Always let one render through so the run keeps making progress
+            return True
+
+        available = read_available_memory()
+        required = self._required_memory(heavy)
+        if available is not None and available < required:
+            # Backpressure: halve the limit and admit nothing until memory frees up again
+            reduced = max(1, self.active // 2)
+            if reduced < self.limit:
+                self.limit = reduced
+                self.throttled += 1
+            return False
+        if self.active >= self.limit:
+            if self.limit >= self.max_workers or (available is not None and available < 2 * required):
+                return False
+            self.limit += 1
+        return True
+
+    @contextmanager
+    def slot(self, heavy=False):
+        """Wait until a render may start, and hold its slot for the duration of the block."""
+        with self._condition:
+            while not self._can_start(heavy):
+                self._condition.wait(POLL_INTERVAL)
+            self.active += 1
+            self.active_heavy += heavy
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self.active_heavy -= heavy
+                self._condition.notify_all()
+
+    def observe(self, peak_rss, heavy=False):
+        """Feed the peak RSS of a finished render back into the per-render memory estimate."""
+        if not peak_rss:
+            return
+        with self._condition:
+            self.peak_rss = max(self.peak_rss, peak_rss)
+            if not heavy:
+                # Exponential moving average, biased towards the larger value to stay on the safe side
+                self.render_memory = max(int(0.8 * self.render_memory + 0.2 * peak_rss), peak_rss // 2)
+
+    def summary(self):
+        peak_rss_mb = self.peak_rss / (1024 * 1024)
+        return (f"Render concurrency: up to {self.peak_active} of {self.max_workers} at once, "
+                f"throttled {self.throttled} times, peak renderer RSS {peak_rss_mb:.0f} MB")
+
+
+class RenderLimitExceeded(Exception):
+    """A render was killed because it ran too long or used too much memory."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _kill_process_group(process):
+    # The render runs in its own session, so this also reaches anything Inkscape spawned
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    process.communicate()
+
+
+def run_monitored(command, timeout=None, memory_limit=None):
+    """Run a command like subprocess.run(check=True), sampling its peak RSS while it runs.
+
+    The process gets its own process group. The RSS sampled is that of the whole group, so
+    memory used by child processes counts too; the group is killed as a whole when it runs
+    longer than `timeout` seconds or its RSS exceeds `memory_limit` bytes.
+
+    Returns (stdout, stderr, peak_rss). Raises CalledProcessError on a non-zero exit code
+    and RenderLimitExceeded when a limit was hit.
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               start_new_session=True)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    peak_rss = 0
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            peak_rss = max(peak_rss, read_peak_rss(process.pid), read_group_rss(process.pid))
+            if memory_limit and peak_rss > memory_limit:
+                _kill_process_group(process)
+                raise RenderLimitExceeded(f"exceeded the memory limit of {memory_limit // (1024 * 1024)} MB")
+            if deadline is not None and time.monotonic() > deadline:
+                _kill_process_group(process)
+                raise RenderLimitExceeded(f"timed out after {timeout:g} s")
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    return stdout, stderr, peak_rss
@@ -0,0 +1,131 @@
+import io
+import os
+import stat
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Chunks that affect decoded pixels or colors. Everything else (tEXt/zTXt/iTXt, tIME, pHYs,
+# eXIf, bKGD, ...) is metadata that Inkscape and other tools fill with volatile values.
+PNG_KEEP_CHUNKS = {b'IHDR', b'PLTE', b'IDAT', b'IEND', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT', b'cICP'}
+
+# WEBP encoder settings, pinned so Pillow default changes cannot alter the output
+WEBP_OPTIONS = {'lossless': False, 'quality': 80, 'method': 4, 'exact': False}
+
+# mkstemp creates files readable only by their owner; new outputs get this mode instead
+FILE_MODE = 0o644
+
+
+def strip_png_chunks(data):
+    """Return PNG bytes without metadata chunks; data that is not a PNG is returned unchanged."""
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    chunks = [PNG_SIGNATURE]
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position + 8])
+        end = position + 12 + length
+        if end > len(data):
+            # Truncated file: leave it alone rather than hide the damage
+            return data
+        if chunk_type in PNG_KEEP_CHUNKS:
+            chunks.append(data[position:end])
+        position = end
+        if chunk_type == b'IEND':
+            break
+    return b''.join(chunks)
+
+
+def encode_webp(image):
+    """Encode a decoded image as WEBP with the pinned settings, without metadata."""
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', **WEBP_OPTIONS)
+    return buffer.getvalue()
+
+
+def _pixels(data):
+    from PIL import Image  # only needed when bytes differ; keeps this module cheap to import
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGBA')
+        return image.size, zlib.crc32(image.tobytes()), image.tobytes()
+
+
+def same_pixels(a, b):
+    """Whether two encoded images decode to identical RGBA pixels."""
+    try:
+        size_a, crc_a, pixels_a = _pixels(a)
+        size_b, crc_b, pixels_b = _pixels(b)
+    except Exception:
+        return False
+    return size_a == size_b and crc_a == crc_b and pixels_a == pixels_b
+
+
+def write_if_changed(path, data, compare_pixels=True):
+    """Write `data` to `path` unless the existing file already holds the same image.
+
+    The existing file is kept when its bytes are identical or, with `compare_pixels`, when it
+    is already in canonical form and decodes to the same pixels (an encoder upgrade then does
+    not rewrite every output). A kept file is touched so mtime-based staleness checks see it
+    as fresh. New content is written to a temporary file and renamed into place, keeping the
+    replaced file's permissions (FILE_MODE for a new file).
+
+    Returns True if the file was written.
+    """
+    path = Path(path)
+    try:
+        with open(path, 'rb') as f:
+            existing = f.read()
+            mode = stat.S_IMODE(os.fstat(f.fileno()).st_mode)
+    except FileNotFoundError:
+        existing = None
+        mode = FILE_MODE
+    if existing is not None and (existing == data or (
+            compare_pixels and strip_png_chunks(existing) == existing and same_pixels(existing, data))):
+        os.utime(path)
+        return False
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.stem}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return True
+
+
+PNG_IEND = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+JXL_SIGNATURES = (b'\xff\x0a', b'\x00\x00\x00\x0cJXL \r\n\x87\n')
+
+
+def output_is_complete(path):
+    """Whether an output file is whole rather than merely non-empty, from its header and tail.
+
+    Catches files truncated by a crash or an interrupted copy: a PNG must end with its IEND
+    chunk, a WEBP must be as long as its RIFF header says, and AVIF/JXL must start with their
+    signature. Other files only need to be non-empty.
+    """
+    path = Path(path)
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(16)
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - len(PNG_IEND), 0))
+            tail = f.read()
+    except OSError:
+        return False
+    suffix = path.suffix.lower()
+    if suffix == '.png':
+        return head.startswith(PNG_SIGNATURE) and tail == PNG_IEND
+    if suffix == '.webp':
+        # The RIFF size excludes the 8-byte header; an odd payload may be padded by one byte
+        riff_size = int.from_bytes(head[4:8], 'little') + 8
+        return head[:4] == b'RIFF' and head[8:12] == b'WEBP' and riff_size <= size <= riff_size + 1
+    if suffix == '.avif':
+        return head[4:8] == b'ftyp'
+    if suffix == '.jxl':
+        return head.startswith(JXL_SIGNATURES)
+    return size > 0
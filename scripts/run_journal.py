@@ -0,0 +1,77 @@
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+
+
+class RunJournal:
+    """Append-only JSON-lines log of a conversion run, used to resume it after a crash.
+
+    A run starts by writing its plan and options. Every icon appends one line once all its
+    outputs are in place, and a completed run appends a final line. When a run is killed, the
+    journal tells the next run which plan it was executing and which icons already finished.
+    A line torn by the crash is ignored.
+    """
+
+    def __init__(self, journal_file):
+        self.journal_file = Path(journal_file)
+        self._file = None
+        self._lock = Lock()
+
+    def unfinished(self):
+        """Return (start record, finished names) of an interrupted run, or None."""
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # empty, or torn by a crash
+        if not records or records[0].get('type') != 'start' or records[-1].get('type') == 'finish':
+            return None
+        done = {record['name'] for record in records[1:] if record.get('type') == 'done'}
+        return records[0], done
+
+    def start(self, plan, options):
+        """Begin a new journal for `plan`, replacing any previous one."""
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.journal_file, 'w', encoding='utf-8')
+        self._append({
+            'type': 'start',
+            'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'options': options,
+            'plan': plan,
+        }, sync=True)
+
+    def resume(self):
+        """Keep appending to the journal of the interrupted run."""
+        self._file = open(self.journal_file, 'a', encoding='utf-8')
+        # Drop a torn last line, so the next record starts on a line of its own
+        self._file.write('\n')
+        self._file.flush()
+
+    def done(self, name):
+        """Record that every output of an icon is in place."""
+        if self._file is not None:
+            self._append({'type': 'done', 'name': name})
+
+    def finish(self):
+        """Mark the run as complete; the journal is kept only as a record of the last run."""
+        if self._file is not None:
+            self._append({'type': 'finish'}, sync=True)
+            self._file.close()
+            self._file = None
+
+    def _append(self, record, sync=False):
+        with self._lock:
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            # Flushing survives the process being killed; fsync (for a power loss) is only
+            # worth its cost at the start and end of a run
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
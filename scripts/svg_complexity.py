@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SVG_DIR = ROOT_DIR / "svg"
+
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+METRICS = (
+    'bytes',
+    'elements',
+    'path_commands',
+    'filters',
+    'masks',
+    'clip_paths',
+    'embedded_images',
+    'embedded_bytes',
+    'text_nodes',
+)
+
+# Values above these make an SVG slow to render or heavy to serve
+DEFAULT_THRESHOLDS = {
+    'bytes': 256 * 1024,
+    'elements': 2000,
+    'path_commands': 20000,
+    'filters': 5,
+    'masks': 20,
+    'clip_paths': 50,
+    'embedded_bytes': 100 * 1024,
+}
+
+_PATH_COMMAND = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]')
+_RELATIVE_SIZE = re.compile(r'(em|ex|%)\s*$')
+
+# Raster files that were uploaded with an .svg extension
+RASTER_SIGNATURES = {
+    b'\x89PNG': 'PNG',
+    b'\xff\xd8\xff': 'JPEG',
+    b'GIF8': 'GIF',
+    b'RIFF': 'WEBP',
+}
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _check_root(element, issues):
+    if _local_name(element.tag) != 'svg':
+        issues.append(f"root element is <{_local_name(element.tag)}>, not <svg>")
+        return
+    view_box = element.get('viewBox')
+    if view_box is None:
+        issues.append("missing viewBox")
+    else:
+        try:
+            values = [float(value) for value in view_box.replace(',', ' ').split()]
+        except ValueError:
+            values = []
+        if len(values) != 4:
+            issues.append(f"invalid viewBox '{view_box}'")
+        elif values[2] <= 0 or values[3] <= 0:
+            issues.append(f"empty viewBox '{view_box}'")
+    for attribute in ('width', 'height'):
+        value = element.get(attribute)
+        if value and _RELATIVE_SIZE.search(value):
+            issues.append(f"relative {attribute} '{value}'")
+
+
+def analyze_svg(source, name=None):
+    """Stream-parse one SVG (a path or a binary file object) and return its complexity metrics.
+
+    Elements are discarded as soon as they have been counted, so memory stays flat even
+    for very large documents. A parse error is reported as an issue together with the
+    metrics gathered up to that point.
+    """
+    if name is None:
+        name = Path(source).stem if isinstance(source, (str, os.PathLike)) else None
+    stats = {'name': name}
+    stats.update({metric: 0 for metric in METRICS})
+    issues = []
+
+    if isinstance(source, (str, os.PathLike)):
+        stats['bytes'] = os.path.getsize(source)
+        with open(source, 'rb') as f:
+            head = f.read(8)
+    else:
+        start = source.tell()
+        stats['bytes'] = source.seek(0, os.SEEK_END) - start
+        source.seek(start)
+        head = source.read(8)
+        source.seek(start)
+
+    for signature, kind in RASTER_SIGNATURES.items():
+        if head.startswith(signature):
+            stats['issues'] = [f"not an SVG ({kind} data)"]
+            return stats
+
+    root_checked = False
+    try:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if not root_checked:
+                    _check_root(element, issues)
+                    root_checked = True
+                continue
+
+            tag = _local_name(element.tag)
+            stats['elements'] += 1
+            if tag == 'path':
+                stats['path_commands'] += len(_PATH_COMMAND.findall(element.get('d', '')))
+            elif tag == 'filter':
+                stats['filters'] += 1
+            elif tag == 'mask':
+                stats['masks'] += 1
+            elif tag == 'clipPath':
+                stats['clip_paths'] += 1
+            elif tag == 'image':
+                href = element.get('href') or element.get(XLINK_HREF) or ''
+                if href.startswith('data:'):
+                    stats['embedded_images'] += 1
+                    payload = href.partition(',')[2]
+                    # Base64 stores 3 bytes in 4 characters
+                    stats['embedded_bytes'] += len(payload) * 3 // 4 if ';base64' in href[:64] else len(payload)
+            elif tag == 'text':
+                stats['text_nodes'] += 1
+            element.clear()
+    except ET.ParseError as e:
+        issues.append(f"parse error: {e}")
+
+    stats['issues'] = issues
+    return stats
+
+
+def complexity_flags(stats, thresholds=None):
+    """List the metrics of an analyzed SVG that exceed their thresholds, plus its issues."""
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    flags = [f"{metric} {stats[metric]} > {limit}" for metric, limit in thresholds.items() if stats[metric] > limit]
+    if stats['text_nodes']:
+        flags.append(f"{stats['text_nodes']} text nodes (render depends on installed fonts)")
+    return flags + stats['issues']
+
+
+def _analyze_path(path):
+    return analyze_svg(path)
+
+
+def analyze_all(paths, workers=None):
+    """Analyze many SVGs in parallel worker processes; results keep the order of `paths`."""
+    paths = [str(path) for path in paths]
+    if len(paths) < 64:
+        return [analyze_svg(path) for path in paths]
+    # Imported here: generate_icons only analyzes single files and should start quickly
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_analyze_path, paths, chunksize=32))
+
+
+def parse_threshold(value):
+    metric, _, limit = value.partition('=')
+    if metric not in METRICS or not limit.isdigit():
+        raise argparse.ArgumentTypeError(f"Invalid threshold '{value}', expected METRIC=NUMBER with METRIC one of {', '.join(METRICS)}")
+    return metric, int(limit)
+
+
+def print_table(results, thresholds):
+    columns = ('name',) + METRICS
+    widths = {column: max(len(column), *(len(str(stats[column])) for stats in results)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns) + '  flags')
+    for stats in results:
+        row = '  '.join(str(stats[column]).ljust(widths[column]) for column in columns)
+        print(f"{row}  {'; '.join(complexity_flags(stats, thresholds))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the render complexity of SVG files')
+    parser.add_argument('files', nargs='*', help='SVG files to analyze (default: every file in svg/)')
+    parser.add_argument('--sort', choices=METRICS, default='bytes',
+                       help='Metric to sort by, largest first (default: bytes)')
+    parser.add_argument('--top', type=int, metavar='N', help='Only show the first N results')
+    parser.add_argument('--flagged', action='store_true', help='Only show SVGs exceeding a threshold or with issues')
+    parser.add_argument('--threshold', type=parse_threshold, action='append', default=[], metavar='METRIC=NUMBER',
+                       help='Override a threshold, e.g. --threshold elements=5000 (repeatable)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.update(args.threshold)
+
+    paths = [Path(file) for file in args.files] or sorted(SVG_DIR.glob('*.svg'))
+    results = analyze_all(paths, args.workers)
+    results.sort(key=lambda stats: (-stats[args.sort], stats['name']))
+    for stats in results:
+        stats['flags'] = complexity_flags(stats, thresholds)
+    flagged_count = sum(1 for stats in results if stats['flags'])
+    if args.flagged:
+        results = [stats for stats in results if stats['flags']]
+    if args.top:
+        results = results[:args.top]
+
+    if args.json:
+        print(json.dumps({'thresholds': thresholds, 'analyzed': len(paths), 'flagged': flagged_count, 'svgs': results}, indent=2))
+    else:
+        if results:
+            print_table(results, thresholds)
+        print(f"\nAnalyzed {len(paths)} SVGs, {flagged_count} exceed a threshold or have issues.")
+    sys.exit(0)
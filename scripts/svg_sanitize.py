@@ -0,0 +1,161 @@
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SVG_DIR = ROOT_DIR / "svg"
+
+# Elements that run code or embed another document
+_ACTIVE_ELEMENT = re.compile(r'<((?:[\w.-]+:)?(?:script|foreignObject))\b[^>]*?(?:/>|>.*?</\1\s*>)',
+                             re.IGNORECASE | re.DOTALL)
+# href and xlink:href point at other resources; Inkscape also falls back to sodipodi:absref for images
+_REFERENCE_ATTRIBUTE = re.compile(r'\s((?:[\w.-]+:)?(?:href|absref))\s*=\s*("[^"]*"|\'[^\']*\')')
+_CSS_IMPORT = re.compile(r'@import\s+(?:url\([^)]*\)|"[^"]*"|\'[^\']*\')[^;<]*;?', re.IGNORECASE)
+# Inside attributes the quotes of url("...") are often written as entities
+_CSS_URL = re.compile(r'url\(\s*(["\']|&quot;|&apos;|&#3[49];|)\s*([^)]*?)\s*\1\s*\)', re.IGNORECASE)
+_STYLESHEET_PI = re.compile(r'<\?xml-stylesheet\b.*?\?>', re.DOTALL)
+_EXTERNAL_ENTITY = re.compile(r'<!ENTITY\s+(%\s*)?([\w.-]+)\s+(?:SYSTEM|PUBLIC)\b[^>]*>')
+_TAG_NAME = re.compile(r'<([\w.:-]+)')
+# Raster images submitted under an .svg name; Inkscape imports them as a plain bitmap
+_RASTER_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', 'PNG'), (b'\xff\xd8\xff', 'JPEG'), (b'GIF87a', 'GIF'), (b'GIF89a', 'GIF'))
+
+
+def is_local_reference(value):
+    """Fragment references and data: URIs resolve inside the document; anything else is external."""
+    value = value.strip()
+    return not value or value.startswith('#') or value[:5].lower() == 'data:'
+
+
+def _shorten(value, length=60):
+    value = value.strip()
+    return value if len(value) <= length else value[:length - 3] + '...'
+
+
+def _summarize(removals):
+    counts = {}
+    for removal in removals:
+        counts[removal] = counts.get(removal, 0) + 1
+    return [removal if count == 1 else f"{removal} ({count} times)" for removal, count in counts.items()]
+
+
+def sanitize_svg(content):
+    """Remove everything from SVG markup that would make a renderer fetch or run something.
+
+    Scripts and foreignObject elements are dropped, external href/xlink:href attributes,
+    CSS @import rules and url() references are removed, and so are external entity
+    declarations and xml-stylesheet instructions. Links (<a href>) are kept, since no
+    renderer follows them. Returns (sanitized content, descriptions of the removals).
+    """
+    removals = []
+
+    # The external DTD subset of a DOCTYPE is never loaded, but external entities are
+    if '<!ENTITY' in content:
+        def drop_entity(match):
+            removals.append(f"external entity '{match.group(2)}'")
+            return ''
+        content = _EXTERNAL_ENTITY.sub(drop_entity, content)
+
+    if '<?xml-stylesheet' in content:
+        def drop_stylesheet(match):
+            removals.append(f"stylesheet instruction {_shorten(match.group(0))}")
+            return ''
+        content = _STYLESHEET_PI.sub(drop_stylesheet, content)
+
+    lowered = content.lower()
+    if '<script' in lowered or 'foreignobject' in lowered or ':script' in lowered:
+        def drop_element(match):
+            removals.append(f"<{match.group(1)}> element")
+            return ''
+        content = _ACTIVE_ELEMENT.sub(drop_element, content)
+
+    if 'href' in content or 'absref' in content:
+        def drop_reference(match):
+            value = match.group(2)[1:-1]
+            if is_local_reference(value):
+                return match.group(0)
+            tag = _TAG_NAME.match(content, content.rfind('<', 0, match.start()))
+            tag = tag.group(1) if tag else '?'
+            if tag.rsplit(':', 1)[-1] == 'a':
+                return match.group(0)
+            removals.append(f"external {match.group(1)} {_shorten(value)} on <{tag}>")
+            return ''
+        content = _REFERENCE_ATTRIBUTE.sub(drop_reference, content)
+
+    if '@import' in content:
+        def drop_import(match):
+            removals.append(f"CSS {_shorten(match.group(0))}")
+            return ''
+        content = _CSS_IMPORT.sub(drop_import, content)
+
+    if 'url(' in lowered:
+        def drop_url(match):
+            if is_local_reference(match.group(2)):
+                return match.group(0)
+            removals.append(f"CSS url({_shorten(match.group(2))})")
+            # Valid wherever a paint is expected; elsewhere the declaration is ignored
+            return 'none'
+        content = _CSS_URL.sub(drop_url, content)
+
+    return content, _summarize(removals)
+
+
+def raster_format(data):
+    """Name of the raster format of some file content, or None when it is not a known raster."""
+    for signature, name in _RASTER_SIGNATURES:
+        if data.startswith(signature):
+            return name
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def read_svg(path):
+    """Read a submitted SVG for sanitizing; returns (text, raster format).
+
+    The text is None when the file is actually a raster image: it cannot reference or run
+    anything, so it needs no sanitizing. Raises ValueError for any other content that is not
+    UTF-8 text, since it can be neither sanitized nor rendered safely.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    raster = raster_format(data)
+    if raster is not None:
+        return None, raster
+    try:
+        return data.decode('utf-8-sig'), None
+    except UnicodeDecodeError as e:
+        raise ValueError(f"{Path(path).name} is neither UTF-8 SVG text nor a PNG, JPEG, GIF or WEBP image ({e.reason} at byte {e.start})")
+
+
+def sanitize_file(path):
+    """Sanitize one SVG file; returns the list of removals (empty when the file is clean or a raster)."""
+    content, _ = read_svg(path)
+    return sanitize_svg(content)[1] if content is not None else []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report SVGs that reference external resources, scripts or foreign objects')
+    parser.add_argument('files', nargs='*', type=Path, help='SVG files to check (default: every file in svg/)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    files = args.files or sorted(SVG_DIR.glob('*.svg'))
+    flagged = 0
+    for path in files:
+        try:
+            removals = sanitize_file(path)
+        except ValueError as e:
+            print(f"⚠ {e}")
+            continue
+        except OSError as e:
+            print(f"⚠ {path.name}: {e}")
+            continue
+        if removals:
+            flagged += 1
+            print(f"{path.name}:")
+            for removal in removals:
+                print(f"  - {removal}")
+    print(f"Checked {len(files)} SVGs in {time.perf_counter() - started:.2f}s: {flagged} would be sanitized before rendering")
+    sys.exit(1 if flagged else 0)
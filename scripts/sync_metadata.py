@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+META_DIR = ROOT_DIR / "meta"
+METADATA_FILE = ROOT_DIR / "metadata.json"
+# Entry hashes as of the last sync, used to tell which side changed an entry
+STATE_FILE = ROOT_DIR / ".cache" / "metadata-sync.json"
+
+
+def canonical_hash(entry):
+    """Hash an entry independently of key order and formatting."""
+    canonical = json.dumps(entry, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def parse_timestamp(entry):
+    """Return the update timestamp of an entry as an aware datetime, or None."""
+    try:
+        value = entry['update']['timestamp']
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def write_atomic(path, text):
+    fd, temp_path = tempfile.mkstemp(dir=Path(path).parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_meta_dir():
+    entries = {}
+    for path in META_DIR.glob('*.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            entries[path.stem] = json.load(f)
+    return entries
+
+
+def read_index():
+    try:
+        with open(METADATA_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(STATE_FILE, json.dumps(state, sort_keys=True, separators=(',', ':')))
+
+
+def resolve_conflict(name, index_entry, meta_entry, prefer):
+    """Pick the side that wins a conflicting change: 'index', 'meta' or None (unresolved).
+
+    Conflicts are only settled when asked to: `prefer` is 'index', 'meta' or 'newer' (the
+    newer update timestamp wins).
+    """
+    if prefer != 'newer':
+        return prefer
+    index_time, meta_time = parse_timestamp(index_entry), parse_timestamp(meta_entry)
+    if index_time is None or meta_time is None or index_time == meta_time:
+        return None
+    return 'index' if index_time > meta_time else 'meta'
+
+
+def plan_sync(index, meta, direction, state, prune=False, prefer=None, create_missing=False):
+    """Decide which entries to copy or delete in each direction.
+
+    `direction` is 'to-meta' (metadata.json is the source), 'to-index' (meta/ is the source)
+    or 'both'. In both directions, the entry hashes recorded by the last sync tell which side
+    changed an entry or deleted it; entries changed on both sides are conflicts, left alone
+    unless `prefer` settles them (see resolve_conflict).
+
+    meta/ files are only created for entries missing from meta/ with `create_missing`.
+
+    Returns a dict of sorted name lists: write_meta, delete_meta, write_index, delete_index,
+    conflicts, unpruned (one-way only: entries missing from the source that `prune` would
+    delete) and uncreated (meta/ files `create_missing` would create).
+    """
+    plan = {key: [] for key in ('write_meta', 'delete_meta', 'write_index', 'delete_index', 'conflicts',
+                                'unpruned', 'uncreated')}
+    index_hashes = {name: canonical_hash(entry) for name, entry in index.items()}
+    meta_hashes = {name: canonical_hash(entry) for name, entry in meta.items()}
+
+    for name in sorted(set(index) | set(meta)):
+        index_hash, meta_hash = index_hashes.get(name), meta_hashes.get(name)
+        if index_hash == meta_hash:
+            continue
+
+        if direction == 'to-meta':
+            if index_hash is not None:
+                plan['write_meta'].append(name)
+            else:
+                plan['delete_meta' if prune else 'unpruned'].append(name)
+            continue
+        if direction == 'to-index':
+            if meta_hash is not None:
+                plan['write_index'].append(name)
+            else:
+                plan['delete_index' if prune else 'unpruned'].append(name)
+            continue
+
+        base_hash = state.get(name)
+        if meta_hash is None:
+            # Deleted from meta/ since the last sync, or added to metadata.json
+            plan['delete_index' if base_hash == index_hash else 'write_meta'].append(name)
+        elif index_hash is None:
+            plan['delete_meta' if base_hash == meta_hash else 'write_index'].append(name)
+        elif base_hash == index_hash:
+            plan['write_index'].append(name)
+        elif base_hash == meta_hash:
+            plan['write_meta'].append(name)
+        else:
+            winner = resolve_conflict(name, index[name], meta[name], prefer)
+            if winner == 'index':
+                plan['write_meta'].append(name)
+            elif winner == 'meta':
+                plan['write_index'].append(name)
+            plan['conflicts'].append({'name': name, 'resolved': winner})
+
+    if not create_missing:
+        plan['uncreated'] = [name for name in plan['write_meta'] if name not in meta]
+        plan['write_meta'] = [name for name in plan['write_meta'] if name in meta]
+    return plan
+
+
+def apply_sync(plan, index, meta):
+    """Write the planned changes, each file atomically; metadata.json is rewritten at most once."""
+    for name in plan['write_meta']:
+        write_atomic(META_DIR / f"{name}.json", json.dumps(index[name], indent=2, ensure_ascii=False))
+        meta[name] = index[name]
+    for name in plan['delete_meta']:
+        (META_DIR / f"{name}.json").unlink()
+        del meta[name]
+
+    if plan['write_index'] or plan['delete_index']:
+        for name in plan['write_index']:
+            index[name] = meta[name]
+        for name in plan['delete_index']:
+            del index[name]
+        write_atomic(METADATA_FILE, json.dumps(index, indent=4, ensure_ascii=False) + '\n')
+
+
+def print_report(plan, dry_run):
+    verb = "Would" if dry_run else "Did"
+    sections = (
+        ('write_meta', "write to meta/"),
+        ('delete_meta', "delete from meta/"),
+        ('write_index', "write to metadata.json"),
+        ('delete_index', "delete from metadata.json"),
+    )
+    for key, label in sections:
+        if plan[key]:
+            print(f"{verb} {label}: {', '.join(plan[key])}")
+    if plan['unpruned']:
+        print(f"Missing from the source (use --prune to delete): {', '.join(plan['unpruned'])}")
+    if plan['uncreated']:
+        print(f"Missing from meta/ (use --create-missing to create): {', '.join(plan['uncreated'])}")
+    for conflict in plan['conflicts']:
+        if conflict['resolved']:
+            print(f"⚠ Conflict in {conflict['name']}: changed on both sides, kept the {conflict['resolved']} entry")
+        else:
+            print(f"⚠ Conflict in {conflict['name']}: changed on both sides, left unchanged (use --prefer to settle)")
+    changes = sum(len(plan[key]) for key, _ in sections)
+    print(f"{changes} changes, {len(plan['conflicts'])} conflicts.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Synchronize metadata.json and meta/*.json, writing only entries that differ')
+    parser.add_argument('direction', nargs='?', choices=('both', 'to-meta', 'to-index'), default='both',
+                       help='to-meta: metadata.json -> meta/, to-index: meta/ -> metadata.json, both (default): merge changes from either side')
+    parser.add_argument('--prune', action='store_true',
+                       help='One-way sync: delete entries that are missing from the source')
+    parser.add_argument('--prefer', choices=('index', 'meta', 'newer'),
+                       help='Settle conflicts in favour of metadata.json (index), meta/ or the newer update timestamp '
+                            '(default: leave them unchanged and report them)')
+    parser.add_argument('--create-missing', action='store_true',
+                       help='Create meta/ files for metadata.json entries that have none')
+    parser.add_argument('--init', action='store_true',
+                       help='Apply a bidirectional sync even without the state of a previous sync '
+                            '(default: such a first sync only reports)')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing anything')
+    parser.add_argument('--json', action='store_true', help='Print the plan as JSON')
+    args = parser.parse_args()
+
+    index = read_index()
+    meta = read_meta_dir()
+    state = load_state()
+    plan = plan_sync(index, meta, args.direction, state, args.prune, args.prefer, args.create_missing)
+
+    # Without a previous sync, nothing tells which side changed an entry
+    first_sync = args.direction == 'both' and not state and not args.init
+    if first_sync and not args.dry_run:
+        print("No previous sync state, so this run only reports; review the plan and pass --init to apply it.")
+    if not args.dry_run and not first_sync:
+        apply_sync(plan, index, meta)
+        # Record the entries both sides agree on as the base of the next bidirectional sync
+        save_state({name: canonical_hash(entry) for name, entry in meta.items()
+                    if name in index and canonical_hash(index[name]) == canonical_hash(entry)})
+
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print_report(plan, args.dry_run or first_sync)
+    sys.exit(1 if any(not conflict['resolved'] for conflict in plan['conflicts']) else 0)
@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from fs_snapshot import DirSnapshot
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+META_DIR = ROOT_DIR / "meta"
+SVG_DIR = ROOT_DIR / "svg"
+PNG_DIR = ROOT_DIR / "png"
+CACHE_FILE = ROOT_DIR / ".cache" / "metadata-validation.json"
+
+# Bump whenever the schema changes so cached results are not reused
+SCHEMA_VERSION = 1
+
+# Below this many changed files, starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 256
+
+
+# Schema nodes. Each compiles to a checker(value, path, errors) that appends
+# "path: message" strings for every violation it finds.
+
+def string(value, path, errors):
+    if not isinstance(value, str) or not value.strip():
+        errors.append(f"{path}: expected a non-empty string, got {value!r}")
+
+
+def timestamp(value, path, errors):
+    # Submissions have written 2024-10-20T18:01:33Z as well as 2025-10-04T13:23:43.208364
+    if not isinstance(value, str):
+        errors.append(f"{path}: expected an ISO 8601 timestamp, got {value!r}")
+        return
+    try:
+        datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        errors.append(f"{path}: invalid ISO 8601 timestamp {value!r}")
+
+
+def author(value, path, errors):
+    # GitHub authors have a numeric id and a login or name; PocketBase authors have a
+    # string id and never a GitHub login
+    if not isinstance(value, dict):
+        errors.append(f"{path}: expected an object, got {value!r}")
+        return
+    unknown = set(value) - {'id', 'login', 'name'}
+    if unknown:
+        errors.append(f"{path}: unexpected keys {', '.join(sorted(unknown))}")
+    author_id = value.get('id')
+    if isinstance(author_id, bool) or not isinstance(author_id, (int, str)):
+        errors.append(f"{path}.id: expected an integer (GitHub) or string (PocketBase) id, got {author_id!r}")
+    elif isinstance(author_id, int):
+        if 'login' not in value and 'name' not in value:
+            errors.append(f"{path}: GitHub authors need a login or name")
+    elif 'login' in value:
+        errors.append(f"{path}.login: PocketBase authors (string id) must not have a GitHub login")
+    for key in ('login', 'name'):
+        if key in value:
+            string(value[key], f"{path}.{key}", errors)
+
+
+def list_of(item):
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected a list, got {value!r}")
+            return
+        for index, entry in enumerate(value):
+            item(entry, f"{path}[{index}]", errors)
+        if len(set(map(repr, value))) != len(value):
+            errors.append(f"{path}: contains duplicates")
+    return check
+
+
+def one_of(*choices):
+    def check(value, path, errors):
+        if value not in choices:
+            errors.append(f"{path}: expected one of {', '.join(map(repr, choices))}, got {value!r}")
+    return check
+
+
+def compile_schema(node):
+    """Compile a schema (dicts of required/optional keys, or checker functions) into one checker."""
+    if callable(node):
+        return node
+    fields = {key.rstrip('?'): (compile_schema(child), not key.endswith('?')) for key, child in node.items()}
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object, got {value!r}")
+            return
+        for key, (checker, required) in fields.items():
+            if key in value:
+                checker(value[key], f"{path}.{key}" if path else key, errors)
+            elif required:
+                errors.append(f"{path + '.' if path else ''}{key}: missing")
+        unknown = set(value) - set(fields)
+        if unknown:
+            errors.append(f"{path or '<root>'}: unexpected keys {', '.join(sorted(unknown))}")
+    return check
+
+
+VARIANTS = {'light': string, 'dark': string}
+
+META_SCHEMA = {
+    'base': one_of('svg', 'png'),
+    'aliases': list_of(string),
+    'categories': list_of(string),
+    'update': {
+        'timestamp': timestamp,
+        'author': author,
+    },
+    'colors?': VARIANTS,
+    'wordmark?': VARIANTS,
+}
+
+validate_meta = compile_schema(META_SCHEMA)
+
+
+def validate_file(meta_path, known_hash=None):
+    """Validate one meta file against the schema.
+
+    Returns (content hash, errors, required files), or (content hash, None, None) when the
+    content still matches `known_hash` and the cached result can be reused.
+    """
+    with open(meta_path, 'rb') as f:
+        data = f.read()
+    content_hash = hashlib.md5(data).hexdigest()
+    if content_hash == known_hash:
+        return content_hash, None, None
+    try:
+        meta = json.loads(data)
+    except ValueError as e:
+        return content_hash, [f"invalid JSON: {e}"], None
+    errors = []
+    validate_meta(meta, '', errors)
+    return content_hash, errors, required_files(Path(meta_path).stem, meta)
+
+
+def required_files(name, meta):
+    """Return (base, [icon names]) that must exist as files for a meta entry, or None if malformed.
+
+    Icons with colors may consist of their light and dark variants only; otherwise the icon
+    itself must exist.
+    """
+    if not isinstance(meta, dict) or meta.get('base') not in ('svg', 'png'):
+        return None
+    colors = meta.get('colors')
+    names = list(colors.values()) if isinstance(colors, dict) else [name]
+    wordmark = meta.get('wordmark')
+    if isinstance(wordmark, dict):
+        names.extend(wordmark.values())
+    return meta['base'], list(dict.fromkeys(name for name in names if isinstance(name, str)))
+
+
+def _validate_chunk(items):
+    return [validate_file(path, known_hash) for path, known_hash in items]
+
+
+def load_cache():
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('schema_version') == SCHEMA_VERSION:
+            return cached.get('files', {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def save_cache(files):
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_FILE.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'schema_version': SCHEMA_VERSION, 'files': files}, f, separators=(',', ':'))
+    os.replace(temp_path, CACHE_FILE)
+
+
+def validate_all(use_cache=True, workers=None):
+    """Validate every meta/*.json file.
+
+    Returns ({icon name: [errors]} for files with violations, files checked, files re-read).
+
+    Schema results are cached per file by size, mtime and content hash, so only changed
+    files are parsed again. Variant names are checked against svg/ and png/ on every run
+    because those directories change independently of the meta files.
+    """
+    meta_files = DirSnapshot(META_DIR).files
+    cached = load_cache() if use_cache else {}
+    results = {}
+    stale = []
+    for file_name, (size, mtime) in meta_files.items():
+        if not file_name.endswith('.json'):
+            continue
+        name = file_name[:-len('.json')]
+        entry = cached.get(name)
+        if entry and entry['signature'] == [size, mtime]:
+            results[name] = entry
+        else:
+            stale.append(name)
+
+    # Re-validate changed files, in worker processes when there are many of them
+    items = [(str(META_DIR / f"{name}.json"), cached.get(name, {}).get('hash')) for name in stale]
+    if len(items) >= PARALLEL_THRESHOLD:
+        workers = workers or os.cpu_count() or 1
+        chunk_size = -(-len(items) // (workers * 4))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            validated = [result for chunk in executor.map(_validate_chunk, chunks) for result in chunk]
+    else:
+        validated = _validate_chunk(items)
+    for name, (content_hash, errors, required) in zip(stale, validated):
+        size, mtime = meta_files[f"{name}.json"]
+        if errors is None:
+            # Touched but unchanged: keep the cached result under the new signature
+            results[name] = dict(cached[name], signature=[size, mtime])
+        else:
+            results[name] = {'signature': [size, mtime], 'hash': content_hash, 'errors': errors, 'required': required}
+
+    if use_cache and stale:
+        save_cache(results)
+
+    files = {'svg': set(DirSnapshot(SVG_DIR).files), 'png': set(DirSnapshot(PNG_DIR).files)}
+    violations = {}
+    for name, entry in sorted(results.items()):
+        errors = list(entry['errors'])
+        if entry['required'] is not None:
+            base, names = entry['required']
+            for icon_name in names:
+                if f"{icon_name}.{base}" not in files[base]:
+                    errors.append(f"{base}/{icon_name}.{base}: file not found (base is {base!r})")
+        if errors:
+            violations[name] = errors
+    return violations, len(results), len(stale)
+
+
+def print_violations(violations, prefix=''):
+    for name, errors in violations.items():
+        for error in errors:
+            print(f"{prefix}meta/{name}.json: {error}")
+
+
+def split_by_changes(violations, changed_paths):
+    """Split violations into (those of entries touched by the changed paths, the others).
+
+    An entry is touched when its meta file changed or a file it requires was added, changed
+    or removed, so a pull request is only held responsible for the entries it affects.
+    """
+    changed_paths = {path.strip().removeprefix('./') for path in changed_paths if path.strip()}
+    touched, untouched = {}, {}
+    for name, errors in violations.items():
+        paths = {f"meta/{name}.json"}
+        try:
+            with open(META_DIR / f"{name}.json", 'r', encoding='utf-8') as f:
+                required = required_files(name, json.load(f))
+        except (OSError, ValueError):
+            required = None
+        if required is not None:
+            base, names = required
+            paths.update(f"{base}/{icon_name}.{base}" for icon_name in names)
+        (touched if paths & changed_paths else untouched)[name] = errors
+    return touched, untouched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Validate meta/*.json against the metadata schema')
+    parser.add_argument('--no-cache', action='store_true', help='Validate every file, ignoring cached results')
+    parser.add_argument('--json', action='store_true', help='Print violations as JSON')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--changed', type=Path, metavar='FILE',
+                        help='File listing the changed paths (e.g. git diff --name-only): only violations of the '
+                             'entries they touch fail the run, the others are warnings')
+    args = parser.parse_args()
+
+    violations, checked, validated = validate_all(use_cache=not args.no_cache, workers=args.workers)
+    if args.changed:
+        failing, warnings = split_by_changes(violations, args.changed.read_text(encoding='utf-8').splitlines())
+    else:
+        failing, warnings = violations, {}
+    if args.json:
+        print(json.dumps(failing, indent=2))
+    else:
+        print_violations(failing)
+        print_violations(warnings, prefix='⚠ ')
+        print(f"Checked {checked} meta files ({validated} changed since the last run): "
+              f"{sum(map(len, violations.values()))} violations in {len(violations)} files"
+              + (f", {len(warnings)} of them in entries not touched by the changes." if args.changed else "."))
+    sys.exit(1 if failing else 0)
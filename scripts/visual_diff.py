@@ -0,0 +1,202 @@
+import argparse
+import html
+import io
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageOps
+
+# NumPy makes the per-pixel statistics much faster; Pillow's ImageChops is the fallback
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Percent of the maximum per-pixel difference below which a re-render counts as unchanged,
+# provided no single pixel changed (see is_noop)
+DEFAULT_NOOP_THRESHOLD = 0.05
+# A pixel counts as changed when a channel moved by more than this
+CHANGED_PIXEL_DELTA = 16
+THUMB_HEIGHT = 128
+# Below this many icons the process pool costs more than it saves
+POOL_THRESHOLD = 16
+CHECKERBOARD_COLORS = ((255, 255, 255, 255), (224, 224, 224, 255))
+
+
+def load_rgba(source):
+    """Decode PNG bytes or a file path into an RGBA image."""
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+        return image.convert('RGBA')
+
+
+def diff_images(old, new):
+    """Compare two RGBA images; returns (score, changed fraction, difference image).
+
+    The score is the mean absolute per-channel difference of the alpha-weighted pixels, as
+    a percentage of the maximum. Images of different sizes are compared at the new size,
+    with the size change itself reported as a 100% change.
+    """
+    if old.size != new.size:
+        old = old.resize(new.size, Image.LANCZOS)
+        size_changed = True
+    else:
+        size_changed = False
+    # Fully transparent pixels may hold any color; premultiplying by alpha makes them all equal
+    old, new = old.convert('RGBa'), new.convert('RGBa')
+    if numpy is not None:
+        delta = numpy.abs(numpy.asarray(old, dtype=numpy.int16) - numpy.asarray(new, dtype=numpy.int16))
+        score = float(delta.mean()) * 100 / 255
+        per_pixel = delta.max(axis=2)
+        changed = float((per_pixel > CHANGED_PIXEL_DELTA).mean())
+        difference = Image.fromarray(per_pixel.astype(numpy.uint8), 'L')
+    else:
+        channels = ImageChops.difference(old, new).split()
+        histogram = [sum(counts) for counts in zip(*(channel.histogram() for channel in channels))]
+        score = sum(value * count for value, count in enumerate(histogram)) / (sum(histogram) * 255) * 100
+        difference = channels[0]
+        for channel in channels[1:]:
+            difference = ImageChops.lighter(difference, channel)
+        changed_counts = difference.point(lambda value: 255 if value > CHANGED_PIXEL_DELTA else 0).histogram()
+        changed = changed_counts[255] / (new.width * new.height)
+    if size_changed:
+        score, changed = 100.0, 1.0
+    return score, changed, difference
+
+
+def change_score(old_source, new_source):
+    """(score, changed fraction) of the change between two encoded images (see diff_images)."""
+    return diff_images(load_rgba(old_source), load_rgba(new_source))[:2]
+
+
+def is_noop(score, changed, threshold):
+    """Whether a change is only rendering noise: a low score and no pixel moved past CHANGED_PIXEL_DELTA.
+
+    The score is averaged over the whole canvas, so a small but real edit (a recolored
+    detail) can score below any useful threshold; the changed pixels catch it.
+    """
+    return score < threshold and changed == 0
+
+
+def _thumbnail(image, height):
+    width = max(1, round(image.width * height / image.height))
+    return image.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+
+
+def _on_checkerboard(image, cell=8):
+    board = Image.new('RGBA', image.size, CHECKERBOARD_COLORS[0])
+    for y in range(0, image.height, cell):
+        for x in range((y // cell) % 2 * cell, image.width, 2 * cell):
+            board.paste(CHECKERBOARD_COLORS[1], (x, y, x + cell, y + cell))
+    board.alpha_composite(image)
+    return board
+
+
+def render_strip(old, new, difference, height=THUMB_HEIGHT):
+    """Previous render, new render and a red heat map of their difference, side by side."""
+    old, new = _thumbnail(old, height), _thumbnail(new, height)
+    heat = _thumbnail(difference.convert('L'), height)
+    heat = ImageOps.colorize(ImageOps.autocontrast(heat), black=(32, 32, 32), white=(255, 48, 48)).convert('RGBA')
+    gap = 8
+    strip = Image.new('RGBA', (old.width + new.width + heat.width + 2 * gap, height), (255, 255, 255, 255))
+    x = 0
+    for part in (_on_checkerboard(old), _on_checkerboard(new), heat):
+        strip.paste(part, (x, 0))
+        x += part.width + gap
+    return strip
+
+
+def compare_pair(job):
+    """Diff one icon and write its strip image; runs in a worker process."""
+    name, old_source, new_source, out_dir, threshold = job
+    try:
+        old, new = load_rgba(old_source), load_rgba(new_source)
+        score, changed, difference = diff_images(old, new)
+    except Exception as e:
+        return {'name': name, 'error': str(e)}
+    result = {'name': name, 'score': score, 'changed': changed, 'old_size': old.size, 'new_size': new.size,
+              'noop': is_noop(score, changed, threshold)}
+    if out_dir is not None and not result['noop']:
+        strip_path = Path(out_dir) / 'strips' / f"{name}.png"
+        strip_path.parent.mkdir(parents=True, exist_ok=True)
+        # Report images are thrown away after review, so fast compression beats small files
+        render_strip(old, new, difference).convert('RGB').save(strip_path, compress_level=1)
+        result['strip'] = f"strips/{name}.png"
+    return result
+
+
+def compare_all(pairs, out_dir=None, threshold=DEFAULT_NOOP_THRESHOLD, workers=None):
+    """Diff (name, old, new) pairs, where old and new are PNG bytes or paths; largest change first."""
+    jobs = [(name, old, new, str(out_dir) if out_dir else None, threshold) for name, old, new in pairs]
+    if len(jobs) >= POOL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compare_pair, jobs, chunksize=4))
+    else:
+        results = [compare_pair(job) for job in jobs]
+    results.sort(key=lambda result: (-result.get('score', float('inf')), result['name']))
+    return results
+
+
+def write_report(results, out_dir, threshold=DEFAULT_NOOP_THRESHOLD, added=(), removed=()):
+    """Write index.html listing every change with its strip, scores and the no-op verdict."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for result in results:
+        name = html.escape(result['name'])
+        if 'error' in result:
+            rows.append(f"<tr><td>{name}</td><td colspan=3>error: {html.escape(result['error'])}</td></tr>")
+            continue
+        verdict = 'no-op' if result['noop'] else 'changed'
+        sizes = f"{result['old_size'][0]}&times;{result['old_size'][1]} &rarr; {result['new_size'][0]}&times;{result['new_size'][1]}"
+        image = f'<img src="{html.escape(result["strip"])}" alt="{name}">' if result.get('strip') else ''
+        rows.append(f"<tr class={verdict}><td>{name}<br><small>{sizes}</small></td>"
+                    f"<td>{result['score']:.3f}%</td><td>{result['changed'] * 100:.2f}%</td><td>{verdict}</td><td>{image}</td></tr>")
+    lists = ''.join(f"<h2>{title} ({len(names)})</h2><p>{html.escape(', '.join(sorted(names)))}</p>"
+                    for title, names in (('Added', added), ('Removed', removed)) if names)
+    changed = sum(1 for result in results if not result.get('noop', False))
+    page = f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Icon visual diff</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border-bottom: 1px solid #ddd; padding: 6px 12px; text-align: left; vertical-align: middle; }}
+tr.no-op {{ color: #888; }}
+</style></head><body>
+<h1>Icon visual diff</h1>
+<p>{changed} changed and {len(results) - changed} below the no-op threshold of {threshold}%.
+Each strip shows the previous render, the new render and the difference.</p>
+{lists}
+<table><tr><th>Icon</th><th>Score</th><th>Changed pixels</th><th>Verdict</th><th>Previous / new / difference</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+    (out_dir / 'index.html').write_text(page, encoding='utf-8')
+    return out_dir / 'index.html'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the visual differences between two folders of PNG renders')
+    parser.add_argument('base', type=Path, help='Folder with the previous PNGs (e.g. a checkout of the base branch)')
+    parser.add_argument('head', type=Path, help='Folder with the new PNGs')
+    parser.add_argument('--out', type=Path, default=Path('visual-report'), help='Report folder (default: visual-report)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_NOOP_THRESHOLD,
+                       help=f'Score (percent) below which a change without changed pixels is reported as a no-op (default: {DEFAULT_NOOP_THRESHOLD})')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    base = {path.name: path for path in args.base.glob('*.png')}
+    head = {path.name: path for path in args.head.glob('*.png')}
+    # Byte-identical files cannot differ visually and are not decoded at all
+    pairs = [(Path(name).stem, base[name], head[name]) for name in sorted(base.keys() & head.keys())
+             if base[name].read_bytes() != head[name].read_bytes()]
+    results = compare_all(pairs, args.out, args.threshold, args.workers)
+    report = write_report(results, args.out, args.threshold,
+                          added=[Path(name).stem for name in head.keys() - base.keys()],
+                          removed=[Path(name).stem for name in base.keys() - head.keys()])
+    changed = sum(1 for result in results if not result.get('noop', False))
+    print(f"Compared {len(pairs)} modified PNGs in {time.perf_counter() - started:.1f}s: "
+          f"{changed} changed, {len(results) - changed} below the no-op threshold. Report: {report}")
+    sys.exit(0)